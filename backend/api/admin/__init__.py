@@ -8,9 +8,11 @@ from .feedback import FeedbackAdmin
 from .ispcube_integration import ISPCubeIntegrationAdmin
 from .knowledge_base import KnowledgeBaseAdmin
 from .message import MessageAdmin
+from .outbound_message import OutboundMessageAdmin
 from .sector import SectorAdmin
 from .template import TemplateAdmin
 from .tool_call_log import ToolCallLogAdmin
+from .webhook_job import WebhookJobAdmin
 
 __all__ = [
     "AgentHandoffAdmin",
@@ -23,7 +25,9 @@ __all__ = [
     "ISPCubeIntegrationAdmin",
     "KnowledgeBaseAdmin",
     "MessageAdmin",
+    "OutboundMessageAdmin",
     "SectorAdmin",
     "TemplateAdmin",
     "ToolCallLogAdmin",
+    "WebhookJobAdmin",
 ]
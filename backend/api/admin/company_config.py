@@ -6,10 +6,21 @@ from api.models import CompanyConfig
 
 @admin.register(CompanyConfig)
 class CompanyConfigAdmin(ModelAdmin):
-    list_display = ["company", "max_tokens", "temperature", "updated_at"]
+    list_display = [
+        "company",
+        "max_tokens",
+        "temperature",
+        "prompt_version",
+        "updated_at",
+    ]
     list_filter = ["company"]
     search_fields = ["company__name", "system_prompt"]
-    readonly_fields = ["created_at", "updated_at"]
+    readonly_fields = [
+        "compiled_system_prompt",
+        "prompt_version",
+        "created_at",
+        "updated_at",
+    ]
 
     fieldsets = [
         (
@@ -21,7 +32,20 @@ class CompanyConfigAdmin(ModelAdmin):
         (
             "LLM Configuration",
             {
-                "fields": ["system_prompt", "max_tokens", "temperature"],
+                "fields": [
+                    "system_prompt",
+                    "max_tokens",
+                    "temperature",
+                    "reply_debounce_ms",
+                    "stream_replies",
+                    "history_token_budget",
+                ],
+            },
+        ),
+        (
+            "Compiled Prompt",
+            {
+                "fields": ["compiled_system_prompt", "prompt_version"],
             },
         ),
         (
@@ -18,6 +18,10 @@ class ConversationAdmin(ModelAdmin):
         ("Status", {
             "fields": ("status", "is_active")
         }),
+        ("Summary", {
+            "fields": ("summary", "summary_through", "summary_due_at"),
+            "classes": ("collapse",)
+        }),
         ("Metrics", {
             "fields": ("total_messages", "started_at", "last_message_at")
         }),
@@ -20,6 +20,9 @@ class ISPCubeIntegrationAdmin(ModelAdmin):
         ("Token Management", {
             "fields": ("api_token", "token_expires_at")
         }),
+        ("Customer Sync", {
+            "fields": ("customers_synced_through",)
+        }),
         ("Status", {
             "fields": ("is_active", "created_at", "updated_at")
         }),
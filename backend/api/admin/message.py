@@ -9,17 +9,17 @@ class MessageAdmin(ModelAdmin):
     list_display = ["role", "content_preview", "conversation", "tokens_used", "latency_ms", "created_at"]
     list_filter = ["role", "created_at", "conversation__company"]
     search_fields = ["content", "conversation__customer__name", "conversation__customer__phone"]
-    readonly_fields = ["created_at"]
+    readonly_fields = ["whatsapp_message_id", "stage_timings", "created_at"]
     autocomplete_fields = ["conversation"]
     fieldsets = (
         ("Conversation", {
             "fields": ("conversation",)
         }),
         ("Message Content", {
-            "fields": ("role", "content")
+            "fields": ("role", "content", "whatsapp_message_id")
         }),
         ("Metrics", {
-            "fields": ("tokens_used", "latency_ms")
+            "fields": ("tokens_used", "latency_ms", "stage_timings")
         }),
         ("Timestamp", {
             "fields": ("created_at",)
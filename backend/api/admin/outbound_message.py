@@ -0,0 +1,69 @@
+from django.contrib import admin
+from unfold.admin import ModelAdmin
+
+from api.models import OutboundMessage
+
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(ModelAdmin):
+    list_display = [
+        "id",
+        "company",
+        "to_number",
+        "priority",
+        "status",
+        "attempts",
+        "available_at",
+        "created_at",
+    ]
+    list_filter = ["status", "priority", "company", "created_at"]
+    search_fields = ["to_number", "phone_number_id", "text", "last_error"]
+    readonly_fields = [
+        "message",
+        "created_at",
+        "updated_at",
+        "locked_at",
+        "sent_at",
+        "received_at",
+        "stage_timings",
+    ]
+    autocomplete_fields = ["company", "conversation"]
+    fieldsets = (
+        (
+            "Message",
+            {
+                "fields": (
+                    "company",
+                    "conversation",
+                    "message",
+                    "phone_number_id",
+                    "to_number",
+                    "text",
+                    "tokens_used",
+                    "typing_message_id",
+                )
+            },
+        ),
+        (
+            "Delivery",
+            {
+                "fields": (
+                    "priority",
+                    "status",
+                    "attempts",
+                    "available_at",
+                    "locked_at",
+                    "sent_at",
+                    "last_error",
+                )
+            },
+        ),
+        (
+            "Latency",
+            {"fields": ("received_at", "stage_timings"), "classes": ("collapse",)},
+        ),
+        (
+            "Timestamps",
+            {"fields": ("created_at", "updated_at"), "classes": ("collapse",)},
+        ),
+    )
@@ -0,0 +1,31 @@
+from django.contrib import admin
+from unfold.admin import ModelAdmin
+
+from api.models import WebhookJob
+
+
+@admin.register(WebhookJob)
+class WebhookJobAdmin(ModelAdmin):
+    list_display = ["id", "status", "attempts", "available_at", "created_at"]
+    list_filter = ["status", "created_at"]
+    search_fields = ["last_error"]
+    readonly_fields = ["created_at", "updated_at", "locked_at"]
+    fieldsets = (
+        ("Payload", {"fields": ("payload",)}),
+        (
+            "Processing",
+            {
+                "fields": (
+                    "status",
+                    "attempts",
+                    "available_at",
+                    "locked_at",
+                    "last_error",
+                )
+            },
+        ),
+        (
+            "Timestamps",
+            {"fields": ("created_at", "updated_at"), "classes": ("collapse",)},
+        ),
+    )
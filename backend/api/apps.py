@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class ApiConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "api"
+
+    def ready(self):
+        from api import signals  # noqa: F401
+        from api.utils.structured_logging import start_queue_listeners
+
+        start_queue_listeners()
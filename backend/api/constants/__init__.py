@@ -1,4 +1,19 @@
-from .choices import BillingEventType, ConversationStatus, MessageRole
+from .choices import (
+    BillingEventType,
+    ConversationStatus,
+    MessageRole,
+    OutboundMessagePriority,
+    OutboundMessageStatus,
+    WebhookJobStatus,
+)
 from .timezones import LATAM_TIMEZONES
 
-__all__ = ["BillingEventType", "ConversationStatus", "MessageRole", "LATAM_TIMEZONES"]
+__all__ = [
+    "BillingEventType",
+    "ConversationStatus",
+    "MessageRole",
+    "OutboundMessagePriority",
+    "OutboundMessageStatus",
+    "WebhookJobStatus",
+    "LATAM_TIMEZONES",
+]
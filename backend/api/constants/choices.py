@@ -43,3 +43,28 @@ class ConversationStatus(models.TextChoices):
     CLOSED = "closed", "Closed"
     ARCHIVED = "archived", "Archived"
 
+
+class WebhookJobStatus(models.TextChoices):
+    """Status choices for WebhookJob model."""
+
+    PENDING = "pending", "Pending"
+    PROCESSING = "processing", "Processing"
+    DONE = "done", "Done"
+    FAILED = "failed", "Failed"
+
+
+class OutboundMessageStatus(models.TextChoices):
+    """Status choices for OutboundMessage model."""
+
+    PENDING = "pending", "Pending"
+    SENDING = "sending", "Sending"
+    SENT = "sent", "Sent"
+    DEAD = "dead", "Dead (gave up)"
+
+
+class OutboundMessagePriority(models.IntegerChoices):
+    """Priority choices for OutboundMessage model (higher is sent first)."""
+
+    BULK = 0, "Bulk"
+    TEMPLATE = 10, "Template"
+    REPLY = 20, "Conversation Reply"
@@ -2,10 +2,11 @@
 Custom Django field for E.164 phone number validation and formatting.
 """
 
-import phonenumbers
 from django.core.exceptions import ValidationError
 from django.db import models
 
+from api.utils.phone import normalize_phone
+
 
 def validate_phone_number(value):
     """
@@ -15,19 +16,11 @@ def validate_phone_number(value):
     if not value:
         return
 
-    try:
-        # Parse the phone number (handles E.164 and other formats)
-        parsed = phonenumbers.parse(value, None)
-        if not phonenumbers.is_valid_number(parsed):
-            raise ValidationError(
-                f"'{value}' is not a valid phone number.",
-                code="invalid_phone"
-            )
-    except phonenumbers.NumberParseException as e:
+    if not normalize_phone(value).valid:
         raise ValidationError(
-            f"'{value}' is not a valid phone number: {str(e)}",
+            f"'{value}' is not a valid phone number.",
             code="invalid_phone"
-        ) from e
+        )
 
 
 class E164PhoneNumberField(models.CharField):
@@ -49,16 +42,9 @@ class E164PhoneNumberField(models.CharField):
         if not value:
             return value
 
-        try:
-            parsed = phonenumbers.parse(value, None)
-            if phonenumbers.is_valid_number(parsed):
-                # Convert to E.164 format
-                return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
-        except phonenumbers.NumberParseException:
-            pass
-
+        phone = normalize_phone(value)
         # If parsing fails, return as-is and let validation handle it
-        return value
+        return phone.e164 if phone.valid else value
 
     def to_python(self, value):
         """Convert value to Python type."""
@@ -0,0 +1,307 @@
+"""
+Building blocks for the webhook benchmarks (bench_webhook and benchmarks/).
+
+Local stand-ins for the WhatsApp Graph API and the Gemini API, with tunable
+latency and error rate, and builders for synthetic or recorded webhook
+payloads.
+"""
+
+import copy
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BENCH_REPLY = (
+    "¡Hola! Gracias por escribirnos. Ya estamos revisando tu conexión.\n\n"
+    "Mientras tanto, probá reiniciar el router durante 30 segundos. "
+    "Te aviso en cuanto tenga novedades."
+)
+
+_GEMINI_MODEL_PATH = re.compile(r"/models/[^/:]+$")
+
+
+class FakeService(ABC):
+    """
+    Threaded HTTP stand-in for an external API.
+
+    Every request waits `latency_ms` (plus up to 20% jitter) and fails with
+    `error_status` with probability `error_rate`.
+
+    Args:
+        latency_ms: Simulated response time
+        error_rate: Fraction of requests that fail, between 0 and 1
+    """
+
+    error_status = 500
+
+    def __init__(self, latency_ms: float = 0, error_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        """
+        Start serving on a free local port.
+
+        Returns:
+            str: Base URL of the service
+        """
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                service._dispatch(self)
+
+            def do_POST(self):
+                service._dispatch(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _dispatch(self, handler: BaseHTTPRequestHandler) -> None:
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = json.loads(handler.rfile.read(length) or b"{}")
+
+        if self.latency_ms:
+            time.sleep(self.latency_ms * random.uniform(1, 1.2) / 1000)
+
+        failed = random.random() < self.error_rate
+        with self._lock:
+            self.requests += 1
+            self.errors += failed
+
+        if failed:
+            status, content_type, content = (
+                self.error_status,
+                "application/json",
+                json.dumps(self.build_error()).encode(),
+            )
+        else:
+            status, content_type, content = self.handle(
+                handler.command, handler.path, body
+            )
+
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(content)))
+        handler.end_headers()
+        handler.wfile.write(content)
+
+    def build_error(self) -> dict:
+        return {"error": {"code": self.error_status, "message": "Simulated error"}}
+
+    @abstractmethod
+    def handle(self, method: str, path: str, body: dict) -> tuple[int, str, bytes]:
+        """Build the (status, content type, content) of a successful response."""
+
+
+class FakeGraphAPI(FakeService):
+    """Stand-in for the WhatsApp Cloud API `/{phone_number_id}/messages` endpoint."""
+
+    def handle(self, method, path, body):
+        if body.get("status") == "read":
+            result = {"success": True}
+        else:
+            result = {
+                "messaging_product": "whatsapp",
+                "contacts": [{"input": body.get("to"), "wa_id": body.get("to")}],
+                "messages": [{"id": f"wamid.bench.{self.requests}"}],
+            }
+        return 200, "application/json", json.dumps(result).encode()
+
+
+class FakeGemini(FakeService):
+    """
+    Stand-in for the Gemini API: model lookup, generateContent and
+    streamGenerateContent (server-sent events), always answering BENCH_REPLY.
+    """
+
+    error_status = 503
+
+    def build_error(self):
+        return {
+            "error": {
+                "code": 503,
+                "message": "The model is overloaded.",
+                "status": "UNAVAILABLE",
+            }
+        }
+
+    def handle(self, method, path, body):
+        path = path.split("?")[0]
+        if method == "GET" and _GEMINI_MODEL_PATH.search(path):
+            model = path.rsplit("/", 1)[-1]
+            return (
+                200,
+                "application/json",
+                json.dumps({"name": f"models/{model}"}).encode(),
+            )
+
+        if path.endswith(":streamGenerateContent"):
+            chunks = [part + " " for part in BENCH_REPLY.split(" ")]
+            events = [
+                "data: "
+                + json.dumps(self._build_response(chunk, final=i == len(chunks) - 1))
+                for i, chunk in enumerate(chunks)
+            ]
+            return (
+                200,
+                "text/event-stream",
+                ("\r\n\r\n".join(events) + "\r\n\r\n").encode(),
+            )
+
+        return (
+            200,
+            "application/json",
+            json.dumps(self._build_response(BENCH_REPLY)).encode(),
+        )
+
+    @staticmethod
+    def _build_response(text: str, final: bool = True) -> dict:
+        response = {
+            "candidates": [
+                {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+            ],
+        }
+        if final:
+            response["candidates"][0]["finishReason"] = "STOP"
+            response["usageMetadata"] = {
+                "promptTokenCount": 1200,
+                "candidatesTokenCount": 60,
+                "totalTokenCount": 1260,
+            }
+        return response
+
+
+def build_text_payload(
+    phone_number_id: str, from_number: str, text: str, message_id: str
+) -> dict:
+    """
+    Build a WhatsApp Cloud API webhook payload with a single text message.
+
+    Args:
+        phone_number_id: Business phone number ID (Company.whatsapp_phone_id)
+        from_number: Customer phone number
+        text: Message body
+        message_id: WhatsApp message ID (must be unique, see dedup_service)
+
+    Returns:
+        dict: Webhook payload
+    """
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [
+            {
+                "id": "0",
+                "changes": [
+                    {
+                        "field": "messages",
+                        "value": {
+                            "messaging_product": "whatsapp",
+                            "metadata": {
+                                "display_phone_number": phone_number_id,
+                                "phone_number_id": phone_number_id,
+                            },
+                            "contacts": [
+                                {"profile": {"name": "Bench"}, "wa_id": from_number}
+                            ],
+                            "messages": [
+                                {
+                                    "from": from_number,
+                                    "id": message_id,
+                                    "timestamp": str(int(time.time())),
+                                    "type": "text",
+                                    "text": {"body": text},
+                                }
+                            ],
+                        },
+                    }
+                ],
+            }
+        ],
+    }
+
+
+def iter_synthetic_payloads(
+    phone_number_ids: list[str], customers: int, run_id: str
+) -> Iterator[dict]:
+    """
+    Endless single-message payloads spread over companies and customers.
+
+    Args:
+        phone_number_ids: Business phone number IDs to address
+        customers: Number of distinct customers per company
+        run_id: Unique token for this run, part of every message ID
+
+    Yields:
+        dict: Webhook payload
+    """
+    for n in itertools.count():
+        yield build_text_payload(
+            phone_number_id=phone_number_ids[n % len(phone_number_ids)],
+            from_number=f"54911{n % customers:08d}",
+            text=f"Hola, no tengo internet desde ayer ({n})",
+            message_id=f"wamid.{run_id}.{n}",
+        )
+
+
+def iter_recorded_payloads(
+    path: str, phone_number_ids: list[str], run_id: str
+) -> Iterator[dict]:
+    """
+    Endless replay of recorded webhook payloads (one JSON object per line).
+
+    Payloads are addressed to `phone_number_ids` and their message IDs are
+    made unique, so every replay is processed rather than deduplicated.
+
+    Args:
+        path: JSON Lines file of webhook payloads
+        phone_number_ids: Business phone number IDs to address
+        run_id: Unique token for this run, part of every message ID
+
+    Yields:
+        dict: Webhook payload
+    """
+    with open(path) as f:
+        recorded = [json.loads(line) for line in f if line.strip()]
+    if not recorded:
+        raise ValueError(f"No payloads in {path}")
+
+    for n, payload in enumerate(itertools.cycle(recorded)):
+        payload = copy.deepcopy(payload)
+        for entry in payload.get("entry") or []:
+            for change in entry.get("changes") or []:
+                value = change.get("value") or {}
+                value.setdefault("metadata", {})["phone_number_id"] = phone_number_ids[
+                    n % len(phone_number_ids)
+                ]
+                for message in value.get("messages") or []:
+                    message["id"] = f"{message.get('id')}.{run_id}.{n}"
+        yield payload
@@ -0,0 +1,340 @@
+"""
+Load-test the WhatsApp webhook against local stand-ins for Meta and Gemini.
+
+Replays synthetic (or recorded) webhook payloads against `whatsapp_webhook`
+at the given concurrency and reports throughput, latency percentiles,
+database queries per message and memory. With `--pipeline`, the queued
+jobs are then drained by the worker and the dispatcher, which talk to fake
+Graph and Gemini servers with tunable latency and error rate.
+
+Runs on a throwaway test database unless `--no-test-db` is given.
+
+Usage:
+    uv run python manage.py bench_webhook --messages 2000 --concurrency 100
+    uv run python manage.py bench_webhook --pipeline --llm-latency 800 --llm-error-rate 0.02
+    uv run python manage.py bench_webhook --payloads recorded.jsonl
+    uv run python manage.py bench_webhook --url https://staging.example.com/api/whatsapp/webhook
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import resource
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+
+import httpx
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient
+
+from api.constants import MessageRole
+from api.management.bench import (
+    FakeGemini,
+    FakeGraphAPI,
+    iter_recorded_payloads,
+    iter_synthetic_payloads,
+)
+from api.middleware import track_queries
+from api.models.company import Company
+from api.models.company_config import CompanyConfig
+from api.models.message import Message
+from api.utils.timing import percentile
+from api.utils.whatsapp_parser import iter_webhook_messages
+from services.tenant_cache import clear_tenant_cache
+
+WEBHOOK_PATH = "/api/whatsapp/webhook"
+PERCENTILES = (50, 95, 99)
+
+
+class Command(BaseCommand):
+    help = "Benchmark the WhatsApp webhook (and optionally the whole pipeline) with fake Meta and Gemini servers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--messages",
+            type=int,
+            default=1000,
+            help="Number of webhook requests to send",
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=50, help="Requests in flight at once"
+        )
+        parser.add_argument(
+            "--companies", type=int, default=1, help="Number of benchmark companies"
+        )
+        parser.add_argument(
+            "--customers", type=int, default=100, help="Distinct customers per company"
+        )
+        parser.add_argument(
+            "--payloads", help="Replay webhook payloads from this JSON Lines file"
+        )
+        parser.add_argument(
+            "--url",
+            help="Send requests over HTTP to this webhook URL instead of in-process "
+            "(database queries and --pipeline are then not measured)",
+        )
+        parser.add_argument(
+            "--pipeline",
+            action="store_true",
+            help="Also drain the queued jobs with the worker and the dispatcher",
+        )
+        parser.add_argument(
+            "--stream",
+            action="store_true",
+            help="Enable streamed replies for the benchmark companies",
+        )
+        parser.add_argument(
+            "--graph-latency",
+            type=float,
+            default=80,
+            help="Fake Graph API latency (ms)",
+        )
+        parser.add_argument(
+            "--graph-error-rate",
+            type=float,
+            default=0.0,
+            help="Fake Graph API error rate (0-1)",
+        )
+        parser.add_argument(
+            "--llm-latency", type=float, default=600, help="Fake Gemini latency (ms)"
+        )
+        parser.add_argument(
+            "--llm-error-rate",
+            type=float,
+            default=0.0,
+            help="Fake Gemini error rate (0-1)",
+        )
+        parser.add_argument(
+            "--tracemalloc",
+            action="store_true",
+            help="Measure peak Python heap usage (slows the benchmark down)",
+        )
+        parser.add_argument(
+            "--no-test-db",
+            action="store_true",
+            help="Use the configured database instead of a throwaway test database. "
+            "Never use against production",
+        )
+        parser.add_argument(
+            "--keepdb", action="store_true", help="Reuse the test database between runs"
+        )
+
+    def handle(self, *args, **options):
+        graph = FakeGraphAPI(options["graph_latency"], options["graph_error_rate"])
+        gemini = FakeGemini(options["llm_latency"], options["llm_error_rate"])
+        # Real credentials never leave the process
+        settings.WHATSAPP_API_URL = graph.start()
+        settings.WHATSAPP_ACCESS_TOKEN = "bench"
+        settings.GEMINI_BASE_URL = gemini.start()
+        settings.GEMINI_CONTEXT_CACHE_ENABLED = False
+        os.environ["GEMINI_API_KEY"] = "bench"
+
+        old_database_name = connection.settings_dict["NAME"]
+        if not options["no_test_db"]:
+            connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, keepdb=options["keepdb"]
+            )
+
+        try:
+            self.run_benchmark(options, graph, gemini)
+        finally:
+            graph.stop()
+            gemini.stop()
+            if not options["no_test_db"]:
+                connection.creation.destroy_test_db(
+                    old_database_name, verbosity=0, keepdb=options["keepdb"]
+                )
+
+    def run_benchmark(
+        self, options: dict, graph: FakeGraphAPI, gemini: FakeGemini
+    ) -> None:
+        run_id = uuid.uuid4().hex[:8]
+        started_at = time.time()
+        phone_number_ids = self.create_companies(
+            options["companies"], options["stream"]
+        )
+
+        if options["payloads"]:
+            source = iter_recorded_payloads(
+                options["payloads"], phone_number_ids, run_id
+            )
+        else:
+            source = iter_synthetic_payloads(
+                phone_number_ids, max(1, options["customers"]), run_id
+            )
+        payloads = list(itertools.islice(source, options["messages"]))
+        messages = sum(
+            len(list(iter_webhook_messages(payload))) for payload in payloads
+        )
+
+        if options["tracemalloc"]:
+            tracemalloc.start()
+
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                f"Webhook: {len(payloads)} requests ({messages} messages), "
+                f"concurrency {options['concurrency']}"
+            )
+        )
+        with track_queries() as queries:
+            elapsed, latencies, statuses = asyncio.run(
+                self.send_payloads(
+                    payloads, max(1, options["concurrency"]), options["url"]
+                )
+            )
+        self.report_throughput(len(payloads), messages, elapsed, latencies)
+        self.stdout.write(
+            f"  status codes        {dict(sorted(statuses.items(), key=str))}"
+        )
+        if not options["url"]:
+            self.report_queries(queries[0], messages)
+
+        if options["pipeline"] and not options["url"]:
+            self.stdout.write(
+                self.style.MIGRATE_HEADING("Pipeline: worker and dispatcher")
+            )
+            start = time.perf_counter()
+            with track_queries() as queries:
+                call_command(
+                    "run_whatsapp_worker", once=True, concurrency=options["concurrency"]
+                )
+                call_command(
+                    "run_outbound_dispatcher",
+                    once=True,
+                    concurrency=options["concurrency"],
+                    rate=1_000_000,
+                    burst=1_000_000,
+                )
+            elapsed = time.perf_counter() - start
+
+            replies = list(
+                Message.objects.filter(
+                    role=MessageRole.ASSISTANT,
+                    conversation__company__whatsapp_phone_id__in=phone_number_ids,
+                    latency_ms__isnull=False,
+                ).values_list("latency_ms", flat=True)
+            )
+            self.stdout.write(
+                f"  replies             {len(replies)} in {elapsed:.2f}s "
+                f"({len(replies) / elapsed:.1f}/s)"
+            )
+            self.report_queries(queries[0], messages)
+            self.stdout.write(
+                f"  fake Graph API      {graph.requests} requests, {graph.errors} errors"
+            )
+            self.stdout.write(
+                f"  fake Gemini         {gemini.requests} requests, {gemini.errors} errors"
+            )
+            if replies:
+                hours = (time.time() - started_at) / 3600
+                for company in Company.objects.filter(
+                    whatsapp_phone_id__in=phone_number_ids
+                ):
+                    call_command(
+                        "latency_report",
+                        hours=hours,
+                        company=company.slug,
+                        stdout=self.stdout,
+                    )
+
+        self.report_memory(options["tracemalloc"])
+
+    def create_companies(self, count: int, stream: bool) -> list[str]:
+        """Create (or reuse) the benchmark companies, answering without debounce."""
+        phone_number_ids = []
+        for i in range(max(1, count)):
+            company, _ = Company.objects.get_or_create(
+                slug=f"bench-{i}",
+                defaults={"name": f"Bench {i}", "whatsapp_phone_id": f"bench{i}"},
+            )
+            CompanyConfig.objects.update_or_create(
+                company=company,
+                defaults={"reply_debounce_ms": 0, "stream_replies": stream},
+            )
+            phone_number_ids.append(company.whatsapp_phone_id)
+        clear_tenant_cache()
+        return phone_number_ids
+
+    async def send_payloads(
+        self, payloads: list[dict], concurrency: int, url: str | None
+    ) -> tuple[float, list[float], Counter]:
+        """Send every payload, `concurrency` at a time, timing each request."""
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies: list[float] = []
+        statuses: Counter = Counter()
+
+        if url:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=concurrency), timeout=60
+            )
+
+            async def post(body: str) -> int:
+                response = await client.post(
+                    url, content=body, headers={"Content-Type": "application/json"}
+                )
+                return response.status_code
+        else:
+            client = AsyncClient()
+
+            async def post(body: str) -> int:
+                response = await client.post(
+                    WEBHOOK_PATH, data=body, content_type="application/json"
+                )
+                return response.status_code
+
+        async def send(payload: dict) -> None:
+            body = json.dumps(payload)
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    status = await post(body)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[status] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send(payload) for payload in payloads))
+        elapsed = time.perf_counter() - start
+
+        if url:
+            await client.aclose()
+        return elapsed, latencies, statuses
+
+    def report_throughput(
+        self, requests: int, messages: int, elapsed: float, latencies: list[float]
+    ) -> None:
+        latencies.sort()
+        self.stdout.write(
+            f"  throughput          {requests / elapsed:.1f} req/s, "
+            f"{messages / elapsed:.1f} msg/s ({elapsed:.2f}s)"
+        )
+        if not latencies:
+            self.stdout.write("  latency             no completed requests")
+            return
+        self.stdout.write(
+            "  latency            "
+            + "".join(f" P{p} {percentile(latencies, p):.1f}ms" for p in PERCENTILES)
+            + f" max {latencies[-1]:.1f}ms"
+        )
+
+    def report_queries(self, queries: int, messages: int) -> None:
+        self.stdout.write(
+            f"  database queries    {queries} ({queries / max(1, messages):.2f} per message)"
+        )
+
+    def report_memory(self, traced: bool) -> None:
+        # ru_maxrss is in kilobytes on Linux
+        max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        line = f"Memory: max RSS {max_rss_mb:.1f}MB"
+        if traced:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            line += f", Python heap peak {peak / 1024 / 1024:.1f}MB"
+        self.stdout.write(self.style.MIGRATE_HEADING(line))
@@ -0,0 +1,82 @@
+"""
+Report reply latency percentiles per company and per pipeline stage.
+
+Reads `latency_ms` and `stage_timings` of assistant messages.
+
+Usage:
+    uv run python manage.py latency_report --hours 24
+    uv run python manage.py latency_report --company acme --hours 1
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.constants import MessageRole
+from api.models.message import Message
+from api.utils.timing import percentile
+
+PERCENTILES = (50, 95, 99)
+
+
+class Command(BaseCommand):
+    help = "Show p50/p95/p99 reply latency per company and per stage over a time window"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=float,
+            default=24,
+            help="Time window, in hours back from now",
+        )
+        parser.add_argument(
+            "--company",
+            help="Only report this company (slug)",
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options["hours"])
+        messages = Message.objects.filter(
+            role=MessageRole.ASSISTANT,
+            created_at__gte=since,
+            latency_ms__isnull=False,
+        )
+        if options["company"]:
+            messages = messages.filter(conversation__company__slug=options["company"])
+
+        # company -> stage -> durations ("total" is latency_ms)
+        samples: dict[str, dict[str, list[int]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+        for company, latency_ms, stage_timings in messages.values_list(
+            "conversation__company__name", "latency_ms", "stage_timings"
+        ).iterator():
+            samples[company]["total"].append(latency_ms)
+            for stage, duration_ms in (stage_timings or {}).items():
+                if stage != "total":
+                    samples[company][stage].append(duration_ms)
+
+        if not samples:
+            self.stdout.write(f"No replies with latency since {since:%Y-%m-%d %H:%M}")
+            return
+
+        header = f"  {'STAGE':<20} {'COUNT':>7}" + "".join(
+            f" {f'P{p}':>8}" for p in PERCENTILES
+        )
+        for company in sorted(samples):
+            stages = samples[company]
+            self.stdout.write(self.style.MIGRATE_HEADING(company))
+            self.stdout.write(header)
+            # End-to-end first, then stages slowest first
+            ordered = ["total"] + sorted(
+                (stage for stage in stages if stage != "total"),
+                key=lambda stage: -percentile(sorted(stages[stage]), 50),
+            )
+            for stage in ordered:
+                values = sorted(stages[stage])
+                self.stdout.write(
+                    f"  {stage:<20} {len(values):>7}"
+                    + "".join(f" {percentile(values, p):>6}ms" for p in PERCENTILES)
+                )
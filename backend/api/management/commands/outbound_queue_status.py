@@ -0,0 +1,61 @@
+"""
+Show the outbound WhatsApp message backlog.
+
+Usage:
+    uv run python manage.py outbound_queue_status
+    uv run python manage.py outbound_queue_status --requeue-dead [--phone-number-id ID]
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.constants import OutboundMessagePriority, OutboundMessageStatus
+from services.outbound_queue_service import get_backlog_stats, requeue_dead_messages
+
+
+class Command(BaseCommand):
+    help = "Show outbound message backlog depth per phone number, status and priority"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requeue-dead",
+            action="store_true",
+            help="Move dead (dead-lettered) messages back to the queue",
+        )
+        parser.add_argument(
+            "--phone-number-id",
+            help="Only requeue messages from this WhatsApp Business Phone Number ID",
+        )
+
+    def handle(self, *args, **options):
+        if options["requeue_dead"]:
+            count = requeue_dead_messages(options["phone_number_id"])
+            self.stdout.write(self.style.SUCCESS(f"Requeued {count} dead messages"))
+
+        rows = get_backlog_stats()
+        if not rows:
+            self.stdout.write("Outbound queue is empty")
+            return
+
+        now = timezone.now()
+        self.stdout.write(
+            f"{'PHONE NUMBER ID':<20} {'STATUS':<10} {'PRIORITY':<20} {'COUNT':>7} {'OLDEST':>10}"
+        )
+        for row in rows:
+            age = int((now - row["oldest"]).total_seconds())
+            line = (
+                f"{row['phone_number_id']:<20} {row['status']:<10} "
+                f"{OutboundMessagePriority(row['priority']).label:<20} "
+                f"{row['count']:>7} {age:>9}s"
+            )
+            if row["status"] == OutboundMessageStatus.DEAD:
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+
+        total = sum(
+            row["count"] for row in rows if row["status"] != OutboundMessageStatus.DEAD
+        )
+        dead = sum(
+            row["count"] for row in rows if row["status"] == OutboundMessageStatus.DEAD
+        )
+        self.stdout.write(f"Backlog: {total} queued, {dead} dead")
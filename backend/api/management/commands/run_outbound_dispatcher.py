@@ -0,0 +1,211 @@
+"""
+Dispatcher that sends queued outbound WhatsApp messages.
+
+Messages are claimed highest priority first and throttled with a token
+bucket per business phone number, so a burst of replies from one company
+cannot exceed Meta's throughput limits or starve other numbers. Rate
+limits are enforced per dispatcher process: run a single dispatcher, or
+divide WHATSAPP_OUTBOUND_RATE between them.
+
+Usage:
+    uv run python manage.py run_outbound_dispatcher --rate 20 --burst 20
+"""
+
+import asyncio
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from api.management.worker import AsyncWorkerCommand
+from api.models.outbound_message import OutboundMessage
+from api.utils.async_db import database_sync_to_async
+from api.utils.metrics import MESSAGES
+from api.utils.rate_limiter import RateLimiter
+from api.utils.timing import StageTimer
+from api.utils.whatsapp_sender import aclose_async_client, get_sender
+from api.views.metrics import QueueDepthCollector
+from services.outbound_queue_service import (
+    claim_outbound_messages,
+    complete_outbound_message,
+    defer_outbound_messages,
+    fail_outbound_message,
+)
+
+logger = logging.getLogger(__name__)
+
+# Wait this long after a 429 without Retry-After
+RATE_LIMITED_PAUSE_SECONDS = 1.0
+
+
+async def send_outbound_message(message: OutboundMessage, limiter: RateLimiter) -> None:
+    """
+    Send a single message and record its outcome.
+
+    Messages to one recipient are claimed one at a time (see
+    claim_outbound_messages()), so multi-part replies arrive in order.
+    """
+    timer = StageTimer(message.stage_timings)
+    timer.record(
+        "outbound_wait", (timezone.now() - message.created_at).total_seconds() * 1000
+    )
+
+    try:
+        # No in-process retries: failures go back to the queue with backoff
+        with timer.stage("send"):
+            result = await get_sender().asend_message(
+                phone_number_id=message.phone_number_id,
+                to_number=message.to_number,
+                text=message.text,
+                max_retries=0,
+            )
+    except Exception as e:
+        logger.error(f"Error sending outbound message {message.pk}: {e}", exc_info=True)
+        await database_sync_to_async(fail_outbound_message)(message, str(e))
+        return
+
+    if result.success:
+        MESSAGES.labels(message.company.slug, "outbound").inc()
+        await database_sync_to_async(complete_outbound_message)(message, timer)
+        if message.typing_message_id:
+            # More parts of the reply follow: keep showing the typing indicator
+            await get_sender().asend_typing_indicator(
+                message.phone_number_id, message.to_number, message.typing_message_id
+            )
+        return
+
+    if result.status_code == 429:
+        limiter.pause(
+            message.phone_number_id, result.retry_after or RATE_LIMITED_PAUSE_SECONDS
+        )
+
+    if result.status_code is None:
+        # Without a response (e.g. a read timeout) Meta may have delivered the
+        # message: only resend when the connection was never made
+        permanent = not result.connect_failed
+    else:
+        # Other 4xx errors (invalid recipient, expired window...) won't succeed on retry
+        permanent = 400 <= result.status_code < 500 and result.status_code != 429
+    await database_sync_to_async(fail_outbound_message)(
+        message,
+        f"HTTP {result.status_code}: {result.error}",
+        retry_after=result.retry_after,
+        permanent=permanent,
+    )
+
+
+class Command(AsyncWorkerCommand):
+    help = "Send queued outbound WhatsApp messages, rate limited per phone number"
+    worker_name = "outbound dispatcher"
+
+    def get_metrics_collectors(self) -> list:
+        # The app's metrics port only aggregates gunicorn workers, so the
+        # (single) dispatcher reports the queue backlogs
+        return [QueueDepthCollector()]
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=settings.WHATSAPP_OUTBOUND_RATE,
+            help="Sustained messages per second, per business phone number",
+        )
+        parser.add_argument(
+            "--burst",
+            type=int,
+            default=settings.WHATSAPP_OUTBOUND_BURST,
+            help="Burst size, per business phone number",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.WHATSAPP_OUTBOUND_CONCURRENCY,
+            help="Maximum number of sends in flight",
+        )
+        parser.add_argument(
+            "--db-threads",
+            type=int,
+            default=settings.WHATSAPP_WORKER_DB_THREADS,
+            help="Threads (and database connections) used for ORM calls",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.WHATSAPP_WORKER_POLL_INTERVAL,
+            help="Seconds to wait when the queue is empty",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Send everything currently due and exit",
+        )
+
+    def handle(self, *args, **options):
+        asyncio.run(
+            self.run(
+                limiter=RateLimiter(
+                    rate=max(0.01, options["rate"]), capacity=max(1, options["burst"])
+                ),
+                concurrency=max(1, options["concurrency"]),
+                db_threads=max(1, options["db_threads"]),
+                poll_interval=options["poll_interval"],
+                once=options["once"],
+            )
+        )
+
+    async def run(
+        self,
+        limiter: RateLimiter,
+        concurrency: int,
+        db_threads: int,
+        poll_interval: float,
+        once: bool,
+    ) -> None:
+        stopping = self.setup_loop(db_threads)
+
+        logger.info(
+            f"Outbound dispatcher started (rate: {limiter.rate}/s, burst: {limiter.capacity}, "
+            f"concurrency: {concurrency})"
+        )
+
+        in_flight: set[asyncio.Task] = set()
+
+        while not stopping.is_set():
+            messages = await database_sync_to_async(claim_outbound_messages)(
+                limit=concurrency - len(in_flight)
+            )
+
+            # Release messages from throttled numbers until they have tokens again
+            deferred: dict[float, list[OutboundMessage]] = {}
+            for message in messages:
+                wait = limiter.try_acquire(message.phone_number_id)
+                if wait:
+                    deferred.setdefault(round(wait, 1), []).append(message)
+                else:
+                    in_flight.add(
+                        asyncio.create_task(send_outbound_message(message, limiter))
+                    )
+            for wait, throttled in deferred.items():
+                await database_sync_to_async(defer_outbound_messages)(
+                    throttled, timedelta(seconds=wait)
+                )
+
+            if not in_flight:
+                if once and not deferred:
+                    break
+                await self._sleep(stopping, poll_interval)
+                continue
+
+            # Wait for a free slot, but keep polling for new messages
+            _, in_flight = await asyncio.wait(
+                in_flight, timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED
+            )
+
+        # Let in-flight sends finish before exiting
+        if in_flight:
+            await asyncio.wait(in_flight)
+
+        await aclose_async_client()
+        logger.info("Outbound dispatcher stopped")
@@ -0,0 +1,214 @@
+"""
+Background worker that drains queued WhatsApp webhook jobs, sends the
+debounced replies they schedule and updates conversation summaries. Once
+an hour it also purges processed webhook jobs and sent outbound messages
+older than WHATSAPP_QUEUE_RETENTION_DAYS.
+
+The worker runs an asyncio event loop: LLM and WhatsApp calls are awaited,
+so `--concurrency` jobs can be in flight at once while ORM calls share a
+small thread pool (`--db-threads`, one database connection per thread).
+
+Usage:
+    uv run python manage.py run_whatsapp_worker --concurrency 100
+"""
+
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from api.management.worker import AsyncWorkerCommand
+from api.models.conversation import Conversation
+from api.models.webhook_job import WebhookJob
+from api.utils.async_db import database_sync_to_async
+from api.utils.timing import StageTimer
+from api.utils.whatsapp_sender import aclose_async_client
+from services.conversation_service import (
+    claim_due_conversations,
+    claim_due_summaries,
+    schedule_reply,
+)
+from services.integrations.ispcube.service import aclose_ispcube_clients
+from services.llm_service import awarm_up_gemini_client
+from services.outbound_queue_service import purge_outbound_messages
+from services.summary_service import asummarize_conversation
+from services.webhook_job_service import (
+    claim_webhook_jobs,
+    complete_webhook_job,
+    fail_webhook_job,
+    purge_webhook_jobs,
+)
+from services.whatsapp_service import process_webhook_payload, reply_to_conversation
+
+logger = logging.getLogger(__name__)
+
+REPLY_RETRY_DELAY = timedelta(seconds=30)
+
+# A wall-clock gap this long between polls means the machine was suspended
+RESUME_GAP_SECONDS = 60
+
+PURGE_INTERVAL_SECONDS = 3600
+
+
+async def run_job(job: WebhookJob) -> None:
+    """Process a single job and record its outcome."""
+    timer = StageTimer()
+    timer.record("queue_wait", (timezone.now() - job.created_at).total_seconds() * 1000)
+    try:
+        await process_webhook_payload(job.payload, timer)
+        await database_sync_to_async(complete_webhook_job)(job)
+    except Exception as e:
+        logger.error(f"Error processing webhook job {job.pk}: {e}", exc_info=True)
+        await database_sync_to_async(fail_webhook_job)(job, str(e))
+
+
+async def run_reply(conversation: Conversation) -> None:
+    """Reply to a conversation, retrying later on errors."""
+    try:
+        await reply_to_conversation(conversation)
+    except Exception as e:
+        logger.error(
+            f"Error replying to conversation {conversation.pk}: {e}", exc_info=True
+        )
+        await database_sync_to_async(schedule_reply)(conversation, REPLY_RETRY_DELAY)
+
+
+async def run_summary(conversation: Conversation) -> None:
+    """Update a conversation summary; the next truncated reply retries on errors."""
+    try:
+        await asummarize_conversation(conversation)
+    except Exception as e:
+        logger.error(
+            f"Error summarizing conversation {conversation.pk}: {e}", exc_info=True
+        )
+
+
+async def warm_up() -> None:
+    """Warm up the LLM client so the next reply finds an open connection."""
+    try:
+        await awarm_up_gemini_client()
+    except Exception as e:
+        logger.warning(f"Gemini client warm-up failed: {e}")
+
+
+def purge_queues() -> None:
+    """Delete processed webhook jobs and sent messages past their retention."""
+    older_than = timedelta(days=settings.WHATSAPP_QUEUE_RETENTION_DAYS)
+    jobs = purge_webhook_jobs(older_than)
+    messages = purge_outbound_messages(older_than)
+    if jobs or messages:
+        logger.info(f"Purged {jobs} webhook jobs and {messages} outbound messages")
+
+
+async def run_purge() -> None:
+    """Purge the queues; the next interval retries on errors."""
+    try:
+        await database_sync_to_async(purge_queues)()
+    except Exception as e:
+        logger.error(f"Error purging queues: {e}", exc_info=True)
+
+
+class Command(AsyncWorkerCommand):
+    help = "Process queued WhatsApp webhook jobs, due replies and due summaries"
+    worker_name = "WhatsApp worker"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.WHATSAPP_WORKER_CONCURRENCY,
+            help="Maximum number of jobs and replies in flight",
+        )
+        parser.add_argument(
+            "--db-threads",
+            type=int,
+            default=settings.WHATSAPP_WORKER_DB_THREADS,
+            help="Threads (and database connections) used for ORM calls",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.WHATSAPP_WORKER_POLL_INTERVAL,
+            help="Seconds to wait when the queue is empty",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the queue and due replies once and exit",
+        )
+
+    def handle(self, *args, **options):
+        asyncio.run(
+            self.run(
+                concurrency=max(1, options["concurrency"]),
+                db_threads=max(1, options["db_threads"]),
+                poll_interval=options["poll_interval"],
+                once=options["once"],
+            )
+        )
+
+    async def run(
+        self, concurrency: int, db_threads: int, poll_interval: float, once: bool
+    ) -> None:
+        stopping = self.setup_loop(db_threads)
+
+        logger.info(
+            f"WhatsApp worker started (concurrency: {concurrency}, "
+            f"db threads: {db_threads})"
+        )
+
+        in_flight: set[asyncio.Task] = set()
+        if not once:
+            in_flight.add(asyncio.create_task(warm_up()))
+        last_poll = time.time()
+        last_purge = 0.0
+
+        while not stopping.is_set():
+            if time.time() - last_poll > RESUME_GAP_SECONDS:
+                logger.info("Resumed after suspension, warming up LLM client")
+                in_flight.add(asyncio.create_task(warm_up()))
+            last_poll = time.time()
+            if not once and last_poll - last_purge > PURGE_INTERVAL_SECONDS:
+                in_flight.add(asyncio.create_task(run_purge()))
+                last_purge = last_poll
+
+            jobs = await database_sync_to_async(claim_webhook_jobs)(
+                limit=concurrency - len(in_flight)
+            )
+            for job in jobs:
+                in_flight.add(asyncio.create_task(run_job(job)))
+
+            conversations = await database_sync_to_async(claim_due_conversations)(
+                limit=concurrency - len(in_flight)
+            )
+            for conversation in conversations:
+                in_flight.add(asyncio.create_task(run_reply(conversation)))
+
+            conversations = await database_sync_to_async(claim_due_summaries)(
+                limit=concurrency - len(in_flight)
+            )
+            for conversation in conversations:
+                in_flight.add(asyncio.create_task(run_summary(conversation)))
+
+            if not in_flight:
+                if once:
+                    break
+                await self._sleep(stopping, poll_interval)
+                continue
+
+            # Wait for a free slot, but keep polling for new jobs
+            _, in_flight = await asyncio.wait(
+                in_flight, timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED
+            )
+
+        # Let in-flight jobs finish before exiting
+        if in_flight:
+            await asyncio.wait(in_flight)
+
+        await aclose_async_client()
+        await aclose_ispcube_clients()
+        logger.info("WhatsApp worker stopped")
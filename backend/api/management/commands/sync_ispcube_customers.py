@@ -0,0 +1,72 @@
+"""
+Sync customers from ISPCube into Customer.
+
+Later runs only write customers ISPCube updated since the previous
+complete sync of each integration; use --full to rewrite them all.
+
+Usage:
+    uv run python manage.py sync_ispcube_customers
+    uv run python manage.py sync_ispcube_customers --company-id 1 [--subdomain myisp] [--full]
+"""
+
+import asyncio
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import ISPCubeIntegration
+from services.integrations.base import IntegrationError
+from services.integrations.ispcube.sync import sync_ispcube_customers
+
+
+class Command(BaseCommand):
+    help = "Create or update customers from the active ISPCube integrations"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--company-id",
+            type=int,
+            help="Only sync the integrations of this company",
+        )
+        parser.add_argument(
+            "--subdomain",
+            help="Only sync the integration with this ISPCube subdomain",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Rewrite every customer instead of only those updated since the last sync",
+        )
+
+    def handle(self, *args, **options):
+        integrations = ISPCubeIntegration.objects.filter(is_active=True).select_related(
+            "company"
+        )
+        if options["company_id"]:
+            integrations = integrations.filter(company_id=options["company_id"])
+        if options["subdomain"]:
+            integrations = integrations.filter(subdomain=options["subdomain"])
+
+        integrations = list(integrations)
+        if not integrations:
+            raise CommandError("No active ISPCube integration matches")
+
+        failed = 0
+        for integration in integrations:
+            try:
+                result = asyncio.run(
+                    sync_ispcube_customers(integration, full=options["full"])
+                )
+            except IntegrationError as e:
+                failed += 1
+                self.stderr.write(self.style.ERROR(f"{integration}: sync failed: {e}"))
+                continue
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{integration}: {result.fetched} fetched, {result.written} written, "
+                    f"{result.unchanged} unchanged, {result.skipped} skipped"
+                )
+            )
+
+        if failed:
+            raise CommandError(f"{failed} of {len(integrations)} syncs failed")
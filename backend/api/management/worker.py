@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import signal
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from api.utils.metrics import start_metrics_server
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncWorkerCommand(BaseCommand):
+    """
+    Base for long-running asyncio worker commands.
+
+    Provides the executor used for ORM calls, graceful shutdown on
+    SIGTERM/SIGINT, an interruptible sleep and an optional Prometheus
+    metrics server (`--metrics-port`).
+    """
+
+    worker_name = "Worker"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--metrics-port",
+            type=int,
+            default=None,
+            help="Serve Prometheus metrics on this port",
+        )
+
+    def get_metrics_collectors(self) -> list:
+        """Extra collectors for the metrics server, evaluated at scrape time."""
+        return []
+
+    def execute(self, *args, **options):
+        if options.get("metrics_port"):
+            start_metrics_server(
+                options["metrics_port"], *self.get_metrics_collectors()
+            )
+        return super().execute(*args, **options)
+
+    def setup_loop(self, db_threads: int) -> asyncio.Event:
+        """
+        Configure the running event loop.
+
+        Args:
+            db_threads: Threads (and database connections) used for ORM calls
+
+        Returns:
+            asyncio.Event: Set when the worker is asked to stop
+        """
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(
+            ThreadPoolExecutor(max_workers=db_threads, thread_name_prefix="db")
+        )
+
+        stopping = asyncio.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, self._request_stop, stopping)
+        return stopping
+
+    async def _sleep(self, stopping: asyncio.Event, seconds: float) -> None:
+        """Sleep until the timeout or a stop request, whichever comes first."""
+        try:
+            await asyncio.wait_for(stopping.wait(), timeout=seconds)
+        except TimeoutError:
+            pass
+
+    def _request_stop(self, stopping: asyncio.Event) -> None:
+        logger.info(f"Stopping {self.worker_name} after in-flight tasks finish")
+        stopping.set()
@@ -0,0 +1,75 @@
+"""
+Count database queries per HTTP request.
+
+Every connection gets an execute wrapper (installed on `connection_created`,
+see api.signals) that increments the counter of the current request. The
+counter lives in a context variable, so queries run by async views through
+sync_to_async in other threads are counted too. track_queries() blocks can
+be nested (e.g. a benchmark around whole requests).
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.utils.decorators import sync_and_async_middleware
+
+from api.utils.metrics import REQUEST_DB_QUERIES
+
+# Counters of the enclosing track_queries() blocks, innermost last
+_query_counters: ContextVar[tuple[list[int], ...]] = ContextVar(
+    "query_counters", default=()
+)
+
+
+def count_queries(execute, sql, params, many, context):
+    """Connection execute wrapper incrementing the current counters."""
+    for counter in _query_counters.get():
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+@contextmanager
+def track_queries() -> Iterator[list[int]]:
+    """
+    Count the queries run in the block, including awaited ORM calls.
+
+    Yields:
+        list[int]: Single-item list holding the running count
+    """
+    counter = [0]
+    token = _query_counters.set((*_query_counters.get(), counter))
+    try:
+        yield counter
+    finally:
+        _query_counters.reset(token)
+
+
+def _observe(request, counter: list[int]) -> None:
+    match = getattr(request, "resolver_match", None)
+    REQUEST_DB_QUERIES.labels(match.view_name if match else "unmatched").observe(
+        counter[0]
+    )
+
+
+@sync_and_async_middleware
+def query_count_middleware(get_response):
+    """Record the number of database queries of each request."""
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            with track_queries() as counter:
+                response = await get_response(request)
+            _observe(request, counter)
+            return response
+
+    else:
+
+        def middleware(request):
+            with track_queries() as counter:
+                response = get_response(request)
+            _observe(request, counter)
+            return response
+
+    return middleware
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:49
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0026_update_ispcube_integration_help_text"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WebhookJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "payload",
+                    models.JSONField(
+                        help_text="Raw webhook payload as received from WhatsApp"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("processing", "Processing"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Number of processing attempts"
+                    ),
+                ),
+                (
+                    "available_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="Earliest time the job can be processed",
+                    ),
+                ),
+                (
+                    "locked_at",
+                    models.DateTimeField(
+                        blank=True, help_text="When a worker claimed the job", null=True
+                    ),
+                ),
+                (
+                    "last_error",
+                    models.TextField(
+                        blank=True, help_text="Error from the last failed attempt"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Webhook Job",
+                "verbose_name_plural": "Webhook Jobs",
+                "ordering": ["created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "available_at"],
+                        name="api_webhook_status_c938bb_idx",
+                    )
+                ],
+            },
+        ),
+    ]
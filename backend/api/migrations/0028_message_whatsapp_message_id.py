@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0027_webhookjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="whatsapp_message_id",
+            field=models.CharField(
+                blank=True,
+                help_text="WhatsApp message ID (wamid) of inbound messages, used to ignore redeliveries",
+                max_length=255,
+                null=True,
+                unique=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:52
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0028_message_whatsapp_message_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="companyconfig",
+            name="reply_debounce_ms",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Wait this long (ms) after a customer message for more fragments before replying once to all of them (0 replies right away)",
+                validators=[django.core.validators.MaxValueValidator(30000)],
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="reply_due_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When the pending customer messages should be answered (debounced)",
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                fields=["reply_due_at"], name="api_convers_reply_d_281bf9_idx"
+            ),
+        ),
+    ]
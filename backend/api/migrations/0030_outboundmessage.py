@@ -0,0 +1,134 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:59
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0029_reply_debounce"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboundMessage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "phone_number_id",
+                    models.CharField(
+                        help_text="WhatsApp Business Phone Number ID to send from",
+                        max_length=255,
+                    ),
+                ),
+                (
+                    "to_number",
+                    models.CharField(help_text="Recipient phone number", max_length=20),
+                ),
+                ("text", models.TextField()),
+                (
+                    "tokens_used",
+                    models.IntegerField(
+                        default=0, help_text="Tokens used to generate the message"
+                    ),
+                ),
+                (
+                    "priority",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (0, "Bulk"),
+                            (10, "Template"),
+                            (20, "Conversation Reply"),
+                        ],
+                        default=0,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("sending", "Sending"),
+                            ("sent", "Sent"),
+                            ("dead", "Dead (gave up)"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Number of failed send attempts"
+                    ),
+                ),
+                (
+                    "available_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="Earliest time the message can be sent",
+                    ),
+                ),
+                (
+                    "locked_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="When a dispatcher claimed the message",
+                        null=True,
+                    ),
+                ),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "last_error",
+                    models.TextField(
+                        blank=True, help_text="Error from the last failed attempt"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="outbound_messages",
+                        to="api.company",
+                    ),
+                ),
+                (
+                    "conversation",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Conversation the message replies to (stored as assistant message once sent)",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="outbound_messages",
+                        to="api.conversation",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Outbound Message",
+                "verbose_name_plural": "Outbound Messages",
+                "ordering": ["created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "priority", "available_at"],
+                        name="api_outboun_status_030db0_idx",
+                    ),
+                    models.Index(
+                        fields=["phone_number_id", "status"],
+                        name="api_outboun_phone_n_36ef2d_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
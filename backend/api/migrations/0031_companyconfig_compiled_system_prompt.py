@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:01
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def compile_system_prompts(apps, schema_editor):
+    """Materialize the system prompt of existing configs (mirrors CompanyConfig.build_system_prompt)."""
+    CompanyConfig = apps.get_model("api", "CompanyConfig")
+    for config in CompanyConfig.objects.select_related("company__sector"):
+        prompt = config.system_prompt.replace("{company_name}", config.company.name)
+        sector = config.company.sector
+        if sector and sector.system_prompt:
+            prompt = f"{sector.system_prompt}\n\n{prompt}"
+        config.compiled_system_prompt = prompt
+        config.prompt_version = hashlib.sha256(prompt.encode()).hexdigest()[:16]
+        config.save(update_fields=["compiled_system_prompt", "prompt_version"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0030_outboundmessage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="companyconfig",
+            name="compiled_system_prompt",
+            field=models.TextField(
+                blank=True,
+                editable=False,
+                help_text="Final system instruction (sector + company prompt), rebuilt when the company, config or sector changes",
+            ),
+        ),
+        migrations.AddField(
+            model_name="companyconfig",
+            name="prompt_version",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Hash of the compiled system prompt, for caches keyed on it",
+                max_length=16,
+            ),
+        ),
+        migrations.RunPython(compile_system_prompts, migrations.RunPython.noop),
+    ]
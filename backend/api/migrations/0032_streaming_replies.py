@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0031_companyconfig_compiled_system_prompt"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="companyconfig",
+            name="stream_replies",
+            field=models.BooleanField(
+                default=False,
+                help_text="Send long replies in several messages as they are generated (sentence/paragraph chunks) instead of waiting for the full text",
+            ),
+        ),
+        migrations.AddField(
+            model_name="outboundmessage",
+            name="typing_message_id",
+            field=models.CharField(
+                blank=True,
+                help_text="WhatsApp message ID to show the typing indicator for once sent (more messages follow)",
+                max_length=255,
+            ),
+        ),
+    ]
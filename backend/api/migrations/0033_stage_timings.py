@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0032_streaming_replies"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="stage_timings",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="Duration in milliseconds of each pipeline stage (queue_wait, llm, send...)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="outboundmessage",
+            name="received_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When the customer message being answered was received, for end-to-end latency",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="outboundmessage",
+            name="stage_timings",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="Duration in milliseconds of each pipeline stage before queueing",
+            ),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:18
+
+from django.db import migrations, models
+
+
+def deactivate_duplicate_conversations(apps, schema_editor):
+    """Keep only the most recently started active conversation of each customer."""
+    Conversation = apps.get_model("api", "Conversation")
+    seen = set()
+    duplicates = []
+    for pk, customer_id in (
+        Conversation.objects.filter(is_active=True)
+        .order_by("customer_id", "-started_at", "-id")
+        .values_list("id", "customer_id")
+    ):
+        if customer_id in seen:
+            duplicates.append(pk)
+        seen.add(customer_id)
+    Conversation.objects.filter(pk__in=duplicates).update(is_active=False)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0033_stage_timings"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            deactivate_duplicate_conversations, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name="conversation",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_active", True)),
+                fields=("customer",),
+                name="unique_active_conversation_per_customer",
+            ),
+        ),
+    ]
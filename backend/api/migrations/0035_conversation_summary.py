@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:23
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0034_unique_active_conversation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="companyconfig",
+            name="history_token_budget",
+            field=models.PositiveIntegerField(
+                default=2000,
+                help_text="Approximate tokens of conversation history sent with each message. Older messages are replaced by a summary",
+                validators=[
+                    django.core.validators.MinValueValidator(500),
+                    django.core.validators.MaxValueValidator(32000),
+                ],
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="summary",
+            field=models.TextField(
+                blank=True,
+                help_text="Rolling summary of the messages that no longer fit in the history token budget",
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="summary_due_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When the summary should be brought up to date",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="summary_through",
+            field=models.PositiveBigIntegerField(
+                blank=True,
+                help_text="ID of the newest message covered by the summary",
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                fields=["summary_due_at"], name="api_convers_summary_a90569_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0035_conversation_summary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ispcubeintegration",
+            name="customers_synced_through",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="ISPCube update time of the newest customer synced (incremental syncs start from it)",
+                null=True,
+            ),
+        ),
+    ]
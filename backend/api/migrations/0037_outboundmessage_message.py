@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0036_ispcubeintegration_customers_synced_through"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outboundmessage",
+            name="message",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Assistant message this delivers (saved when the reply is queued)",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="outbound_messages",
+                to="api.message",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="outboundmessage",
+            name="conversation",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Conversation the message replies to (its latency is recorded once sent)",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="outbound_messages",
+                to="api.conversation",
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0037_outboundmessage_message"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="outboundmessage",
+            index=models.Index(
+                fields=["phone_number_id", "to_number", "status"],
+                name="api_outboun_phone_n_0d712b_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0038_outboundmessage_recipient_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["conversation", "updated_at"],
+                name="api_message_convers_8b82f1_idx",
+            ),
+        ),
+    ]
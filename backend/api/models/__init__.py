@@ -8,9 +8,11 @@ from .feedback import Feedback
 from .ispcube_integration import ISPCubeIntegration
 from .knowledge_base import KnowledgeBase
 from .message import Message
+from .outbound_message import OutboundMessage
 from .sector import Sector
 from .template import Template
 from .tool_call_log import ToolCallLog
+from .webhook_job import WebhookJob
 
 __all__ = [
     "AgentHandoff",
@@ -23,7 +25,9 @@ __all__ = [
     "ISPCubeIntegration",
     "KnowledgeBase",
     "Message",
+    "OutboundMessage",
     "Sector",
     "Template",
     "ToolCallLog",
+    "WebhookJob",
 ]
@@ -1,3 +1,5 @@
+import hashlib
+
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
@@ -22,6 +24,31 @@ class CompanyConfig(models.Model):
         validators=[MinValueValidator(0.0), MaxValueValidator(2.0)],
         help_text="Creativity level (0.0-2.0). Lower is more focused, higher is more creative."
     )
+    reply_debounce_ms = models.PositiveIntegerField(
+        default=0,
+        validators=[MaxValueValidator(30000)],
+        help_text="Wait this long (ms) after a customer message for more fragments before replying once to all of them (0 replies right away)",
+    )
+    stream_replies = models.BooleanField(
+        default=False,
+        help_text="Send long replies in several messages as they are generated (sentence/paragraph chunks) instead of waiting for the full text",
+    )
+    history_token_budget = models.PositiveIntegerField(
+        default=2000,
+        validators=[MinValueValidator(500), MaxValueValidator(32000)],
+        help_text="Approximate tokens of conversation history sent with each message. Older messages are replaced by a summary",
+    )
+    compiled_system_prompt = models.TextField(
+        blank=True,
+        editable=False,
+        help_text="Final system instruction (sector + company prompt), rebuilt when the company, config or sector changes",
+    )
+    prompt_version = models.CharField(
+        max_length=16,
+        blank=True,
+        editable=False,
+        help_text="Hash of the compiled system prompt, for caches keyed on it",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -32,18 +59,56 @@ class CompanyConfig(models.Model):
     def __str__(self) -> str:
         return f"{self.company.name} - Config"
 
-    def get_system_prompt(self) -> str:
+    def save(self, *args, **kwargs):
+        self.compile_system_prompt()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {
+                *update_fields,
+                "compiled_system_prompt",
+                "prompt_version",
+            }
+        super().save(*args, **kwargs)
+
+    def build_system_prompt(self) -> str:
         """
-        Get system prompt with company name interpolated.
+        Build system prompt with company name interpolated.
         If company has a sector with system_prompt, prepends sector prompt.
         """
         # Start with company-specific prompt
         company_prompt = self.system_prompt.replace("{company_name}", self.company.name)
-        
+
         # Prepend sector prompt if available
         if self.company.sector and self.company.sector.system_prompt:
             sector_prompt = self.company.sector.system_prompt
             return f"{sector_prompt}\n\n{company_prompt}"
-        
+
         return company_prompt
 
+    def compile_system_prompt(self) -> None:
+        """Materialize the system prompt and its version (does not save)."""
+        self.compiled_system_prompt = self.build_system_prompt()
+        self.prompt_version = hashlib.sha256(
+            self.compiled_system_prompt.encode()
+        ).hexdigest()[:16]
+
+    def get_system_prompt(self) -> str:
+        """Get the compiled system prompt, building it if it was never compiled."""
+        return self.compiled_system_prompt or self.build_system_prompt()
+
+    @classmethod
+    def recompile_system_prompts(cls, configs: models.QuerySet) -> None:
+        """
+        Rebuild the compiled prompt of several configs.
+
+        Uses queryset updates, so post_save signals are not sent.
+
+        Args:
+            configs: CompanyConfig queryset to rebuild
+        """
+        for config in configs.select_related("company__sector"):
+            config.compile_system_prompt()
+            cls.objects.filter(pk=config.pk).update(
+                compiled_system_prompt=config.compiled_system_prompt,
+                prompt_version=config.prompt_version,
+            )
@@ -23,6 +23,25 @@ class Conversation(models.Model):
     last_message_at = models.DateTimeField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
     total_messages = models.PositiveIntegerField(default=0)
+    reply_due_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When the pending customer messages should be answered (debounced)",
+    )
+    summary = models.TextField(
+        blank=True,
+        help_text="Rolling summary of the messages that no longer fit in the history token budget",
+    )
+    summary_through = models.PositiveBigIntegerField(
+        blank=True,
+        null=True,
+        help_text="ID of the newest message covered by the summary",
+    )
+    summary_due_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When the summary should be brought up to date",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -35,6 +54,17 @@ class Conversation(models.Model):
             models.Index(fields=["company", "last_message_at"]),
             models.Index(fields=["customer", "created_at"]),
             models.Index(fields=["company", "status"]),
+            models.Index(fields=["reply_due_at"]),
+            models.Index(fields=["summary_due_at"]),
+        ]
+        constraints = [
+            # A customer has at most one active conversation; ingestion
+            # upserts on it (see conversation_service._store_messages)
+            models.UniqueConstraint(
+                fields=["customer"],
+                condition=models.Q(is_active=True),
+                name="unique_active_conversation_per_customer",
+            ),
         ]
 
     def __str__(self) -> str:
@@ -1,6 +1,7 @@
 from django.db import models
 
 from api.fields import E164PhoneNumberField
+from api.utils.phone import normalize_phone
 
 
 class Customer(models.Model):
@@ -32,17 +33,10 @@ class Customer(models.Model):
         """Override save to format phone to E.164 and validate."""
         # Format phone to E.164 before validation
         if self.phone:
-            import phonenumbers
-            try:
-                parsed = phonenumbers.parse(self.phone, None)
-                if phonenumbers.is_valid_number(parsed):
-                    self.phone = phonenumbers.format_number(
-                        parsed,
-                        phonenumbers.PhoneNumberFormat.E164
-                    )
-            except phonenumbers.NumberParseException:
-                # Let validation handle the error
-                pass
+            phone = normalize_phone(self.phone)
+            if phone.valid:
+                self.phone = phone.e164
+            # Otherwise let validation handle the error
 
         self.full_clean()
         super().save(*args, **kwargs)
@@ -35,6 +35,11 @@ class ISPCubeIntegration(models.Model):
         null=True,
         help_text="Token expiration timestamp (ISPCube tokens are valid for 24 hours)"
     )
+    customers_synced_through = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="ISPCube update time of the newest customer synced (incremental syncs start from it)",
+    )
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -14,9 +14,22 @@ class Message(models.Model):
         choices=MessageRole.choices,
     )
     content = models.TextField()
+    whatsapp_message_id = models.CharField(
+        max_length=255,
+        unique=True,
+        blank=True,
+        null=True,
+        help_text="WhatsApp message ID (wamid) of inbound messages, used to ignore redeliveries",
+    )
     tokens_used = models.PositiveIntegerField(default=0, help_text="Tokens consumed by this message")
     latency_ms = models.PositiveIntegerField(blank=True, null=True, help_text="Response latency in milliseconds")
+    stage_timings = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Duration in milliseconds of each pipeline stage (queue_wait, llm, send...)",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Message"
@@ -25,6 +38,7 @@ class Message(models.Model):
         indexes = [
             models.Index(fields=["conversation", "created_at"]),
             models.Index(fields=["conversation", "role"]),
+            models.Index(fields=["conversation", "updated_at"]),
         ]
 
     def __str__(self) -> str:
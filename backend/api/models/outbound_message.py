@@ -0,0 +1,96 @@
+from django.db import models
+from django.utils import timezone
+
+from api.constants import OutboundMessagePriority, OutboundMessageStatus
+
+
+class OutboundMessage(models.Model):
+    """
+    Durable queue entry for a WhatsApp message waiting to be sent.
+
+    Rows are drained by the `run_outbound_dispatcher` management command,
+    highest priority first, throttled per business phone number. Messages
+    that cannot be delivered after MAX_ATTEMPTS are marked as dead.
+    """
+
+    company = models.ForeignKey(
+        "api.Company",
+        on_delete=models.CASCADE,
+        related_name="outbound_messages",
+    )
+    conversation = models.ForeignKey(
+        "api.Conversation",
+        on_delete=models.SET_NULL,
+        related_name="outbound_messages",
+        blank=True,
+        null=True,
+        help_text="Conversation the message replies to (its latency is recorded once sent)",
+    )
+    message = models.ForeignKey(
+        "api.Message",
+        on_delete=models.SET_NULL,
+        related_name="outbound_messages",
+        blank=True,
+        null=True,
+        help_text="Assistant message this delivers (saved when the reply is queued)",
+    )
+    phone_number_id = models.CharField(
+        max_length=255, help_text="WhatsApp Business Phone Number ID to send from"
+    )
+    to_number = models.CharField(max_length=20, help_text="Recipient phone number")
+    text = models.TextField()
+    tokens_used = models.IntegerField(
+        default=0, help_text="Tokens used to generate the message"
+    )
+    typing_message_id = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text="WhatsApp message ID to show the typing indicator for once sent (more messages follow)",
+    )
+    received_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When the customer message being answered was received, for end-to-end latency",
+    )
+    stage_timings = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Duration in milliseconds of each pipeline stage before queueing",
+    )
+    priority = models.PositiveSmallIntegerField(
+        choices=OutboundMessagePriority.choices,
+        default=OutboundMessagePriority.BULK,
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=OutboundMessageStatus.choices,
+        default=OutboundMessageStatus.PENDING,
+    )
+    attempts = models.PositiveIntegerField(
+        default=0, help_text="Number of failed send attempts"
+    )
+    available_at = models.DateTimeField(
+        default=timezone.now, help_text="Earliest time the message can be sent"
+    )
+    locked_at = models.DateTimeField(
+        blank=True, null=True, help_text="When a dispatcher claimed the message"
+    )
+    sent_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(
+        blank=True, help_text="Error from the last failed attempt"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Outbound Message"
+        verbose_name_plural = "Outbound Messages"
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["status", "priority", "available_at"]),
+            models.Index(fields=["phone_number_id", "status"]),
+            models.Index(fields=["phone_number_id", "to_number", "status"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"Outbound message #{self.pk} to {self.to_number} - {self.get_status_display()}"  # type: ignore[misc]
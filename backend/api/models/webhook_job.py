@@ -0,0 +1,47 @@
+from django.db import models
+from django.utils import timezone
+
+from api.constants import WebhookJobStatus
+
+
+class WebhookJob(models.Model):
+    """
+    Durable queue entry for a WhatsApp webhook payload.
+
+    The webhook view only persists the raw payload and acknowledges Meta;
+    the `run_whatsapp_worker` management command drains these rows.
+    """
+
+    payload = models.JSONField(
+        help_text="Raw webhook payload as received from WhatsApp"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=WebhookJobStatus.choices,
+        default=WebhookJobStatus.PENDING,
+    )
+    attempts = models.PositiveIntegerField(
+        default=0, help_text="Number of processing attempts"
+    )
+    available_at = models.DateTimeField(
+        default=timezone.now, help_text="Earliest time the job can be processed"
+    )
+    locked_at = models.DateTimeField(
+        blank=True, null=True, help_text="When a worker claimed the job"
+    )
+    last_error = models.TextField(
+        blank=True, help_text="Error from the last failed attempt"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Webhook Job"
+        verbose_name_plural = "Webhook Jobs"
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["status", "available_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"Webhook job #{self.pk} - {self.get_status_display()}"  # type: ignore[misc]
@@ -0,0 +1,108 @@
+"""
+Signal handlers keeping derived data and in-process caches in sync with
+the database, and instrumenting database connections.
+
+Connected in ApiConfig.ready().
+"""
+
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from api.middleware import count_queries
+from api.models.company import Company
+from api.models.company_config import CompanyConfig
+from api.models.conversation import Conversation
+from api.models.ispcube_integration import ISPCubeIntegration
+from api.models.message import Message
+from api.models.sector import Sector
+from services.history_cache import invalidate_conversation_history, record_message
+from services.integrations.ispcube.service import evict_ispcube_client
+from services.tenant_cache import (
+    invalidate_company,
+    invalidate_phone_number,
+    invalidate_sector,
+)
+
+
+@receiver(post_save, sender=Company)
+def recompile_company_prompt(sender, instance: Company, **kwargs) -> None:
+    # The compiled prompt embeds the company name and sector prompt
+    CompanyConfig.recompile_system_prompts(
+        CompanyConfig.objects.filter(company=instance)
+    )
+
+
+@receiver(post_save, sender=Sector)
+def recompile_sector_prompts(sender, instance: Sector, **kwargs) -> None:
+    CompanyConfig.recompile_system_prompts(
+        CompanyConfig.objects.filter(company__sector=instance)
+    )
+
+
+@receiver(pre_delete, sender=Sector)
+def remember_sector_companies(sender, instance: Sector, **kwargs) -> None:
+    # Companies lose their sector (SET_NULL) without a post_save
+    instance._company_ids = list(instance.companies.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Sector)
+def recompile_former_sector_prompts(sender, instance: Sector, **kwargs) -> None:
+    company_ids = getattr(instance, "_company_ids", [])
+    CompanyConfig.recompile_system_prompts(
+        CompanyConfig.objects.filter(company_id__in=company_ids)
+    )
+    for company_id in company_ids:
+        invalidate_company(company_id)
+
+
+@receiver([post_save, post_delete], sender=Company)
+def invalidate_company_tenant(sender, instance: Company, **kwargs) -> None:
+    invalidate_company(instance.pk)
+    if instance.whatsapp_phone_id:
+        # Drops a cached "unknown number" as well
+        invalidate_phone_number(instance.whatsapp_phone_id)
+
+
+@receiver([post_save, post_delete], sender=CompanyConfig)
+def invalidate_company_config_tenant(sender, instance: CompanyConfig, **kwargs) -> None:
+    invalidate_company(instance.company_id)
+
+
+@receiver([post_save, post_delete], sender=Sector)
+def invalidate_sector_tenants(sender, instance: Sector, **kwargs) -> None:
+    invalidate_sector(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=ISPCubeIntegration)
+def evict_integration_client(sender, instance: ISPCubeIntegration, **kwargs) -> None:
+    # Credentials or the subdomain may have changed, or it was deactivated
+    evict_ispcube_client(instance.pk)
+
+
+@receiver(post_save, sender=Message)
+def count_saved_message(sender, instance: Message, created: bool, **kwargs) -> None:
+    # total_messages checks the cached history (see services.history_cache);
+    # bulk ingestion bumps it itself
+    if created:
+        Conversation.objects.filter(pk=instance.conversation_id).update(
+            total_messages=F("total_messages") + 1
+        )
+        record_message(instance)
+    else:
+        invalidate_conversation_history(instance.conversation_id)
+
+
+@receiver(post_delete, sender=Message)
+def count_deleted_message(sender, instance: Message, **kwargs) -> None:
+    Conversation.objects.filter(
+        pk=instance.conversation_id, total_messages__gt=0
+    ).update(total_messages=F("total_messages") - 1)
+    invalidate_conversation_history(instance.conversation_id)
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs) -> None:
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
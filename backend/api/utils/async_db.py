@@ -0,0 +1,31 @@
+"""
+Helpers for calling the Django ORM from async code.
+"""
+
+import functools
+from collections.abc import Awaitable, Callable
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def database_sync_to_async[**P, R](func: Callable[P, R]) -> Callable[P, Awaitable[R]]:
+    """
+    Wrap a sync function that uses the ORM so it can be awaited.
+
+    Unlike Django's default `sync_to_async`, calls are not serialized on a
+    single thread: they run on the event loop's default executor, so many
+    coroutines can hit the database in parallel (one connection per executor
+    thread). Stale connections are cleaned up around each call, mirroring the
+    request/response cycle.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(wrapper, thread_sensitive=False)
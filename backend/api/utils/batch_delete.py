@@ -0,0 +1,29 @@
+"""
+Deletion of large querysets in short batches.
+"""
+
+from django.db.models import QuerySet
+
+BATCH_SIZE = 1000
+
+
+def delete_in_batches(queryset: QuerySet, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Delete the rows of a queryset a batch at a time.
+
+    Each batch is its own statement, so purging a large backlog never holds
+    locks for long or blocks the workers writing to the same table.
+
+    Args:
+        queryset: Rows to delete
+        batch_size: Rows deleted per statement
+
+    Returns:
+        int: Number of rows deleted
+    """
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += queryset.model.objects.filter(pk__in=pks).delete()[0]
@@ -0,0 +1,159 @@
+"""
+Prometheus metrics for the messaging pipeline.
+
+Metric updates only touch memory (or, with PROMETHEUS_MULTIPROC_DIR set,
+memory-mapped files shared by the server's worker processes), so they are
+safe on the hot path. Queue depths are read from the database at scrape
+time instead of being tracked on every change (see api.views.metrics).
+"""
+
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+
+from api.utils.timing import add_timing_observer
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+WEBHOOK_REQUESTS = Counter(
+    "whatsapp_webhook_requests_total",
+    "WhatsApp webhook requests",
+    ["method", "outcome"],
+)
+MESSAGES = Counter(
+    "whatsapp_messages_total",
+    "WhatsApp messages stored (inbound) or delivered (outbound) per company",
+    ["company", "direction"],
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_duration_seconds",
+    "Gemini generation latency",
+    ["model", "mode"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Gemini tokens, from usage_metadata",
+    ["model", "kind"],
+)
+WHATSAPP_API_REQUESTS = Counter(
+    "whatsapp_api_requests_total",
+    "WhatsApp Cloud API requests by outcome (status code, or 'error' for network errors)",
+    ["kind", "status_code"],
+)
+WHATSAPP_API_SECONDS = Histogram(
+    "whatsapp_api_request_duration_seconds",
+    "WhatsApp Cloud API request latency",
+    ["kind"],
+    buckets=LATENCY_BUCKETS,
+)
+ISPCUBE_REQUEST_SECONDS = Histogram(
+    "ispcube_request_duration_seconds",
+    "ISPCube API request latency",
+    ["method", "endpoint", "status_code"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries per HTTP request",
+    ["view"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200),
+)
+PIPELINE_STAGE_SECONDS = Histogram(
+    "pipeline_stage_duration_seconds",
+    "Duration of each message pipeline stage (see api.utils.timing)",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def _observe_stage(stage: str, duration_ms: float) -> None:
+    PIPELINE_STAGE_SECONDS.labels(stage).observe(duration_ms / 1000)
+
+
+add_timing_observer(_observe_stage)
+
+
+async def observe_ispcube_request(request) -> None:
+    """httpx request hook: remember when the request started."""
+    request.extensions["metrics_start"] = time.monotonic()
+
+
+async def observe_ispcube_response(response) -> None:
+    """httpx response hook: record the ISPCube request latency."""
+    start = response.request.extensions.get("metrics_start")
+    if start is not None:
+        ISPCUBE_REQUEST_SECONDS.labels(
+            response.request.method,
+            response.request.url.path,
+            str(response.status_code),
+        ).observe(time.monotonic() - start)
+
+
+def build_registry(*collectors) -> CollectorRegistry:
+    """
+    Get a registry with this process's (or, in multiprocess mode, every
+    process's) metrics plus extra collectors.
+
+    Args:
+        *collectors: Additional collectors evaluated at scrape time
+
+    Returns:
+        CollectorRegistry: Registry for generate_latest()
+    """
+    registry = CollectorRegistry()
+    if MULTIPROC_DIR:
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry.register(_DefaultRegistryCollector())
+
+    for collector in collectors:
+        registry.register(collector)
+    return registry
+
+
+class _DefaultRegistryCollector:
+    """Expose the default registry's metrics through another registry."""
+
+    def collect(self):
+        yield from REGISTRY.collect()
+
+
+def render_metrics(*collectors) -> tuple[bytes, str]:
+    """
+    Render the metrics in the Prometheus text exposition format.
+
+    Args:
+        *collectors: Additional collectors evaluated at scrape time
+
+    Returns:
+        tuple: Body and content type
+    """
+    return generate_latest(build_registry(*collectors)), CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: int, *collectors) -> None:
+    """
+    Serve this process's metrics on `port` from a background thread.
+
+    Used by the worker commands, which do not run the web app.
+
+    Args:
+        port: TCP port to listen on
+        *collectors: Additional collectors evaluated at scrape time
+    """
+    start_http_server(port, registry=build_registry(*collectors))
@@ -0,0 +1,114 @@
+"""
+Phone number normalization.
+
+Parsing with `phonenumbers` is comparatively expensive and the same few
+numbers come back on every message, so results are memoized in a bounded
+LRU cache. One lookup gives both forms a number is used in: E.164 for
+storage and the WhatsApp-dialable form for sending.
+"""
+
+import logging
+import re
+from collections.abc import Iterable
+from functools import lru_cache
+from typing import NamedTuple
+
+import phonenumbers
+
+logger = logging.getLogger(__name__)
+
+CACHE_SIZE = 10_000
+
+# Argentina mobile in E.164 digits: 549 + area code + number
+_ARGENTINA_MOBILE = re.compile(r"^549(\d{3})(\d{7})$")
+
+
+class PhoneNumber(NamedTuple):
+    """A normalized phone number."""
+
+    # E.164 (e.g. +5493816378744), or the input if not valid
+    e164: str
+    # Digits WhatsApp Cloud API expects as recipient (e.g. 54381156378744)
+    whatsapp: str
+    valid: bool
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_phone(raw: str, region: str | None = None) -> PhoneNumber:
+    """
+    Normalize a phone number to E.164.
+
+    Args:
+        raw: Phone number in international format ("+" and country code)
+        region: Country code (e.g. "AR") to read numbers without "+" as
+            national numbers of that country (optional)
+
+    Returns:
+        PhoneNumber: E.164 and WhatsApp forms, and whether the number is valid
+    """
+    raw = raw.strip()
+    e164 = raw
+    valid = False
+
+    try:
+        parsed = phonenumbers.parse(raw, region)
+        if phonenumbers.is_valid_number(parsed):
+            e164 = phonenumbers.format_number(
+                parsed, phonenumbers.PhoneNumberFormat.E164
+            )
+            valid = True
+        else:
+            logger.warning(f"Invalid phone number: {raw}")
+    except phonenumbers.NumberParseException:
+        logger.warning(f"Failed to parse phone number: {raw}")
+
+    return PhoneNumber(e164, _to_whatsapp(e164), valid)
+
+
+def normalize_wa_id(wa_id: str) -> PhoneNumber:
+    """
+    Normalize a WhatsApp ID (e.g. a webhook `from` value) to E.164.
+
+    WhatsApp IDs are international numbers without the "+".
+
+    Args:
+        wa_id: WhatsApp ID of the user
+
+    Returns:
+        PhoneNumber: E.164 and WhatsApp forms, and whether the number is valid
+    """
+    wa_id = wa_id.strip()
+    return normalize_phone(wa_id if wa_id.startswith("+") else f"+{wa_id}")
+
+
+def normalize_phones(
+    raws: Iterable[str], region: str | None = None
+) -> dict[str, PhoneNumber]:
+    """
+    Normalize many phone numbers at once (e.g. a customer import).
+
+    Args:
+        raws: Phone numbers, duplicates allowed
+        region: Country code for numbers in national format (optional)
+
+    Returns:
+        dict[str, PhoneNumber]: Normalized number per distinct input
+    """
+    return {raw: normalize_phone(raw, region) for raw in set(raws)}
+
+
+def _to_whatsapp(e164: str) -> str:
+    """
+    Convert Argentina E.164 format to WhatsApp format.
+
+    E.164: +5493816378744 (54 + 9 + area_code + number)
+    WhatsApp: 54381156378744 (54 + area_code + 15 + number)
+
+    Other numbers are returned without the "+".
+    """
+    digits = e164.lstrip("+")
+    match = _ARGENTINA_MOBILE.match(digits)
+    if match:
+        area_code, number = match.groups()
+        return f"54{area_code}15{number}"
+    return digits
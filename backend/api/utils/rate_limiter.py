@@ -0,0 +1,80 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` operations per second with bursts of `capacity`.
+
+    Args:
+        rate: Tokens added per second
+        capacity: Maximum number of tokens (burst size)
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+
+    def try_acquire(self) -> float:
+        """
+        Take a token if one is available.
+
+        Returns:
+            float: 0 if a token was taken, otherwise seconds until one is available
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def pause(self, seconds: float) -> None:
+        """Drain the bucket so no token is available for `seconds` (e.g. after a 429)."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+
+class RateLimiter:
+    """
+    One TokenBucket per key, created on first use.
+
+    Args:
+        rate: Tokens added per second, per key
+        capacity: Burst size, per key
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _get_bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.setdefault(
+                    key, TokenBucket(self.rate, self.capacity)
+                )
+        return bucket
+
+    def try_acquire(self, key: str) -> float:
+        """Take a token for `key`; see TokenBucket.try_acquire()."""
+        return self._get_bucket(key).try_acquire()
+
+    def pause(self, key: str, seconds: float) -> None:
+        """Block `key` for `seconds`; see TokenBucket.pause()."""
+        self._get_bucket(key).pause(seconds)
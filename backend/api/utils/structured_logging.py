@@ -0,0 +1,146 @@
+"""
+Production logging: single-line JSON written by a background thread.
+
+With LOG_FORMAT=json (see LOGGING in settings), loggers hand records to a
+DeferredQueueHandler and a QueueListener thread formats and writes them,
+so the request or worker loop only pays for a queue put. Large payloads
+are logged through LazyJSON and only serialized by the listener, and
+repetitive records can be throttled with SamplingFilter.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from datetime import UTC, datetime
+
+from django.conf import settings
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_ATTRIBUTES = frozenset(
+    vars(logging.LogRecord("", logging.INFO, "", 0, "", (), None))
+) | {"message", "asctime", "taskName", "sample_key"}
+
+
+class LazyJSON:
+    """
+    Serialize an object to JSON only when the log record is formatted.
+
+    Pass it as a %-style argument, not inside an f-string:
+        logger.info("Payload: %s", LazyJSON(data))
+
+    Args:
+        obj: JSON-serializable object
+    """
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __str__(self) -> str:
+        # Compact in JSON logs, readable in the console
+        indent = None if settings.LOG_FORMAT == "json" else 2
+        return json.dumps(self.obj, indent=indent, default=str)
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, UTC).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = "".join(traceback.format_exception(*record.exc_info))
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves all formatting to the listener thread.
+
+    The stock handler merges the message arguments before enqueueing
+    (needed for queues that pickle records); the queue here is in-process,
+    so the record is passed as is and LazyJSON arguments stay lazy.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Throttle repetitive records.
+
+    Records logged with `extra={"sample_key": ...}` pass at most once per
+    `interval` seconds for each key; the next record that passes carries
+    the number of records dropped in between as `suppressed`. Records
+    without a sample key are never dropped. Only the `max_keys` most
+    recently seen keys are tracked, so keys built from unbounded values
+    cannot grow the filter without limit.
+
+    Args:
+        interval: Seconds between two records with the same key
+        max_keys: Keys tracked at once; the least recently seen is dropped
+    """
+
+    def __init__(self, interval: float = 60.0, max_keys: int = 1024):
+        super().__init__()
+        self.interval = interval
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # key -> (time the last record passed, records dropped since), LRU order
+        self._last: OrderedDict[str, tuple[float, int]] = OrderedDict()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample_key", None)
+        if key is None or self.interval <= 0:
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            last_at, suppressed = self._last.get(key, (None, 0))
+            if last_at is not None and now - last_at < self.interval:
+                self._last[key] = (last_at, suppressed + 1)
+                self._last.move_to_end(key)
+                return False
+            self._last[key] = (now, 0)
+            self._last.move_to_end(key)
+            if len(self._last) > self.max_keys:
+                self._last.popitem(last=False)
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+def start_queue_listeners() -> None:
+    """
+    Start the listener of every configured queue handler.
+
+    dictConfig() creates the listeners but leaves them stopped. Each one
+    is stopped at exit, flushing the records still queued.
+    """
+    for name in logging.getHandlerNames():
+        handler = logging.getHandlerByName(name)
+        listener = getattr(handler, "listener", None)
+        if listener is not None and listener._thread is None:
+            listener.start()
+            atexit.register(listener.stop)
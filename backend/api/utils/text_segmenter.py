@@ -0,0 +1,44 @@
+"""
+Split streamed text into self-contained chunks for separate WhatsApp messages.
+"""
+
+import re
+
+# Paragraph break, or end of sentence followed by whitespace, with the next
+# segment already started (so a trailing boundary never produces a cut)
+_BOUNDARY = re.compile(
+    r"\n\s*\n(?=\S)|(?:(?<=[.!?…])|(?<=[.!?…][\"')\]]))[ \t\n]+(?=\S)"
+)
+
+# Sentence boundaries only cut segments at least this long, so short
+# sentences ("Hola.") are grouped instead of sent one by one
+MIN_SENTENCE_SEGMENT_CHARS = 80
+
+
+def split_complete_segments(
+    buffer: str, min_chars: int = MIN_SENTENCE_SEGMENT_CHARS
+) -> tuple[list[str], str]:
+    """
+    Cut the complete segments off the start of a growing text buffer.
+
+    Paragraph breaks always end a segment; sentence ends do once the segment
+    reaches `min_chars`.
+
+    Args:
+        buffer: Text received so far and not yet segmented
+        min_chars: Minimum length of a segment ending at a sentence boundary
+
+    Returns:
+        tuple: Complete segments (stripped, non-empty) and the remaining buffer
+    """
+    segments = []
+    start = 0
+    for match in _BOUNDARY.finditer(buffer):
+        is_paragraph = "\n\n" in re.sub(r"[ \t]", "", match.group())
+        if not is_paragraph and match.start() - start < min_chars:
+            continue
+        segment = buffer[start : match.start()].strip()
+        if segment:
+            segments.append(segment)
+        start = match.end()
+    return segments, buffer[start:]
@@ -0,0 +1,61 @@
+"""
+Lightweight per-stage latency measurement.
+
+A StageTimer collects the duration of each pipeline stage (parse, tenant
+lookup, DB ingest, history fetch, LLM, send, persist...). Every recorded
+duration is also reported to the registered observers (see
+add_timing_observer()).
+"""
+
+import math
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+_observers: list[Callable[[str, float], None]] = []
+
+
+class StageTimer:
+    """
+    Per-stage durations of one unit of work, in milliseconds.
+
+    Args:
+        timings: Durations already measured upstream (e.g. stored on the
+                 inbound message), to continue from (optional)
+    """
+
+    def __init__(self, timings: dict[str, int] | None = None):
+        self.timings: dict[str, int] = dict(timings or {})
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Measure the duration of the wrapped block as stage `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def record(self, name: str, duration_ms: float) -> None:
+        """Record a duration measured elsewhere (added up if the stage repeats)."""
+        duration_ms = max(0.0, duration_ms)
+        self.timings[name] = self.timings.get(name, 0) + round(duration_ms)
+        for observer in _observers:
+            observer(name, duration_ms)
+
+
+def add_timing_observer(observer: Callable[[str, float], None]) -> None:
+    """
+    Register a callback receiving every recorded (stage, duration_ms).
+
+    Args:
+        observer: Callable taking the stage name and duration in milliseconds
+    """
+    if observer not in _observers:
+        _observers.append(observer)
+
+
+def percentile[T: (int, float)](sorted_values: list[T], pct: float) -> T:
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
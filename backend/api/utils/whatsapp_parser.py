@@ -1,4 +1,5 @@
 import logging
+from collections.abc import Iterator
 from typing import TypedDict
 
 logger = logging.getLogger(__name__)
@@ -11,48 +12,88 @@ class ParsedMessage(TypedDict):
     message_id: str
 
 
-def parse_webhook_payload(data: dict) -> ParsedMessage | None:
+def iter_webhook_values(data: dict) -> Iterator[dict]:
+    """
+    Iterate over the `value` object of every change in every entry.
+
+    Args:
+        data: Webhook payload from WhatsApp Cloud API
+
+    Yields:
+        dict: The `value` object of each change
     """
-    Parse WhatsApp Cloud API webhook payload.
+    entries = data.get("entry") or []
+    if not isinstance(entries, list):
+        logger.warning("Invalid entry field in webhook payload")
+        return
+
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        changes = entry.get("changes") or []
+        if not isinstance(changes, list):
+            continue
+        for change in changes:
+            if not isinstance(change, dict):
+                continue
+            value = change.get("value")
+            if isinstance(value, dict):
+                yield value
+
+
+def is_status_only_payload(data: dict) -> bool:
+    """
+    Check whether a payload only carries message statuses.
 
-    Extracts phone_number_id, from_number, message_body, and message_id
-    from incoming webhook notifications.
+    Delivery statuses (sent, delivered, read, failed) make up most of the
+    webhook traffic and need nothing but logging.
 
     Args:
         data: Webhook payload from WhatsApp Cloud API
 
     Returns:
-        ParsedMessage dict if valid text message, None otherwise
+        bool: True if every change has statuses and no messages
     """
-    try:
-        # Navigate to the webhook structure
-        entry = data.get("entry", [])
-        if not entry:
-            logger.warning("No entry field in webhook payload")
-            return None
+    values = list(iter_webhook_values(data))
+    return bool(values) and all(
+        value.get("statuses") and not value.get("messages") for value in values
+    )
 
-        changes = entry[0].get("changes", [])
-        if not changes:
-            logger.warning("No changes field in webhook payload")
-            return None
 
-        value = changes[0].get("value", {})
+def iter_webhook_messages(data: dict) -> Iterator[ParsedMessage]:
+    """
+    Parse every text message in a WhatsApp Cloud API webhook payload.
+
+    Meta may batch several messages, changes and entries (one per business
+    phone number) into a single POST, so all of them are walked.
+
+    Args:
+        data: Webhook payload from WhatsApp Cloud API
+
+    Yields:
+        ParsedMessage: One dict per valid text message, in payload order
+    """
+    if not data.get("entry"):
+        logger.warning("No entry field in webhook payload")
+        return
 
+    for value in iter_webhook_values(data):
         # Extract metadata
-        metadata = value.get("metadata", {})
+        metadata = value.get("metadata") or {}
         phone_number_id = metadata.get("phone_number_id")
         if not phone_number_id:
             logger.warning("No phone_number_id in webhook payload")
-            return None
+            continue
 
-        # Extract messages
-        messages = value.get("messages", [])
-        if not messages:
-            logger.debug("No messages field in webhook payload")
-            return None
+        for message in value.get("messages") or []:
+            parsed = _parse_message(phone_number_id, message)
+            if parsed:
+                yield parsed
 
-        message = messages[0]
 
+def _parse_message(phone_number_id: str, message: dict) -> ParsedMessage | None:
+    """Parse a single message object, returning None for non-text or invalid ones."""
+    try:
         # Check if it's a text message
         message_type = message.get("type")
         if message_type != "text":
@@ -77,7 +118,21 @@ def parse_webhook_payload(data: dict) -> ParsedMessage | None:
             message_id=message_id,
         )
 
-    except (KeyError, IndexError, TypeError) as e:
-        logger.error(f"Error parsing webhook payload: {e}")
+    except (AttributeError, KeyError, TypeError) as e:
+        logger.error(f"Error parsing webhook message: {e}")
         return None
 
+
+def parse_webhook_payload(data: dict) -> ParsedMessage | None:
+    """
+    Parse the first text message of a WhatsApp Cloud API webhook payload.
+
+    Prefer iter_webhook_messages(), which returns every message in the batch.
+
+    Args:
+        data: Webhook payload from WhatsApp Cloud API
+
+    Returns:
+        ParsedMessage dict if valid text message, None otherwise
+    """
+    return next(iter_webhook_messages(data), None)
@@ -1,147 +1,323 @@
+import asyncio
 import logging
-import re
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import NamedTuple
 
-import requests
+import httpx
 from django.conf import settings
+from django.utils import timezone
+
+from api.utils.metrics import WHATSAPP_API_REQUESTS, WHATSAPP_API_SECONDS
+from api.utils.phone import normalize_phone, normalize_wa_id
 
 logger = logging.getLogger(__name__)
 
 
-def format_argentina_whatsapp_number(phone: str) -> str:
-    """
-    Convert Argentina E.164 format to WhatsApp format.
+class SendResult(NamedTuple):
+    """Outcome of a Cloud API request, after retries."""
 
-    E.164: +5493816378744 or 5493816378744 (54 + 9 + area_code + number)
-    WhatsApp: 54381156378744 (54 + area_code + 15 + number)
+    success: bool
+    status_code: int | None = None
+    error: str | None = None
+    retry_after: float | None = None
+    # No connection was made, so Meta cannot have received the request
+    connect_failed: bool = False
 
-    Args:
-        phone: Phone number in E.164 format
 
-    Returns:
-        str: Phone number in WhatsApp format, or original if not Argentina mobile
+class WhatsAppSender:
+    """
+    WhatsApp Cloud API client with pooled connections and retries.
+
+    Holds one `httpx.AsyncClient` with the auth headers preset, so
+    consecutive sends reuse warm TLS connections to graph.facebook.com.
+    Requests failing with 429 or 5xx, or that could not connect, are
+    retried with exponential backoff and jitter, honoring Retry-After. Other network errors (e.g. read timeouts)
+    are not: the message may already have been delivered.
+
+    Use `get_sender()` to get the per-process instance.
     """
-    # Remove + if present
-    phone = phone.lstrip('+')
 
-    # Check if it's Argentina mobile (549 + 10 digits)
-    if not re.match(r'^549\d{10}$', phone):
-        return phone
+    RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+    MAX_RETRIES = 3
+    BACKOFF_BASE_SECONDS = 0.5
+    MAX_BACKOFF_SECONDS = 30.0
+    TIMEOUT_SECONDS = 10.0
+
+    def __init__(self, api_url: str | None = None, access_token: str | None = None):
+        self.api_url = api_url or settings.WHATSAPP_API_URL
+        self._headers = {
+            "Authorization": f"Bearer {access_token or settings.WHATSAPP_ACCESS_TOKEN}",
+            "Content-Type": "application/json",
+        }
+        self._async_client: httpx.AsyncClient | None = None
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Get the async HTTP client, creating it on first use."""
+        if self._async_client is None or self._async_client.is_closed:
+            self._async_client = httpx.AsyncClient(
+                headers=self._headers,
+                timeout=httpx.Timeout(self.TIMEOUT_SECONDS),
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            )
+        return self._async_client
+
+    async def aclose(self) -> None:
+        """Close the async HTTP client."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    def _get_url(self, phone_number_id: str) -> str:
+        return f"{self.api_url}/{phone_number_id}/messages"
+
+    @staticmethod
+    def _get_kind(payload: dict) -> str:
+        """Request kind for metrics: "message" or "typing_indicator"."""
+        return "typing_indicator" if "typing_indicator" in payload else "message"
+
+    # Retry policy
+
+    def _should_retry(
+        self,
+        status_code: int | None,
+        connect_failed: bool,
+        attempt: int,
+        max_retries: int,
+    ) -> bool:
+        if attempt >= max_retries:
+            return False
+        if status_code is None:
+            # Only safe when the request never reached the API
+            return connect_failed
+        return status_code in self.RETRY_STATUS_CODES
+
+    def _get_delay(self, attempt: int, retry_after: float | None) -> float:
+        """Backoff before the next attempt: Retry-After if given, else exponential with jitter."""
+        if retry_after is not None:
+            return min(retry_after, self.MAX_BACKOFF_SECONDS)
+        delay = self.BACKOFF_BASE_SECONDS * 2**attempt
+        return min(delay, self.MAX_BACKOFF_SECONDS) * random.uniform(0.5, 1.0)
+
+    @staticmethod
+    def _parse_retry_after(value: str | None) -> float | None:
+        """Parse a Retry-After header (seconds or HTTP date)."""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(
+                0.0, (parsedate_to_datetime(value) - timezone.now()).total_seconds()
+            )
+        except (TypeError, ValueError):
+            return None
+
+    # Metrics
+
+    def _record(self, kind: str, status_code: int | None, latency_ms: float) -> None:
+        WHATSAPP_API_REQUESTS.labels(kind, str(status_code or "error")).inc()
+        WHATSAPP_API_SECONDS.labels(kind).observe(latency_ms / 1000)
+
+    # Requests
+
+    async def _apost(
+        self, phone_number_id: str, payload: dict, max_retries: int
+    ) -> SendResult:
+        url = self._get_url(phone_number_id)
+        kind = self._get_kind(payload)
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            status_code = None
+            retry_after = None
+            connect_failed = False
+            try:
+                response = await self._get_async_client().post(url, json=payload)
+                status_code = response.status_code
+                retry_after = self._parse_retry_after(
+                    response.headers.get("Retry-After")
+                )
+                error = None if response.is_success else response.text
+            except httpx.RequestError as e:
+                error = str(e)
+                connect_failed = isinstance(
+                    e, (httpx.ConnectError, httpx.ConnectTimeout)
+                )
+            self._record(kind, status_code, (time.perf_counter() - start) * 1000)
+
+            if error is None:
+                return SendResult(True, status_code)
+            if not self._should_retry(
+                status_code, connect_failed, attempt, max_retries
+            ):
+                return SendResult(
+                    False, status_code, error, retry_after, connect_failed
+                )
+
+            delay = self._get_delay(attempt, retry_after)
+            logger.warning(
+                f"WhatsApp API request failed (status: {status_code}), "
+                f"retrying in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    # Payloads
+
+    @staticmethod
+    def _build_typing_indicator_payload(message_id: str) -> dict:
+        return {
+            "messaging_product": "whatsapp",
+            "status": "read",
+            "message_id": message_id,
+            "typing_indicator": {"type": "text"},
+        }
+
+    @staticmethod
+    def _build_text_message_payload(formatted_number: str, text: str) -> dict:
+        return {
+            "messaging_product": "whatsapp",
+            "recipient_type": "individual",
+            "to": formatted_number,
+            "type": "text",
+            "text": {
+                "preview_url": False,
+                "body": text,
+            },
+        }
 
-    # Argentina mobile format: 549 + area_code + number (total 10 digits after 549)
-    # Most area codes are 3 digits (11, 351, 381, etc.)
-    match = re.match(r'^549(\d{3})(\d{7})$', phone)
-    if match:
-        area_code = match.group(1)
-        number = match.group(2)
-        whatsapp_format = f"54{area_code}15{number}"
-        logger.debug(f"Converted {phone} → {whatsapp_format}")
-        return whatsapp_format
+    # Public API
 
-    # Should never reach here if validation passed
-    logger.warning(f"Failed to convert Argentina number: {phone}")
-    return phone
+    async def asend_typing_indicator(
+        self, phone_number_id: str, to_number: str, message_id: str
+    ) -> SendResult:
+        """
+        Mark message as read and show typing indicator.
 
+        Typing indicators are best effort, so they are retried only once.
 
-def send_typing_indicator(phone_number_id: str, to_number: str, message_id: str) -> bool:
+        Args:
+            phone_number_id: WhatsApp Business Phone Number ID
+            to_number: Recipient's WhatsApp ID (webhook `from`) or E.164 number
+            message_id: WhatsApp message ID to mark as read
+
+        Returns:
+            SendResult: Outcome of the request
+        """
+        formatted_number = normalize_wa_id(to_number).whatsapp
+        result = await self._apost(
+            phone_number_id,
+            self._build_typing_indicator_payload(message_id),
+            max_retries=1,
+        )
+        self._log_typing_indicator(result, formatted_number)
+        return result
+
+    async def asend_message(
+        self,
+        phone_number_id: str,
+        to_number: str,
+        text: str,
+        max_retries: int | None = None,
+    ) -> SendResult:
+        """
+        Send a WhatsApp text message via the Cloud API.
+
+        Args:
+            phone_number_id: WhatsApp Business Phone Number ID
+            to_number: Recipient's phone number (any format, will be converted for Argentina)
+            text: Message text content
+            max_retries: Retries on transient errors (default MAX_RETRIES)
+
+        Returns:
+            SendResult: Outcome of the request, after retries
+        """
+        formatted_number = normalize_phone(to_number).whatsapp
+        result = await self._apost(
+            phone_number_id,
+            self._build_text_message_payload(formatted_number, text),
+            max_retries=self.MAX_RETRIES if max_retries is None else max_retries,
+        )
+        self._log_message(result, formatted_number)
+        return result
+
+    @staticmethod
+    def _log_typing_indicator(result: SendResult, formatted_number: str) -> None:
+        if result.success:
+            logger.info(f"Message marked as read - To: {formatted_number}")
+        elif result.status_code is not None:
+            logger.error(
+                f"HTTP error marking message as read - Status: {result.status_code}, "
+                f"Response: {result.error}"
+            )
+        else:
+            logger.warning(f"Failed to mark message as read: {result.error}")
+
+    @staticmethod
+    def _log_message(result: SendResult, formatted_number: str) -> None:
+        if result.success:
+            logger.info(f"Message sent successfully - To: {formatted_number}")
+        elif result.status_code is not None:
+            logger.error(
+                f"HTTP error sending message - Status: {result.status_code}, "
+                f"Response: {result.error}"
+            )
+        else:
+            logger.error(f"Request error sending message: {result.error}")
+
+
+_sender: WhatsAppSender | None = None
+_sender_pid: int | None = None
+_sender_lock = threading.Lock()
+
+
+def get_sender() -> WhatsAppSender:
     """
-    Mark message as read and show typing indicator.
+    Get the per-process WhatsApp sender.
 
-    Args:
-        phone_number_id: WhatsApp Business Phone Number ID
-        to_number: Recipient's phone number (any format, will be converted for Argentina)
-        message_id: WhatsApp message ID to mark as read
+    Rebuilt after a fork so worker processes never share sockets.
 
     Returns:
-        bool: True if successful, False otherwise
+        WhatsAppSender: Shared sender instance
     """
-    # Convert Argentina numbers to WhatsApp format
-    formatted_number = format_argentina_whatsapp_number(to_number)
-    
-    url = f"{settings.WHATSAPP_API_URL}/{phone_number_id}/messages"
-
-    headers = {
-        "Authorization": f"Bearer {settings.WHATSAPP_ACCESS_TOKEN}",
-        "Content-Type": "application/json",
-    }
-
-    payload = {
-        "messaging_product": "whatsapp",
-        "status": "read",
-        "message_id": message_id,
-        "typing_indicator": {
-            "type": "text"
-        }
-    }
-
-    try:
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
-        response.raise_for_status()
-        logger.info(f"Message marked as read - To: {formatted_number}")
-        return True
-
-    except requests.exceptions.HTTPError as e:
-        logger.error(
-            f"HTTP error marking message as read - Status: {e.response.status_code}, "
-            f"Response: {e.response.text}"
-        )
-        return False
+    global _sender, _sender_pid
+
+    pid = os.getpid()
+    if _sender is None or _sender_pid != pid:
+        with _sender_lock:
+            if _sender is None or _sender_pid != pid:
+                _sender = WhatsAppSender()
+                _sender_pid = pid
+    return _sender
+
 
-    except Exception as e:
-        logger.warning(f"Failed to mark message as read: {e}")
-        return False
+async def aclose_async_client() -> None:
+    """Close the shared sender's async HTTP client (call on worker shutdown)."""
+    if _sender is not None and _sender_pid == os.getpid():
+        await _sender.aclose()
 
 
-def send_message(phone_number_id: str, to_number: str, text: str) -> bool:
+async def asend_typing_indicator(
+    phone_number_id: str, to_number: str, message_id: str
+) -> bool:
     """
-    Send a WhatsApp text message via the Cloud API.
+    Mark message as read and show typing indicator.
 
     Args:
         phone_number_id: WhatsApp Business Phone Number ID
-        to_number: Recipient's phone number (any format, will be converted for Argentina)
-        text: Message text content
+        to_number: Recipient's WhatsApp ID (webhook `from`) or E.164 number
+        message_id: WhatsApp message ID to mark as read
 
     Returns:
-        bool: True if message sent successfully, False otherwise
+        bool: True if successful, False otherwise
     """
-    # Convert Argentina numbers to WhatsApp format
-    formatted_number = format_argentina_whatsapp_number(to_number)
-
-    url = f"{settings.WHATSAPP_API_URL}/{phone_number_id}/messages"
-
-    headers = {
-        "Authorization": f"Bearer {settings.WHATSAPP_ACCESS_TOKEN}",
-        "Content-Type": "application/json",
-    }
-
-    payload = {
-        "messaging_product": "whatsapp",
-        "recipient_type": "individual",
-        "to": formatted_number,
-        "type": "text",
-        "text": {
-            "preview_url": False,
-            "body": text,
-        },
-    }
-
-    try:
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
-        response.raise_for_status()
-
-        logger.info(f"Message sent successfully - To: {formatted_number}")
-        return True
-
-    except requests.exceptions.HTTPError as e:
-        logger.error(
-            f"HTTP error sending message - Status: {e.response.status_code}, "
-            f"Response: {e.response.text}"
-        )
-        return False
-
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error sending message: {e}")
-        return False
-
-    except Exception as e:
-        logger.error(f"Unexpected error sending message: {e}")
-        return False
+    result = await get_sender().asend_typing_indicator(
+        phone_number_id, to_number, message_id
+    )
+    return result.success
@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotFound
+from prometheus_client.core import GaugeMetricFamily
+
+from api.constants import WebhookJobStatus
+from api.models.conversation import Conversation
+from api.models.webhook_job import WebhookJob
+from api.utils.metrics import render_metrics
+from services.outbound_queue_service import get_backlog_stats
+
+
+class QueueDepthCollector:
+    """Report queue backlogs, read from the database at scrape time."""
+
+    def collect(self):
+        # Also runs on the metrics server thread of the dispatcher, outside
+        # any request: drop its connection if it broke or got too old
+        close_old_connections()
+
+        webhook_jobs = GaugeMetricFamily(
+            "whatsapp_webhook_jobs", "Queued webhook jobs", labels=["status"]
+        )
+        for status in (
+            WebhookJobStatus.PENDING,
+            WebhookJobStatus.PROCESSING,
+            WebhookJobStatus.FAILED,
+        ):
+            webhook_jobs.add_metric(
+                [status], WebhookJob.objects.filter(status=status).count()
+            )
+        yield webhook_jobs
+
+        outbound = GaugeMetricFamily(
+            "whatsapp_outbound_messages",
+            "Unsent outbound messages",
+            labels=["phone_number_id", "status", "priority"],
+        )
+        for row in get_backlog_stats():
+            outbound.add_metric(
+                [row["phone_number_id"], row["status"], str(row["priority"])],
+                row["count"],
+            )
+        yield outbound
+
+        yield GaugeMetricFamily(
+            "whatsapp_replies_scheduled",
+            "Conversations with a scheduled (debounced) reply",
+            value=Conversation.objects.filter(reply_due_at__isnull=False).count(),
+        )
+
+
+def metrics(request):
+    """
+    Prometheus metrics endpoint (text exposition format).
+
+    Requests must send METRICS_TOKEN as a Bearer token; without a configured
+    token the endpoint is disabled.
+    """
+    if not settings.METRICS_TOKEN:
+        return HttpResponseNotFound()
+    if request.headers.get("Authorization") != f"Bearer {settings.METRICS_TOKEN}":
+        return HttpResponseForbidden()
+
+    body, content_type = render_metrics(QueueDepthCollector())
+    return HttpResponse(body, content_type=content_type)
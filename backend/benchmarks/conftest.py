@@ -0,0 +1,11 @@
+"""
+Pytest configuration for the benchmarks.
+"""
+
+import os
+
+import django
+
+# Configure Django settings for benchmarks
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
@@ -0,0 +1,100 @@
+"""
+Benchmarks of the webhook hot path.
+
+Run with:
+    uv run pytest benchmarks --benchmark-only
+    uv run pytest benchmarks --benchmark-autosave --benchmark-compare
+
+The view benchmark needs a database (PostgreSQL, like production). For
+end-to-end numbers with fake Meta and Gemini servers see the
+bench_webhook command.
+"""
+
+import itertools
+import json
+import logging
+
+import pytest
+from django.test import Client
+
+from api.management.bench import (
+    BENCH_REPLY,
+    build_text_payload,
+    iter_synthetic_payloads,
+)
+from api.models.company import Company
+from api.utils.structured_logging import JSONFormatter, LazyJSON
+from api.utils.text_segmenter import split_complete_segments
+from api.utils.whatsapp_parser import iter_webhook_messages
+
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.fixture
+def batch_payload():
+    """Webhook payload batching 50 messages, as Meta does under load."""
+    payloads = list(
+        itertools.islice(iter_synthetic_payloads(["bench0"], 10, "batch"), 50)
+    )
+    payload = payloads[0]
+    payload["entry"][0]["changes"] = [p["entry"][0]["changes"][0] for p in payloads]
+    return payload
+
+
+def test_parse_webhook_batch(benchmark, batch_payload):
+    messages = benchmark(lambda: list(iter_webhook_messages(batch_payload)))
+
+    assert len(messages) == 50
+
+
+def test_split_reply_segments(benchmark):
+    text = BENCH_REPLY * 10
+
+    segments, _ = benchmark(split_complete_segments, text)
+
+    assert len(segments) > 10
+
+
+def test_json_log_record(benchmark, batch_payload):
+    formatter = JSONFormatter()
+    record = logging.LogRecord(
+        "services.whatsapp_service",
+        logging.INFO,
+        __file__,
+        1,
+        "WhatsApp webhook received: %s",
+        (LazyJSON(batch_payload),),
+        None,
+    )
+
+    line = benchmark(formatter.format, record)
+
+    assert json.loads(line)["message"].startswith("WhatsApp webhook received")
+
+
+@pytest.mark.django_db
+def test_webhook_view(benchmark, django_assert_max_num_queries):
+    Company.objects.create(name="Bench 0", slug="bench-0", whatsapp_phone_id="bench0")
+    client = Client()
+    message_ids = itertools.count()
+
+    def post():
+        payload = build_text_payload(
+            "bench0",
+            "5491100000000",
+            "Hola, no tengo internet",
+            f"wamid.view.{next(message_ids)}",
+        )
+        return client.post(
+            "/api/whatsapp/webhook",
+            json.dumps(payload),
+            content_type="application/json",
+        )
+
+    # The webhook only queues the payload: one INSERT per request
+    with django_assert_max_num_queries(1):
+        assert post().status_code == 200
+
+    response = benchmark(post)
+
+    assert response.status_code == 200
@@ -93,6 +93,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.query_count_middleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -138,6 +139,25 @@ else:
     }
 
 
+# Cache
+# Uses Redis when REDIS_URL is set, so the webhook dedup set is shared
+# across processes; otherwise per-process memory.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -207,10 +227,46 @@ WHATSAPP_ACCESS_TOKEN = os.getenv('WHATSAPP_ACCESS_TOKEN', '')
 WHATSAPP_VERIFY_TOKEN = os.getenv('WHATSAPP_VERIFY_TOKEN', '')
 WHATSAPP_API_URL = os.getenv('WHATSAPP_API_URL', 'https://graph.facebook.com/v18.0')
 
+# WhatsApp worker settings (manage.py run_whatsapp_worker)
+WHATSAPP_WORKER_CONCURRENCY = int(os.getenv('WHATSAPP_WORKER_CONCURRENCY', '100'))
+WHATSAPP_WORKER_DB_THREADS = int(os.getenv('WHATSAPP_WORKER_DB_THREADS', '10'))
+WHATSAPP_WORKER_POLL_INTERVAL = float(os.getenv('WHATSAPP_WORKER_POLL_INTERVAL', '0.5'))
+# Processed webhook jobs and sent outbound messages are deleted after this many days
+WHATSAPP_QUEUE_RETENTION_DAYS = int(os.getenv('WHATSAPP_QUEUE_RETENTION_DAYS', '7'))
+
+# How long (seconds) seen WhatsApp message IDs are remembered to drop redeliveries
+WHATSAPP_DEDUP_TTL = int(os.getenv('WHATSAPP_DEDUP_TTL', '86400'))
+
+# Outbound dispatcher settings (manage.py run_outbound_dispatcher)
+# Sustained messages per second and burst size, per business phone number
+WHATSAPP_OUTBOUND_RATE = float(os.getenv('WHATSAPP_OUTBOUND_RATE', '20'))
+WHATSAPP_OUTBOUND_BURST = int(os.getenv('WHATSAPP_OUTBOUND_BURST', '20'))
+WHATSAPP_OUTBOUND_CONCURRENCY = int(os.getenv('WHATSAPP_OUTBOUND_CONCURRENCY', '50'))
+
+# How long (seconds) company, config and system prompt are cached per process
+TENANT_CACHE_TTL = int(os.getenv('TENANT_CACHE_TTL', '60'))
+
+# Bearer token for metrics (GET /api/metrics). Leave empty to disable the endpoint
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 # Gemini AI settings
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
+# Override the Gemini API endpoint (e.g. the bench_webhook stand-in). Empty for the real API
+GEMINI_BASE_URL = os.getenv('GEMINI_BASE_URL', '')
+
+# Gemini explicit context caching of company system prompts
+GEMINI_CONTEXT_CACHE_ENABLED = os.getenv('GEMINI_CONTEXT_CACHE_ENABLED', 'True') == 'True'
+GEMINI_CONTEXT_CACHE_TTL = int(os.getenv('GEMINI_CONTEXT_CACHE_TTL', '3600'))
+# Prompts estimated below this many tokens are sent inline (Gemini rejects small caches)
+GEMINI_CONTEXT_CACHE_MIN_TOKENS = int(os.getenv('GEMINI_CONTEXT_CACHE_MIN_TOKENS', '4096'))
 
 # Logging settings
+# "rich" for readable console output, "json" for production: single-line JSON
+# written by a background thread
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'rich')
+# Seconds between two sampled (repetitive) records with the same key, JSON only
+LOG_SAMPLE_INTERVAL = float(os.getenv('LOG_SAMPLE_INTERVAL', '60'))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -223,6 +279,15 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'api.utils.structured_logging.JSONFormatter',
+        },
+    },
+    'filters': {
+        'sampling': {
+            '()': 'api.utils.structured_logging.SamplingFilter',
+            'interval': LOG_SAMPLE_INTERVAL,
+        },
     },
     'handlers': {
         'console': {
@@ -265,3 +330,18 @@ LOGGING = {
         },
     },
 }
+
+if LOG_FORMAT == 'json':
+    # Loggers keep using 'console', which now only queues the records
+    LOGGING['handlers'] = {
+        'json': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'json',
+            'stream': 'ext://sys.stdout',
+        },
+        'console': {
+            'class': 'api.utils.structured_logging.DeferredQueueHandler',
+            'handlers': ['json'],
+            'filters': ['sampling'],
+        },
+    }
@@ -0,0 +1,36 @@
+"""
+Gunicorn settings, loaded automatically from the working directory.
+
+With several workers, Prometheus metrics are written to
+PROMETHEUS_MULTIPROC_DIR so /api/metrics can aggregate every process. With
+METRICS_PORT set, the master also serves them on that port, which is kept
+off the public service (e.g. for Fly's private-network scrapes).
+"""
+
+import os
+import shutil
+
+from prometheus_client import CollectorRegistry, multiprocess, start_http_server
+
+
+def on_starting(server):
+    """Start from an empty metrics directory on every deploy."""
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Drop the live gauges of a worker that exited."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    """Serve every worker's metrics on the internal METRICS_PORT."""
+    port = os.environ.get("METRICS_PORT")
+    if port and os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        start_http_server(int(port), registry=registry)
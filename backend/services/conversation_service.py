@@ -1,7 +1,10 @@
 import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import NamedTuple
 
-import phonenumbers
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import Model
 from django.utils import timezone
 
 from api.constants import MessageRole
@@ -9,111 +12,485 @@ from api.models.company import Company
 from api.models.conversation import Conversation
 from api.models.customer import Customer
 from api.models.message import Message
+from api.utils.metrics import MESSAGES
+from api.utils.phone import normalize_wa_id
+from api.utils.timing import StageTimer
+from api.utils.whatsapp_parser import ParsedMessage
+from services.tenant_cache import get_tenants
 
 logger = logging.getLogger(__name__)
 
 
-def handle_incoming_message(
-    company: Company, from_number: str, message_body: str
-) -> Message:
+class IncomingMessage(NamedTuple):
+    """A stored inbound message together with the webhook data it came from."""
+
+    company: Company
+    parsed: ParsedMessage
+    message: Message
+
+
+def handle_incoming_messages(
+    parsed_messages: list[ParsedMessage],
+    timer: StageTimer | None = None,
+) -> list[IncomingMessage]:
     """
-    Handle incoming WhatsApp message by managing customer, conversation, and message creation.
+    Store a batch of incoming WhatsApp messages.
+
+    Customers, conversations and messages for the whole batch are written
+    with one upsert (see _store_messages()). Messages for unknown
+    phone_number_ids are logged and skipped, and so are messages whose
+    WhatsApp message ID is already stored (redeliveries).
 
     Args:
-        company: The company receiving the message
-        from_number: Customer's phone number (will be formatted to E.164)
-        message_body: The text content of the message
+        parsed_messages: Messages parsed from one or more webhook payloads
+        timer: Stage timer of the webhook job; the stages measured so far are
+               stored on each message (optional)
 
     Returns:
-        Message: The created message object
-    """
-    # Format phone number to E.164
-    # Add + prefix if not present for phonenumbers library
-    phone_to_parse = from_number if from_number.startswith('+') else f'+{from_number}'
-    
-    try:
-        parsed = phonenumbers.parse(phone_to_parse, None)
-        if phonenumbers.is_valid_number(parsed):
-            e164_phone = phonenumbers.format_number(
-                parsed, phonenumbers.PhoneNumberFormat.E164
-            )
-        else:
-            logger.warning(f"Invalid phone number: {from_number}")
-            e164_phone = phone_to_parse
-    except phonenumbers.NumberParseException:
-        logger.warning(f"Failed to parse phone number: {from_number}")
-        e164_phone = phone_to_parse
+        list[IncomingMessage]: Stored messages, in the same order as the input
+    """
+    timer = timer or StageTimer()
 
-    with transaction.atomic():
-        # Get or create customer
-        customer, created = Customer.objects.get_or_create(
-            company=company,
-            phone=e164_phone,
-            defaults={"name": e164_phone},
+    # Drop duplicates within the batch and messages already stored
+    unique_messages = {parsed["message_id"]: parsed for parsed in parsed_messages}
+    if not unique_messages:
+        return []
+
+    stored_ids = set(
+        Message.objects.filter(
+            whatsapp_message_id__in=unique_messages.keys()
+        ).values_list("whatsapp_message_id", flat=True)
+    )
+    for message_id in stored_ids:
+        logger.info(f"Ignoring already stored WhatsApp message: {message_id}")
+
+    parsed_messages = [
+        parsed
+        for message_id, parsed in unique_messages.items()
+        if message_id not in stored_ids
+    ]
+    if not parsed_messages:
+        return []
+
+    # Resolve companies (cached, no query in steady state)
+    phone_ids = {parsed["phone_number_id"] for parsed in parsed_messages}
+    with timer.stage("tenant_lookup"):
+        tenants = get_tenants(phone_ids)
+
+    for phone_id in phone_ids - tenants.keys():
+        logger.error(f"Company not found for phone_number_id: {phone_id}")
+
+    parsed_messages = [
+        parsed for parsed in parsed_messages if parsed["phone_number_id"] in tenants
+    ]
+    rows = [
+        _IngestRow(
+            company=tenants[parsed["phone_number_id"]].company,
+            phone=normalize_wa_id(parsed["from_number"]).e164,
+            content=parsed["message_body"],
+            whatsapp_message_id=parsed["message_id"],
+            debounce_ms=tenants[parsed["phone_number_id"]].config.reply_debounce_ms,
         )
+        for parsed in parsed_messages
+    ]
+    if not rows:
+        return []
 
-        if created:
-            logger.info(f"Created new customer: {customer.phone}")
+    stage_timings = dict(timer.timings)
+    with timer.stage("db_ingest"):
+        messages = _store_messages(rows, stage_timings, timezone.now())
 
-        # Update customer's last interaction
-        customer.last_interaction = timezone.now()
-        customer.save(update_fields=["last_interaction"])
+    incoming = [
+        IncomingMessage(row.company, parsed, message)
+        for row, parsed, message in zip(rows, parsed_messages, messages, strict=True)
+        if message is not None
+    ]
+    for slug, count in Counter(item.company.slug for item in incoming).items():
+        MESSAGES.labels(slug, "inbound").inc(count)
+    return incoming
 
-        # Get or create active conversation with row-level locking
-        conversation = (
-            Conversation.objects.select_for_update()
-            .filter(
-                company=company,
-                customer=customer,
-                is_active=True,
+
+class _IngestRow(NamedTuple):
+    """An inbound message to store, see _store_messages()."""
+
+    company: Company
+    phone: str
+    content: str
+    whatsapp_message_id: str | None
+    # Reply debounce; None leaves the conversation's reply schedule unchanged
+    debounce_ms: int | None
+
+
+def _store_messages(
+    rows: list[_IngestRow], stage_timings: dict[str, int], now: datetime
+) -> list[Message | None]:
+    """
+    Store inbound messages, creating customers and active conversations as needed.
+
+    Customers get their last interaction updated; conversations their last
+    message time, message count and (debounced) reply schedule.
+
+    Customers and active conversations are upserted (INSERT ... ON CONFLICT,
+    relying on the unique active conversation per customer) and messages
+    inserted in chained CTEs of one statement; a second one adds the messages
+    actually inserted to their conversations' count. Row locks are only held
+    for those two statements and model validation is skipped.
+
+    Args:
+        rows: Messages to store; phones must already be E.164
+        stage_timings: Stage durations to store on every message
+        now: Timestamp of the ingestion
+
+    Returns:
+        list[Message | None]: Stored message per row, None if its WhatsApp
+        message ID was stored concurrently
+    """
+    customer_defaults, customer_params = _column_defaults(
+        Customer, {"company_id", "phone", "name", "last_interaction"}, now
+    )
+    conversation_defaults, conversation_params = _column_defaults(
+        Conversation,
+        {
+            "company_id",
+            "customer_id",
+            "is_active",
+            "last_message_at",
+            "total_messages",
+            "reply_due_at",
+        },
+        now,
+    )
+    message_defaults, message_params = _column_defaults(
+        Message,
+        {"conversation_id", "role", "content", "whatsapp_message_id", "stage_timings"},
+        now,
+    )
+    customer_table = Customer._meta.db_table
+    conversation_table = Conversation._meta.db_table
+    message_table = Message._meta.db_table
+
+    sql = f"""
+        WITH input AS (
+            SELECT * FROM unnest(%s::bigint[], %s::text[], %s::text[], %s::text[], %s::int[])
+                WITH ORDINALITY AS t(company_id, phone, content, whatsapp_message_id, debounce_ms, position)
+        ),
+        customer_keys AS (
+            SELECT company_id, phone, max(debounce_ms) AS debounce_ms
+            FROM input
+            GROUP BY company_id, phone
+        ),
+        customers AS (
+            INSERT INTO {customer_table} (company_id, phone, name, last_interaction{customer_defaults.columns})
+            SELECT company_id, phone, phone, %s{customer_defaults.values}
+            FROM customer_keys
+            ORDER BY company_id, phone
+            ON CONFLICT (company_id, phone) DO UPDATE
+                SET last_interaction = EXCLUDED.last_interaction
+            RETURNING id, company_id, phone
+        ),
+        conversations AS (
+            INSERT INTO {conversation_table} (
+                company_id, customer_id, is_active, last_message_at, total_messages, reply_due_at
+                {conversation_defaults.columns}
             )
-            .first()
+            SELECT
+                k.company_id, c.id, TRUE, %s, 0,
+                %s + k.debounce_ms * INTERVAL '1 millisecond'
+                {conversation_defaults.values}
+            FROM customer_keys k
+            JOIN customers c USING (company_id, phone)
+            ORDER BY c.id
+            ON CONFLICT (customer_id) WHERE is_active DO UPDATE
+                SET last_message_at = EXCLUDED.last_message_at,
+                    reply_due_at = COALESCE(EXCLUDED.reply_due_at, {conversation_table}.reply_due_at),
+                    updated_at = EXCLUDED.updated_at
+            RETURNING id, customer_id
         )
+        INSERT INTO {message_table} (
+            conversation_id, role, content, whatsapp_message_id, stage_timings{message_defaults.columns}
+        )
+        SELECT conversations.id, %s, i.content, i.whatsapp_message_id, %s{message_defaults.values}
+        FROM input i
+        JOIN customers c USING (company_id, phone)
+        JOIN conversations ON conversations.customer_id = c.id
+        ORDER BY i.position
+        ON CONFLICT (whatsapp_message_id) DO NOTHING
+        RETURNING id, conversation_id, whatsapp_message_id, created_at
+    """
+    params = [
+        [row.company.pk for row in rows],
+        [row.phone for row in rows],
+        [row.content for row in rows],
+        [row.whatsapp_message_id for row in rows],
+        [row.debounce_ms for row in rows],
+        now,
+        *customer_params,
+        now,
+        now,
+        *conversation_params,
+        MessageRole.USER,
+        Message._meta.get_field("stage_timings").get_db_prep_save(
+            stage_timings, connection
+        ),
+        *message_params,
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        returned = cursor.fetchall()
 
-        if conversation is None:
-            conversation = Conversation.objects.create(
-                company=company,
-                customer=customer,
-                is_active=True,
+        # Counted from the inserted rows: redeliveries skipped by
+        # ON CONFLICT DO NOTHING are not messages of the conversation
+        counts = Counter(conversation_id for _, conversation_id, _, _ in returned)
+        if counts:
+            cursor.execute(
+                f"""
+                UPDATE {conversation_table}
+                SET total_messages = {conversation_table}.total_messages + counts.messages
+                FROM unnest(%s::bigint[], %s::int[]) AS counts(id, messages)
+                WHERE {conversation_table}.id = counts.id
+                """,
+                [list(counts), list(counts.values())],
             )
 
-        # Create message
-        message = Message.objects.create(
-            conversation=conversation,
+    # Rows are returned in insertion order (as bulk_create assumes); messages
+    # with a WhatsApp ID are matched by it, since conflicting ones are skipped
+    by_whatsapp_id = {row[2]: row for row in returned if row[2] is not None}
+    without_whatsapp_id = iter(row for row in returned if row[2] is None)
+
+    messages: list[Message | None] = []
+    for row in rows:
+        if row.whatsapp_message_id is not None:
+            stored = by_whatsapp_id.get(row.whatsapp_message_id)
+        else:
+            stored = next(without_whatsapp_id)
+        if stored is None:
+            logger.info(
+                f"Ignoring already stored WhatsApp message: {row.whatsapp_message_id}"
+            )
+            messages.append(None)
+            continue
+        pk, conversation_id, whatsapp_message_id, created_at = stored
+        message = Message(
+            pk=pk,
+            conversation_id=conversation_id,
             role=MessageRole.USER,
-            content=message_body,
+            content=row.content,
+            whatsapp_message_id=whatsapp_message_id,
+            stage_timings=stage_timings,
+            created_at=created_at,
+        )
+        message._state.adding = False
+        message._state.db = connection.alias
+        messages.append(message)
+    return messages
+
+
+class _ColumnDefaults(NamedTuple):
+    """SQL fragments (with a leading comma) for the columns an upsert fills with defaults."""
+
+    columns: str
+    values: str
+
+
+def _column_defaults(
+    model: type[Model], exclude: set[str], now: datetime
+) -> tuple[_ColumnDefaults, list]:
+    """Get the remaining columns of `model` and their default values (auto_now fields get `now`)."""
+    columns, values, params = [], [], []
+    for field in model._meta.concrete_fields:
+        if field.primary_key or field.attname in exclude:
+            continue
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False):
+            value = now
+        else:
+            value = field.get_default()
+        columns.append(connection.ops.quote_name(field.column))
+        # Typed, since untyped NULLs in INSERT ... SELECT resolve to text
+        values.append(f"%s::{field.cast_db_type(connection)}")
+        params.append(field.get_db_prep_save(value, connection))
+    return _ColumnDefaults(
+        "".join(f", {column}" for column in columns),
+        "".join(f", {value}" for value in values),
+    ), params
+
+
+def claim_due_conversations(limit: int) -> list[Conversation]:
+    """
+    Claim conversations whose debounced reply is due.
+
+    The reply schedule is cleared while the row is locked, so each due reply
+    is picked up by exactly one worker. Fragments arriving later schedule a
+    new reply.
+
+    Args:
+        limit: Maximum number of conversations to claim
+
+    Returns:
+        list[Conversation]: Conversations to reply to, with company and customer loaded
+    """
+    return _claim_due("reply_due_at", limit, "company", "customer")
+
+
+def schedule_reply(conversation: Conversation, delay: timedelta) -> None:
+    """
+    Schedule a reply unless one is already scheduled.
+
+    Args:
+        conversation: Conversation to reply to
+        delay: How long to wait before replying
+    """
+    Conversation.objects.filter(pk=conversation.pk, reply_due_at__isnull=True).update(
+        reply_due_at=timezone.now() + delay
+    )
+
+
+def schedule_summary(conversation: Conversation) -> None:
+    """
+    Ask the worker to bring the conversation summary up to date.
+
+    Args:
+        conversation: Conversation whose history no longer fits its token budget
+    """
+    Conversation.objects.filter(pk=conversation.pk, summary_due_at__isnull=True).update(
+        summary_due_at=timezone.now()
+    )
+
+
+def claim_due_summaries(limit: int) -> list[Conversation]:
+    """
+    Claim conversations whose summary should be updated.
+
+    Works like claim_due_conversations(): each due summary is picked up by
+    exactly one worker.
+
+    Args:
+        limit: Maximum number of conversations to claim
+
+    Returns:
+        list[Conversation]: Conversations to summarize, with company loaded
+    """
+    return _claim_due("summary_due_at", limit, "company")
+
+
+def _claim_due(due_field: str, limit: int, *related: str) -> list[Conversation]:
+    """Claim up to `limit` conversations whose `due_field` has passed, clearing it."""
+    if limit <= 0:
+        return []
+
+    with transaction.atomic():
+        conversations = list(
+            Conversation.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related(*related)
+            .filter(**{f"{due_field}__lte": timezone.now()})
+            .order_by(due_field)[:limit]
         )
+        if conversations:
+            Conversation.objects.filter(
+                pk__in=[conversation.pk for conversation in conversations]
+            ).update(**{due_field: None})
+            for conversation in conversations:
+                setattr(conversation, due_field, None)
+
+    return conversations
 
-        # Update conversation metadata
-        conversation.last_message_at = timezone.now()
-        conversation.total_messages += 1
-        conversation.save(update_fields=["last_message_at", "total_messages"])
 
-        return message
+def get_pending_user_messages(conversation: Conversation) -> list[Message]:
+    """
+    Get the customer messages that have not been answered yet.
 
+    These are the user messages after the last assistant or agent message,
+    i.e. the fragments a single reply should cover.
 
-def get_conversation_history(conversation: Conversation, limit: int = 20) -> list[Message]:
+    Args:
+        conversation: The conversation to inspect
+
+    Returns:
+        list[Message]: Unanswered user messages, oldest first
+    """
+    last_reply_pk = (
+        Message.objects.filter(
+            conversation=conversation,
+            role__in=[MessageRole.ASSISTANT, MessageRole.AGENT],
+        )
+        .order_by("-pk")
+        .values_list("pk", flat=True)
+        .first()
+    )
+
+    messages = Message.objects.filter(conversation=conversation, role=MessageRole.USER)
+    if last_reply_pk is not None:
+        messages = messages.filter(pk__gt=last_reply_pk)
+
+    return list(messages.order_by("pk"))
+
+
+def has_newer_user_messages(conversation: Conversation, after: Message) -> bool:
+    """
+    Check whether the customer wrote again after a given message.
+
+    Args:
+        conversation: The conversation to inspect
+        after: Last message covered by an in-flight reply
+
+    Returns:
+        bool: True if newer user messages exist
+    """
+    return Message.objects.filter(
+        conversation=conversation,
+        role=MessageRole.USER,
+        pk__gt=after.pk,
+    ).exists()
+
+
+def get_conversation_history(
+    conversation: Conversation,
+    limit: int = 20,
+    before: Message | None = None,
+) -> list[Message]:
     """
     Get conversation message history.
 
     Args:
         conversation: The conversation to retrieve messages from
         limit: Maximum number of messages to return (default 20)
+        before: Only return messages created before this one (optional)
 
     Returns:
         list[Message]: List of Message objects ordered by created_at
     """
-    messages = Message.objects.filter(
-        conversation=conversation
-    ).order_by('-created_at')[:limit]
+    messages = Message.objects.filter(conversation=conversation)
+    if before is not None:
+        messages = messages.filter(pk__lt=before.pk)
+
+    messages = messages.order_by("-created_at", "-pk")[:limit]
 
     return list(reversed(messages))
 
 
+def get_received_at(message: Message) -> datetime:
+    """
+    Estimate when an inbound message reached the webhook.
+
+    The message is stored after queueing, parsing and tenant lookup; their
+    durations are in `stage_timings`.
+
+    Args:
+        message: Inbound (user) message
+
+    Returns:
+        datetime: Estimated receive time
+    """
+    return message.created_at - timedelta(
+        milliseconds=sum(message.stage_timings.values())
+    )
+
+
 def save_assistant_message(
     conversation: Conversation,
     content: str,
-    tokens_used: int = 0
+    tokens_used: int = 0,
+    latency_ms: int | None = None,
+    stage_timings: dict[str, int] | None = None,
 ) -> Message:
     """
     Save assistant message to conversation.
@@ -122,6 +499,8 @@ def save_assistant_message(
         conversation: Conversation to add message to
         content: Message content
         tokens_used: Number of tokens used (default 0)
+        latency_ms: Time from receiving the customer message to replying (optional)
+        stage_timings: Duration of each pipeline stage, from StageTimer (optional)
 
     Returns:
         Message: Created message object
@@ -131,11 +510,14 @@ def save_assistant_message(
         role=MessageRole.ASSISTANT,
         content=content,
         tokens_used=tokens_used,
+        latency_ms=latency_ms,
+        stage_timings=stage_timings or {},
     )
 
-    # Update conversation metadata
+    # Update conversation metadata; the stored total_messages is bumped
+    # on insert (see api.signals)
     conversation.last_message_at = timezone.now()
     conversation.total_messages += 1
-    conversation.save(update_fields=["last_message_at", "total_messages"])
+    conversation.save(update_fields=["last_message_at"])
 
     return message
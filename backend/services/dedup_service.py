@@ -0,0 +1,62 @@
+"""
+Seen-set of WhatsApp message IDs.
+
+Meta redelivers webhooks when our response is slow. Message IDs are kept in
+the Django cache (Redis in production, process memory otherwise) with a TTL
+so redeliveries are acknowledged without touching the database or the LLM.
+The unique index on Message.whatsapp_message_id is the durable backstop.
+"""
+
+from collections.abc import Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+
+KEY_PREFIX = "whatsapp:seen:"
+
+
+def _key(message_id: str) -> str:
+    return f"{KEY_PREFIX}{message_id}"
+
+
+def get_seen_message_ids(message_ids: Iterable[str]) -> set[str]:
+    """
+    Return the subset of message IDs that were already received.
+
+    Args:
+        message_ids: WhatsApp message IDs to check
+
+    Returns:
+        set[str]: IDs found in the seen-set
+    """
+    keys = {_key(message_id): message_id for message_id in message_ids}
+    if not keys:
+        return set()
+    return {keys[key] for key in cache.get_many(list(keys))}
+
+
+def mark_messages_seen(message_ids: Iterable[str]) -> None:
+    """
+    Add message IDs to the seen-set.
+
+    Args:
+        message_ids: WhatsApp message IDs that were accepted for processing
+    """
+    entries = {_key(message_id): True for message_id in message_ids}
+    if entries:
+        cache.set_many(entries, timeout=settings.WHATSAPP_DEDUP_TTL)
+
+
+async def aget_seen_message_ids(message_ids: Iterable[str]) -> set[str]:
+    """Async variant of get_seen_message_ids()."""
+    keys = {_key(message_id): message_id for message_id in message_ids}
+    if not keys:
+        return set()
+    return {keys[key] for key in await cache.aget_many(list(keys))}
+
+
+async def amark_messages_seen(message_ids: Iterable[str]) -> None:
+    """Async variant of mark_messages_seen()."""
+    entries = {_key(message_id): True for message_id in message_ids}
+    if entries:
+        await cache.aset_many(entries, timeout=settings.WHATSAPP_DEDUP_TTL)
@@ -0,0 +1,294 @@
+"""
+In-process cache of recent conversation history, as Gemini contents.
+
+Every reply needs the last messages of its conversation formatted for
+Gemini. Instead of querying and formatting them again on every turn, each
+conversation keeps a window of its latest messages with their pre-built
+`types.Content`. Messages saved in this process are appended as they are
+saved (see api.signals); messages saved elsewhere (ingestion, the outbound
+dispatcher, agents) are fetched incrementally on the next read.
+
+Each read brings the window up to date with one query for the messages
+inserted or updated (`Message.updated_at`) since it was last synced, so
+edits made by other processes are picked up too. Those reads are checked
+against `Conversation.total_messages`, which every message insert bumps; a
+window that cannot be brought up to date with them alone (e.g. after a
+deletion) is rebuilt.
+
+Windows hold up to WINDOW_CAPACITY messages, so the history before the
+messages of the turn being answered is usually cached as well. When it is
+not, the older messages are read once and added to the window.
+
+History is selected against the company's token budget, newest first;
+messages covered by the conversation summary are left out and replaced by
+the summary itself (see services.summary_service).
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import NamedTuple
+
+from django.db.models import Q
+from google.genai import types
+
+from api.models.conversation import Conversation
+from api.models.message import Message
+from services.conversation_service import get_conversation_history
+from services.llm_service import (
+    estimate_tokens,
+    format_history_summary,
+    format_message_for_gemini,
+)
+
+# Conversations kept, least recently used dropped first
+CACHE_SIZE = 1000
+# Messages at most sent as history
+WINDOW_SIZE = 50
+# Messages kept per conversation: the history plus the turn being answered
+WINDOW_CAPACITY = 2 * WINDOW_SIZE
+
+
+class HistorySelection(NamedTuple):
+    """History to send with a reply."""
+
+    contents: list[types.Content]
+    # Whether unsummarized messages were left out to fit the budget
+    truncated: bool
+
+
+class _Entry(NamedTuple):
+    """A cached message: Gemini content (None for system messages) and its size."""
+
+    content: types.Content | None
+    tokens: int
+
+
+@dataclass
+class _HistoryWindow:
+    """Latest messages of a conversation, by pk."""
+
+    # Conversation.total_messages the window accounts for
+    total_messages: int
+    # Highest pk read from the database; later entries may be local appends
+    synced_pk: int
+    # Latest Message.updated_at read from the database
+    synced_at: datetime | None
+    # Whether the window starts at the first message of the conversation
+    complete: bool
+    # pk -> entry, ascending
+    entries: dict[int, _Entry] = field(default_factory=dict)
+
+
+_lock = threading.Lock()
+_windows: OrderedDict[int, _HistoryWindow] = OrderedDict()
+
+
+def get_history_contents(
+    conversation: Conversation,
+    token_budget: int,
+    before: Message | None = None,
+) -> HistorySelection:
+    """
+    Get conversation history formatted for Gemini, within a token budget.
+
+    The conversation summary (if any) comes first, followed by the newest
+    messages after it that fit in the rest of the budget, at most
+    WINDOW_SIZE. The contents are shared between calls and must not be
+    modified.
+
+    Args:
+        conversation: The conversation to retrieve messages from
+        token_budget: Approximate tokens the history may take
+        before: Only return messages created before this one (optional)
+
+    Returns:
+        HistorySelection: History formatted for Gemini API, oldest first
+    """
+    window = _get_window(conversation)
+    after = conversation.summary_through or 0
+    candidates, covered = _get_candidates(window, after, before)
+
+    if not covered and len(candidates) < WINDOW_SIZE:
+        # Older messages are needed than the window holds
+        messages = get_conversation_history(
+            conversation, limit=WINDOW_SIZE, before=before
+        )
+        if _extend(window, messages, before):
+            candidates, covered = _get_candidates(window, after, before)
+        else:
+            candidates = [
+                (message.pk, _build_entry(message))
+                for message in messages
+                if message.pk > after
+            ]
+            covered = len(messages) < WINDOW_SIZE or messages[0].pk <= after
+
+    contents = []
+    budget = token_budget
+    if conversation.summary:
+        contents.append(format_history_summary(conversation.summary))
+        budget -= estimate_tokens(conversation.summary)
+
+    selected = []
+    for _, entry in reversed(candidates):
+        if entry.tokens > budget or len(selected) == WINDOW_SIZE:
+            break
+        budget -= entry.tokens
+        if entry.content is not None:
+            selected.append(entry.content)
+
+    truncated = len(selected) < sum(
+        1 for _, entry in candidates if entry.content is not None
+    )
+    contents.extend(reversed(selected))
+    return HistorySelection(contents, truncated or not covered)
+
+
+def _get_candidates(
+    window: _HistoryWindow, after: int, before: Message | None
+) -> tuple[list[tuple[int, _Entry]], bool]:
+    """
+    Get the window entries after `after` and before `before`, and whether
+    the window reaches back to `after`.
+    """
+    with _lock:
+        candidates = [
+            (pk, entry)
+            for pk, entry in window.entries.items()
+            if pk > after and (before is None or pk < before.pk)
+        ]
+        covered = window.complete or next(iter(window.entries), 0) <= after
+    return candidates, covered
+
+
+def _extend(
+    window: _HistoryWindow, messages: list[Message], before: Message | None
+) -> bool:
+    """
+    Add the latest messages before `before` to a window.
+
+    Returns:
+        bool: False if they would leave a gap, so the window was left as is
+    """
+    with _lock:
+        first_pk = next(iter(window.entries), None)
+        if before is not None and first_pk is not None and before.pk < first_pk:
+            # Messages between `before` and the window were not read
+            return False
+        for message in messages:
+            window.entries.setdefault(message.pk, _build_entry(message))
+        window.entries = dict(sorted(window.entries.items()))
+        window.complete = len(messages) < WINDOW_SIZE
+        _trim(window)
+    return True
+
+
+def record_message(message: Message) -> None:
+    """
+    Append a newly saved message to its conversation's window, if cached.
+
+    Args:
+        message: Message just inserted
+    """
+    with _lock:
+        window = _windows.get(message.conversation_id)
+        if window is None or message.pk in window.entries:
+            return
+        if window.entries and message.pk < next(reversed(window.entries)):
+            # Out of order: let the next read rebuild it
+            del _windows[message.conversation_id]
+            return
+        window.entries[message.pk] = _build_entry(message)
+        window.total_messages += 1
+        _trim(window)
+
+
+def invalidate_conversation_history(conversation_id: int) -> None:
+    """Drop the cached history of a conversation."""
+    with _lock:
+        _windows.pop(conversation_id, None)
+
+
+def clear_history_cache() -> None:
+    """Drop every cached history."""
+    with _lock:
+        _windows.clear()
+
+
+def _get_window(conversation: Conversation) -> _HistoryWindow:
+    """Get the up-to-date window of a conversation, loading what is missing."""
+    with _lock:
+        window = _windows.get(conversation.pk)
+        if window is not None:
+            _windows.move_to_end(conversation.pk)
+            synced_pk, synced_at = window.synced_pk, window.synced_at
+            # Messages read so far, leaving out the local appends
+            synced = window.total_messages - sum(
+                1 for pk in window.entries if pk > synced_pk
+            )
+
+    if window is not None:
+        changed = Q(pk__gt=synced_pk)
+        if synced_at is not None:
+            changed |= Q(updated_at__gte=synced_at)
+        messages = list(
+            Message.objects.filter(changed, conversation=conversation).order_by("pk")
+        )
+        newer = [message for message in messages if message.pk > synced_pk]
+        if synced + len(newer) == conversation.total_messages:
+            with _lock:
+                for message in messages:
+                    # Updated messages older than the window are not needed
+                    if message.pk > synced_pk or message.pk in window.entries:
+                        window.entries[message.pk] = _build_entry(message)
+                window.entries = dict(sorted(window.entries.items()))
+                if newer:
+                    window.synced_pk = newer[-1].pk
+                updated = [message.updated_at for message in messages]
+                if synced_at is not None:
+                    updated.append(synced_at)
+                window.synced_at = max(updated, default=None)
+                window.total_messages = conversation.total_messages
+                _trim(window)
+            return window
+
+    return _load_window(conversation)
+
+
+def _load_window(conversation: Conversation) -> _HistoryWindow:
+    """Build the window of a conversation from its latest messages."""
+    messages = get_conversation_history(conversation, limit=WINDOW_SIZE)
+    window = _HistoryWindow(
+        total_messages=conversation.total_messages,
+        synced_pk=max((message.pk for message in messages), default=0),
+        synced_at=max((message.updated_at for message in messages), default=None),
+        complete=len(messages) < WINDOW_SIZE,
+        entries={
+            message.pk: _build_entry(message)
+            for message in sorted(messages, key=lambda message: message.pk)
+        },
+    )
+    with _lock:
+        _windows[conversation.pk] = window
+        _windows.move_to_end(conversation.pk)
+        while len(_windows) > CACHE_SIZE:
+            _windows.popitem(last=False)
+    return window
+
+
+def _build_entry(message: Message) -> _Entry:
+    content = format_message_for_gemini(message)
+    return _Entry(
+        content, estimate_tokens(message.content) if content is not None else 0
+    )
+
+
+def _trim(window: _HistoryWindow) -> None:
+    """Keep the latest WINDOW_CAPACITY entries of a window (lock held)."""
+    excess = len(window.entries) - WINDOW_CAPACITY
+    if excess > 0:
+        for pk in list(window.entries)[:excess]:
+            del window.entries[pk]
+        window.complete = False
@@ -10,7 +10,7 @@ Usage:
     
     # Import specific integrations
     from services.integrations.ispcube import ISPCubeClient
-    from services.integrations.ispcube.service import get_company_ispcube_client
+    from services.integrations.ispcube.service import aget_company_ispcube_client
 """
 
 from services.integrations.base import BaseISPIntegration, IntegrationError
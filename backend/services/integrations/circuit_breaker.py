@@ -0,0 +1,92 @@
+"""
+Circuit breaker for ISP management system APIs.
+
+When an ISP's system is down, every call would otherwise wait for its
+timeout. After `failure_threshold` consecutive failures the circuit opens
+and calls are rejected immediately; after `reset_timeout` seconds one trial
+call is let through, and its outcome closes or reopens the circuit.
+
+Breakers are shared per integration within a process (see
+get_circuit_breaker()), so all clients of a tenant fail fast together.
+"""
+
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Args:
+        failure_threshold: Consecutive failures that open the circuit
+        reset_timeout: Seconds before a trial call is allowed again
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls are currently being rejected."""
+        with self._lock:
+            return self._opened_at is not None and not self._can_try(time.monotonic())
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may go through, reserving the trial call if due.
+
+        Returns:
+            True if the call may be made, False to fail fast
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._can_try(now):
+                # Restart the timeout: one trial call per period
+                self._opened_at = now
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful call."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self) -> None:
+        """Count a failed call, opening the circuit at the threshold."""
+        with self._lock:
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+    def _can_try(self, now: float) -> bool:
+        """Whether the open circuit is due for a trial call (lock held)."""
+        return now - self._opened_at >= self.reset_timeout
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(key: str) -> CircuitBreaker:
+    """
+    Get the process-wide circuit breaker of an integration.
+
+    Args:
+        key: Integration identifier (e.g. the API base URL)
+
+    Returns:
+        CircuitBreaker shared by every client using the same key
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = _breakers[key] = CircuitBreaker()
+        return breaker
@@ -4,19 +4,28 @@ ISPCube API Client.
 This module provides the main client for interacting with ISPCube's API.
 """
 
+import asyncio
 import logging
+import random
+from collections.abc import AsyncIterator
 from datetime import datetime, timedelta
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Optional
 
 import httpx
 
+from api.utils.metrics import observe_ispcube_request, observe_ispcube_response
 from services.integrations.base import BaseISPIntegration
+from services.integrations.circuit_breaker import get_circuit_breaker
 from services.integrations.ispcube.exceptions import (
     ISPCubeAPIError,
     ISPCubeAuthError,
+    ISPCubeUnavailableError,
 )
 from services.integrations.ispcube.types import ISPCubeAuthResponse, ISPCubeConfig
 
+if TYPE_CHECKING:
+    from services.integrations.ispcube.token_store import ISPCubeTokenStore
+
 logger = logging.getLogger(__name__)
 
 
@@ -40,29 +49,73 @@ class ISPCubeClient(BaseISPIntegration):
         >>> client = ISPCubeClient(config)
         >>> await client.authenticate()
         >>> customers = await client.get_customers()
+        >>> async for customer in client.iter_customers():
+        ...     ...
+
+    With a token store, tokens are shared through the database instead of
+    each client logging in (see get_ispcube_client()). Pooled clients
+    (see get_pooled_ispcube_client()) speak HTTP/2 and are kept open for the
+    life of the process: leaving their `async with` block does not close them.
+
+    API calls re-authenticate once and replay on 401, GETs are retried with
+    jittered backoff on connection failures and 5xx errors, and a circuit
+    breaker shared by every client of the same ISPCube tenant fails fast
+    while the tenant is down.
     """
 
     TOKEN_VALIDITY_HOURS = 24  # ISPCube tokens are valid for 24 hours
-
-    def __init__(self, config: ISPCubeConfig):
+    TOKEN_REFRESH_MARGIN = timedelta(
+        minutes=10
+    )  # Refresh tokens this long before they expire
+    MAX_RETRIES = 2  # Extra GET attempts after connection failures and 5xx errors
+    RETRY_BACKOFF = (
+        0.5  # Seconds before the first retry, doubled (with jitter) after each one
+    )
+    PAGE_SIZE = 100  # ISPCube max records per customers_list page
+    PAGE_CONCURRENCY = 4  # customers_list pages fetched at once by iter_customers()
+
+    # Connection pool, kept warm between calls by pooled clients
+    HTTP_LIMITS = httpx.Limits(
+        max_connections=20,
+        max_keepalive_connections=10,
+        keepalive_expiry=120.0,
+    )
+
+    def __init__(
+        self,
+        config: ISPCubeConfig,
+        token_store: Optional["ISPCubeTokenStore"] = None,
+        pooled: bool = False,
+    ):
         """
         Initialize ISPCube client.
 
         Args:
             config: ISPCube configuration dictionary
+            token_store: Shared token storage (optional)
+            pooled: Long-lived client owned by the client registry
         """
         super().__init__(config)
+        self.token_store = token_store
+        self.pooled = pooled
         self.base_url = config["base_url"]
         self.subdomain = config["subdomain"]
         self.username = config["username"]
         self.password = config["password"]
         self.api_key = config["api_key"]
         self.client_id = config["client_id"]
+        self.circuit_breaker = get_circuit_breaker(self.base_url)
 
         # HTTP client with reasonable defaults
         self._http_client = httpx.AsyncClient(
-            timeout=httpx.Timeout(30.0),
+            timeout=httpx.Timeout(30.0, connect=5.0),
             follow_redirects=True,
+            http2=pooled,
+            limits=self.HTTP_LIMITS,
+            event_hooks={
+                "request": [observe_ispcube_request],
+                "response": [observe_ispcube_response],
+            },
         )
 
     async def __aenter__(self):
@@ -70,8 +123,9 @@ class ISPCubeClient(BaseISPIntegration):
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Async context manager exit."""
-        await self.close()
+        """Async context manager exit (pooled clients stay open)."""
+        if not self.pooled:
+            await self.close()
 
     async def close(self) -> None:
         """Close the HTTP client."""
@@ -129,6 +183,54 @@ class ISPCubeClient(BaseISPIntegration):
         Returns:
             Dictionary containing token and expiration info
 
+        Raises:
+            ISPCubeAuthError: If authentication fails
+            ISPCubeAPIError: If API request fails
+        """
+        token = await self._request_token()
+
+        # Store token and expiration
+        self._token = token
+        self._token_expires_at = datetime.now() + timedelta(
+            hours=self.TOKEN_VALIDITY_HOURS
+        )
+        logger.debug(f"Token expires at: {self._token_expires_at}")
+
+        return {
+            "token": token,
+            "expires_in": self.TOKEN_VALIDITY_HOURS,
+        }
+
+    async def ensure_authenticated(self) -> None:
+        """
+        Ensure we have a valid token, refreshing it shortly before it expires.
+
+        With a token store, the shared token is used and only refreshed by
+        one process at a time.
+        """
+        if self.is_authenticated and (
+            self._token_expires_at is None
+            or self._token_expires_at - self.TOKEN_REFRESH_MARGIN > datetime.now()
+        ):
+            return
+
+        if self.token_store is None:
+            await self.authenticate()
+            return
+
+        token, expires_at = await self.token_store.get_token(self._request_token)
+        self._set_token(token, expires_at)
+
+    def _set_token(self, token: str, expires_at: datetime) -> None:
+        """Use a token from the token store."""
+        self._token = token
+        # Naive local time, like the rest of BaseISPIntegration
+        self._token_expires_at = expires_at.astimezone().replace(tzinfo=None)
+
+    async def _request_token(self) -> str:
+        """
+        Log in to ISPCube and return a new bearer token.
+
         Raises:
             ISPCubeAuthError: If authentication fails
             ISPCubeAPIError: If API request fails
@@ -179,19 +281,8 @@ class ISPCubeClient(BaseISPIntegration):
             if not token:
                 raise ISPCubeAuthError("Authentication returned empty token")
 
-            # Store token and expiration
-            self._token = token
-            self._token_expires_at = datetime.now() + timedelta(
-                hours=self.TOKEN_VALIDITY_HOURS
-            )
-
             logger.info(f"Successfully authenticated with ISPCube ({self.subdomain})")
-            logger.debug(f"Token expires at: {self._token_expires_at}")
-
-            return {
-                "token": token,
-                "expires_in": self.TOKEN_VALIDITY_HOURS,
-            }
+            return token
 
         except httpx.RequestError as e:
             raise ISPCubeAPIError(f"Network error during authentication: {str(e)}")
@@ -234,12 +325,10 @@ class ISPCubeClient(BaseISPIntegration):
             List of customer dictionaries
 
         Raises:
-            ISPCubeAuthError: If not authenticated
+            ISPCubeAuthError: If authentication fails
+            ISPCubeUnavailableError: If ISPCube keeps failing (circuit breaker open)
             ISPCubeAPIError: If API request fails
         """
-        await self.ensure_authenticated()
-
-        url = f"{self.base_url}/api/customers/customers_list"
         params = {
             "limit": min(limit, 100),  # ISPCube max is 100
             "offset": offset,
@@ -252,28 +341,221 @@ class ISPCubeClient(BaseISPIntegration):
         if temporary:
             params["temporary"] = "true"
 
-        try:
-            response = await self._http_client.get(
-                url, params=params, headers=self._get_api_headers()
+        response = await self._request(
+            "GET", "/api/customers/customers_list", params=params
+        )
+
+        if response.status_code != 200:
+            raise ISPCubeAPIError(
+                f"Get customers failed with status {response.status_code}",
+                status_code=response.status_code,
+                response=response.text,
             )
 
-            if response.status_code == 401:
-                # Token expired, clear it and raise
-                self._token = None
-                raise ISPCubeAuthError("Token expired or invalid")
+        customers = response.json()
+        logger.info(f"Retrieved {len(customers)} customers from ISPCube")
 
-            if response.status_code != 200:
-                raise ISPCubeAPIError(
-                    f"Get customers failed with status {response.status_code}",
-                    status_code=response.status_code,
-                    response=response.text,
+        return customers
+
+    async def get_customer_summary(self) -> dict[str, int]:
+        """
+        Retrieve customer and connection counts from ISPCube.
+
+        Returns:
+            Dictionary with "customers", "customers_with_active_connection"
+            and "connections" counts
+
+        Raises:
+            ISPCubeAuthError: If authentication fails
+            ISPCubeUnavailableError: If ISPCube keeps failing (circuit breaker open)
+            ISPCubeAPIError: If API request fails
+        """
+        response = await self._request("GET", "/api/customer/summary")
+
+        if response.status_code != 200:
+            raise ISPCubeAPIError(
+                f"Get customer summary failed with status {response.status_code}",
+                status_code=response.status_code,
+                response=response.text,
+            )
+
+        return response.json()
+
+    async def iter_customers(
+        self,
+        concurrency: int = PAGE_CONCURRENCY,
+        deleted: bool = False,
+        temporary: bool = False,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Iterate over every customer in ISPCube, page by page.
+
+        Once the first page is full, the customer total is read from
+        get_customer_summary() and the remaining pages are fetched up to
+        `concurrency` at a time. Customers are yielded as their page
+        arrives, so pages may come out of order, and at most `concurrency`
+        pages are held in memory. Pages past the total (customers added
+        meanwhile) are walked sequentially until a short page.
+
+        Without a usable total (deleted/temporary customers requested, or
+        the summary is not available) pages are walked sequentially.
+
+        Args:
+            concurrency: Pages fetched at once (1 walks offsets sequentially)
+            deleted: Include deleted customers
+            temporary: Include temporary customers
+
+        Yields:
+            Customer dictionaries
+
+        Raises:
+            ISPCubeAuthError: If authentication fails
+            ISPCubeUnavailableError: If ISPCube keeps failing (circuit breaker open)
+            ISPCubeAPIError: If API request fails
+        """
+
+        def fetch(offset: int):
+            return self.get_customers(
+                limit=self.PAGE_SIZE,
+                offset=offset,
+                deleted=deleted,
+                temporary=temporary,
+            )
+
+        page = await fetch(0)
+        for customer in page:
+            yield customer
+        if len(page) < self.PAGE_SIZE:
+            return
+        offset = self.PAGE_SIZE
+
+        total = None
+        if concurrency > 1 and not deleted and not temporary:
+            try:
+                total = (await self.get_customer_summary())["customers"]
+            except (ISPCubeAPIError, KeyError, TypeError) as e:
+                logger.warning(
+                    f"ISPCube ({self.subdomain}) customer total unavailable, "
+                    f"paging sequentially: {str(e)}"
                 )
 
-            customers = response.json()
-            logger.info(f"Retrieved {len(customers)} customers from ISPCube")
+        if total is not None:
+            pending: set[asyncio.Task] = set()
+            complete = True
+            try:
+                while pending or offset < total:
+                    while len(pending) < concurrency and offset < total:
+                        pending.add(asyncio.create_task(fetch(offset)))
+                        offset += self.PAGE_SIZE
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        page = task.result()
+                        complete = complete and len(page) == self.PAGE_SIZE
+                        for customer in page:
+                            yield customer
+            finally:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+            if not complete:
+                return
+
+        while True:
+            page = await fetch(offset)
+            for customer in page:
+                yield customer
+            if len(page) < self.PAGE_SIZE:
+                return
+            offset += self.PAGE_SIZE
+
+    async def _request(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        """
+        Make an authenticated API request.
 
-            return customers
+        On a 401 the token is replaced once and the request replayed. GET
+        requests are retried up to MAX_RETRIES times on connection failures
+        and 5xx responses. Read timeouts are not retried: ISPCube is already
+        slow, and another full timeout would only keep the caller waiting.
+        Every failed attempt counts toward the circuit breaker.
 
-        except httpx.RequestError as e:
-            raise ISPCubeAPIError(f"Network error while fetching customers: {str(e)}")
+        Args:
+            method: HTTP method
+            path: API path (e.g. "/api/customers/customers_list")
+            **kwargs: Arguments for the httpx request (params, json...)
+
+        Returns:
+            Response of the last attempt
 
+        Raises:
+            ISPCubeAuthError: If authentication fails or the new token is refused too
+            ISPCubeUnavailableError: If the circuit breaker is open
+            ISPCubeAPIError: On network errors
+        """
+        url = f"{self.base_url}{path}"
+        send = getattr(self._http_client, method.lower())
+        retries = self.MAX_RETRIES if method == "GET" else 0
+        reauthenticated = False
+        attempt = 0
+
+        while True:
+            if not self.circuit_breaker.allow_request():
+                raise ISPCubeUnavailableError(
+                    f"ISPCube ({self.subdomain}) is unavailable, not retrying yet"
+                )
+
+            await self.ensure_authenticated()
+            try:
+                response = await send(url, headers=self._get_api_headers(), **kwargs)
+            except httpx.RequestError as e:
+                self.circuit_breaker.record_failure()
+                connect_failed = isinstance(
+                    e, (httpx.ConnectError, httpx.ConnectTimeout)
+                )
+                if connect_failed and attempt < retries:
+                    attempt += 1
+                    await self._backoff(attempt, type(e).__name__)
+                    continue
+                raise ISPCubeAPIError(f"Network error calling {path}: {str(e)}") from e
+
+            if response.status_code >= 500:
+                self.circuit_breaker.record_failure()
+                if attempt < retries:
+                    attempt += 1
+                    await self._backoff(attempt, f"status {response.status_code}")
+                    continue
+                return response
+
+            self.circuit_breaker.record_success()
+
+            if response.status_code == 401:
+                if reauthenticated:
+                    self._token = None
+                    raise ISPCubeAuthError("Token expired or invalid")
+                # Token expired or revoked: get a new one and replay
+                reauthenticated = True
+                await self._replace_token()
+                continue
+
+            return response
+
+    async def _replace_token(self) -> None:
+        """Replace a token ISPCube refused."""
+        rejected, self._token = self._token, None
+        if self.token_store is None:
+            await self.authenticate()
+            return
+        token, expires_at = await self.token_store.get_token(
+            self._request_token, rejected=rejected
+        )
+        self._set_token(token, expires_at)
+
+    async def _backoff(self, attempt: int, reason: str) -> None:
+        """Wait before a retry: exponential backoff with full jitter."""
+        delay = random.uniform(0, self.RETRY_BACKOFF * 2 ** (attempt - 1))
+        logger.warning(
+            f"ISPCube ({self.subdomain}) request failed ({reason}), "
+            f"retry {attempt}/{self.MAX_RETRIES} in {delay:.2f}s"
+        )
+        await asyncio.sleep(delay)
@@ -23,6 +23,12 @@ class ISPCubeAPIError(APIError):
     pass
 
 
+class ISPCubeUnavailableError(ISPCubeAPIError):
+    """ISPCube keeps failing; requests are rejected until it recovers."""
+
+    pass
+
+
 class ISPCubeValidationError(ISPCubeError):
     """ISPCube request validation failed."""
 
@@ -3,18 +3,28 @@ Service layer for ISPCube integration.
 
 This module provides helper functions to work with ISPCube integration
 and Django models.
-"""
-
-from api.models.ispcube_integration import ISPCubeIntegration
 
+Clients returned by aget_company_ispcube_client() come from a registry of
+long-lived clients, one per integration and event loop (connections are
+bound to the loop that opened them), so repeated lookups reuse warm
+connections. Saving or deleting an integration evicts its clients in the
+current process (see api.signals); other processes notice the change
+through `updated_at` on their next lookup. Call aclose_ispcube_clients()
+on shutdown.
+"""
 
-from typing import Optional
+import asyncio
+import os
+import threading
+from datetime import datetime, timedelta
 
 from django.core.exceptions import ObjectDoesNotExist
 
 from api.models import Company, ISPCubeIntegration
+from api.utils.async_db import database_sync_to_async
 from services.integrations.ispcube.client import ISPCubeClient
 from services.integrations.ispcube.exceptions import ISPCubeError
+from services.integrations.ispcube.token_store import ISPCubeTokenStore
 from services.integrations.ispcube.types import ISPCubeConfig
 
 
@@ -37,17 +47,33 @@ def get_ispcube_config(integration: ISPCubeIntegration) -> ISPCubeConfig:
         "username": integration.username,
         "password": integration.password,  # Auto-decrypted by EncryptedCharField
         "api_key": integration.api_key,  # Auto-decrypted by EncryptedCharField
-        "client_id": str(integration.company.id),
+        "client_id": str(integration.company_id),
         "base_url": integration.base_url,
     }
 
 
-def get_ispcube_client(integration: ISPCubeIntegration) -> ISPCubeClient:
+# (event loop, integration pk) -> (integration updated_at, client)
+_clients: dict[
+    tuple[asyncio.AbstractEventLoop, int], tuple[datetime, ISPCubeClient]
+] = {}
+# Evicted clients and their loop, closed by aclose_ispcube_clients()
+_retired: list[tuple[asyncio.AbstractEventLoop, ISPCubeClient]] = []
+_clients_pid: int | None = None
+_clients_lock = threading.Lock()
+
+
+def get_ispcube_client(
+    integration: ISPCubeIntegration, pooled: bool = False
+) -> ISPCubeClient:
     """
     Create ISPCube client from integration model.
 
+    The client shares the integration's stored token with every other
+    client and process, so it only logs in when that token expires.
+
     Args:
         integration: ISPCubeIntegration model instance
+        pooled: Build a long-lived client (use get_pooled_ispcube_client())
 
     Returns:
         Configured ISPCubeClient instance
@@ -59,29 +85,103 @@ def get_ispcube_client(integration: ISPCubeIntegration) -> ISPCubeClient:
         ...     customers = await client.get_customers()
     """
     config = get_ispcube_config(integration)
-    return ISPCubeClient(config)
+    token_store = ISPCubeTokenStore(
+        integration.pk,
+        validity=timedelta(hours=ISPCubeClient.TOKEN_VALIDITY_HOURS),
+        refresh_margin=ISPCubeClient.TOKEN_REFRESH_MARGIN,
+    )
+    return ISPCubeClient(config, token_store=token_store, pooled=pooled)
 
 
-def get_company_ispcube_client(company: Company, subdomain: Optional[str] = None) -> ISPCubeClient:
+def get_pooled_ispcube_client(integration: ISPCubeIntegration) -> ISPCubeClient:
     """
-    Get ISPCube client for a company.
+    Get the long-lived client of an integration for the running event loop.
+
+    The client is created on first use and replaced when the integration
+    changes. Each event loop gets its own client (another `asyncio.run()`
+    never reuses sockets of a finished loop), and clients are rebuilt after
+    a fork, so processes never share sockets.
+
+    Called without a running event loop, it returns a new, unpooled client
+    the caller must close (e.g. with `async with`).
+
+    Args:
+        integration: ISPCubeIntegration model instance
+
+    Returns:
+        Long-lived ISPCubeClient (HTTP/2, keep-alive)
+    """
+    global _clients_pid
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return get_ispcube_client(integration)
+
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            _clients.clear()
+            _retired.clear()
+            _clients_pid = os.getpid()
+        _drop_closed_loops()
+
+        key = (loop, integration.pk)
+        entry = _clients.get(key)
+        if entry is not None and entry[0] == integration.updated_at:
+            return entry[1]
+        if entry is not None:
+            _retired.append((loop, entry[1]))
+
+        client = get_ispcube_client(integration, pooled=True)
+        _clients[key] = (integration.updated_at, client)
+        return client
+
+
+def evict_ispcube_client(integration_id: int) -> None:
+    """Drop the pooled clients of an integration (closed on shutdown)."""
+    with _clients_lock:
+        for key in [key for key in _clients if key[1] == integration_id]:
+            _retired.append((key[0], _clients.pop(key)[1]))
+
+
+async def aclose_ispcube_clients() -> None:
+    """Close the pooled clients of the running event loop (call on worker shutdown)."""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            return
+        clients = [client for client_loop, client in _retired if client_loop is loop]
+        _retired[:] = [entry for entry in _retired if entry[0] is not loop]
+        for key in [key for key in _clients if key[0] is loop]:
+            clients.append(_clients.pop(key)[1])
+
+    for client in clients:
+        await client.close()
+
+
+def _drop_closed_loops() -> None:
+    """Forget clients of finished event loops, whose sockets are gone (lock held)."""
+    for key in [key for key in _clients if key[0].is_closed()]:
+        del _clients[key]
+    _retired[:] = [entry for entry in _retired if not entry[0].is_closed()]
+
+
+def _get_company_integration(
+    company: Company, subdomain: str | None = None
+) -> ISPCubeIntegration:
+    """
+    Get the active ISPCube integration of a company.
 
     Args:
         company: Company instance
         subdomain: Optional subdomain filter (if company has multiple integrations)
 
     Returns:
-        Configured ISPCubeClient instance
+        ISPCubeIntegration instance
 
     Raises:
         ObjectDoesNotExist: If no active integration found for company
         ISPCubeError: If multiple integrations found and no subdomain specified
-
-    Example:
-        >>> company = Company.objects.get(id=1)
-        >>> async with get_company_ispcube_client(company) as client:
-        ...     await client.authenticate()
-        ...     customers = await client.get_customers()
     """
     query = ISPCubeIntegration.objects.filter(company=company, is_active=True)
 
@@ -101,10 +201,65 @@ def get_company_ispcube_client(company: Company, subdomain: Optional[str] = None
             "Please specify subdomain."
         )
 
-    return get_ispcube_client(integrations[0])
+    return integrations[0]
+
+
+def get_company_ispcube_client(
+    company: Company, subdomain: str | None = None
+) -> ISPCubeClient:
+    """
+    Get ISPCube client for a company.
+
+    Queries the database synchronously and returns an unpooled client the
+    caller must close; async code should use aget_company_ispcube_client().
+
+    Args:
+        company: Company instance
+        subdomain: Optional subdomain filter (if company has multiple integrations)
+
+    Returns:
+        Configured ISPCubeClient instance
+
+    Raises:
+        ObjectDoesNotExist: If no active integration found for company
+        ISPCubeError: If multiple integrations found and no subdomain specified
+    """
+    return get_ispcube_client(_get_company_integration(company, subdomain))
+
+
+async def aget_company_ispcube_client(
+    company: Company, subdomain: str | None = None
+) -> ISPCubeClient:
+    """
+    Get the pooled ISPCube client of a company for the running event loop.
+
+    The integration is loaded on the database executor; the client is shared
+    and must not be closed by the caller.
+
+    Args:
+        company: Company instance
+        subdomain: Optional subdomain filter (if company has multiple integrations)
+
+    Returns:
+        Pooled ISPCubeClient instance, see get_pooled_ispcube_client()
+
+    Raises:
+        ObjectDoesNotExist: If no active integration found for company
+        ISPCubeError: If multiple integrations found and no subdomain specified
+
+    Example:
+        >>> client = await aget_company_ispcube_client(company)
+        >>> customers = await client.get_customers()
+    """
+    integration = await database_sync_to_async(_get_company_integration)(
+        company, subdomain
+    )
+    return get_pooled_ispcube_client(integration)
 
 
-async def validate_ispcube_integration(integration: ISPCubeIntegration) -> tuple[bool, Optional[str]]:
+async def validate_ispcube_integration(
+    integration: ISPCubeIntegration,
+) -> tuple[bool, str | None]:
     """
     Test ISPCube integration connection.
 
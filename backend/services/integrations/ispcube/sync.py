@@ -0,0 +1,249 @@
+"""
+Synchronization of ISPCube customers into Customer.
+
+ISPCube is the system of record of an ISP's subscribers: every ISPCube
+customer becomes a Customer of the integration's company, keyed by
+`external_id` (the ISPCube customer ID). Customers are streamed with
+ISPCubeClient.iter_customers() and upserted CHUNK_SIZE at a time with one
+INSERT ... ON CONFLICT per chunk, so memory stays bounded and no model
+save() or validation runs per row.
+
+customers_list cannot be filtered by update time, so incremental syncs
+still page through every customer but only write the ones ISPCube updated
+since the integration's high-water mark (`customers_synced_through`). The
+mark only moves after a complete sync.
+
+Phones are unique per company: a customer created from WhatsApp before
+the sync (no `external_id` yet) is linked to the ISPCube customer with
+the same phone, and an ISPCube customer whose phone belongs to another
+one (e.g. shared by family members) is skipped.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from api.models.customer import Customer
+from api.models.ispcube_integration import ISPCubeIntegration
+from api.utils.async_db import database_sync_to_async
+from api.utils.phone import PhoneNumber, normalize_phones
+from services.integrations.ispcube.service import get_ispcube_client
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000  # Customers upserted per query
+PHONE_REGION = "AR"  # Country of the national-format phones stored in ISPCube
+# Incremental syncs also rewrite customers updated this long before the
+# mark, in case they changed while the previous sync was paging
+SYNC_OVERLAP = timedelta(hours=1)
+# Fields overwritten on existing customers (created_at, last_interaction are kept)
+UPDATE_FIELDS = ["phone", "name", "email", "metadata", "updated_at"]
+# ISPCube customer fields kept in Customer.metadata["ispcube"]
+METADATA_FIELDS = ("code", "doc_number", "status", "debt", "duedebt")
+
+
+@dataclass
+class CustomerSyncResult:
+    """Counts of a customer sync."""
+
+    # Customers read from ISPCube
+    fetched: int = 0
+    # Customers created or updated
+    written: int = 0
+    # Customers not updated since the previous sync
+    unchanged: int = 0
+    # Customers without a valid phone, or whose phone belongs to another customer
+    skipped: int = 0
+
+
+async def sync_ispcube_customers(
+    integration: ISPCubeIntegration, full: bool = False
+) -> CustomerSyncResult:
+    """
+    Create or update the Customers of a company from its ISPCube customers.
+
+    Args:
+        integration: ISPCubeIntegration to sync
+        full: Rewrite every customer, ignoring the high-water mark
+
+    Returns:
+        CustomerSyncResult with the counts of the sync
+
+    Raises:
+        ISPCubeAuthError: If authentication fails
+        ISPCubeAPIError: If ISPCube requests fail
+    """
+    synced_through = integration.customers_synced_through
+    since = None
+    if synced_through is not None and not full:
+        since = synced_through - SYNC_OVERLAP
+
+    result = CustomerSyncResult()
+    chunk: list[dict[str, Any]] = []
+
+    client = await database_sync_to_async(get_ispcube_client)(integration)
+    async with client:
+        async for record in client.iter_customers():
+            result.fetched += 1
+            updated_at = parse_datetime(record.get("updated_at") or "")
+            if updated_at is not None:
+                if synced_through is None or updated_at > synced_through:
+                    synced_through = updated_at
+                if since is not None and updated_at < since:
+                    result.unchanged += 1
+                    continue
+
+            chunk.append(record)
+            if len(chunk) == CHUNK_SIZE:
+                await _write_chunk(integration.company_id, chunk, result)
+                chunk = []
+
+        if chunk:
+            await _write_chunk(integration.company_id, chunk, result)
+
+    # A queryset update: saving the model would evict pooled clients
+    await database_sync_to_async(
+        ISPCubeIntegration.objects.filter(pk=integration.pk).update
+    )(customers_synced_through=synced_through)
+    integration.customers_synced_through = synced_through
+
+    logger.info(
+        f"Synced ISPCube customers of {integration.subdomain}: {result.fetched} fetched, "
+        f"{result.written} written, {result.unchanged} unchanged, {result.skipped} skipped"
+    )
+    return result
+
+
+async def _write_chunk(
+    company_id: int, records: list[dict[str, Any]], result: CustomerSyncResult
+) -> None:
+    """Upsert a chunk of ISPCube customers and count the outcome."""
+    written = await database_sync_to_async(_upsert_customers)(company_id, records)
+    result.written += written
+    result.skipped += len(records) - written
+
+
+def _upsert_customers(company_id: int, records: list[dict[str, Any]]) -> int:
+    """
+    Upsert ISPCube customers into Customer.
+
+    Args:
+        company_id: Company the customers belong to
+        records: ISPCube customer dictionaries
+
+    Returns:
+        Number of customers created or updated
+    """
+    phones = normalize_phones(
+        (number for record in records for number in _get_phone_numbers(record)),
+        PHONE_REGION,
+    )
+
+    # external_id -> customer, and phone -> external_id (first customer wins)
+    customers: dict[str, Customer] = {}
+    phone_owners: dict[str, str] = {}
+    for record in records:
+        customer = _build_customer(company_id, record, phones)
+        if (
+            customer is None
+            or customer.external_id in customers
+            or customer.phone in phone_owners
+        ):
+            continue
+        customers[customer.external_id] = customer
+        phone_owners[customer.phone] = customer.external_id
+    if not customers:
+        return 0
+
+    with transaction.atomic():
+        existing = set(
+            Customer.objects.filter(
+                company_id=company_id, external_id__in=customers
+            ).values_list("external_id", flat=True)
+        )
+        linked = []
+        for pk, phone, external_id in Customer.objects.filter(
+            company_id=company_id, phone__in=phone_owners
+        ).values_list("pk", "phone", "external_id"):
+            owner = phone_owners[phone]
+            if external_id == owner:
+                continue
+            if not external_id and owner not in existing:
+                # Customer from WhatsApp: it becomes the ISPCube customer
+                linked.append(Customer(pk=pk, external_id=owner))
+            else:
+                customers.pop(owner, None)
+
+        if linked:
+            Customer.objects.bulk_update(linked, ["external_id"])
+        Customer.objects.bulk_create(
+            list(customers.values()),
+            update_conflicts=True,
+            unique_fields=["company", "external_id"],
+            update_fields=UPDATE_FIELDS,
+        )
+
+    return len(customers)
+
+
+def _build_customer(
+    company_id: int, record: dict[str, Any], phones: dict[str, PhoneNumber]
+) -> Customer | None:
+    """
+    Build an unsaved Customer from an ISPCube customer.
+
+    Args:
+        company_id: Company the customer belongs to
+        record: ISPCube customer dictionary
+        phones: Normalized phones by raw number (see normalize_phones())
+
+    Returns:
+        Customer with its first valid phone, or None if it has none
+    """
+    phone = next(
+        (
+            phones[number]
+            for number in _get_phone_numbers(record)
+            if phones[number].valid
+        ),
+        None,
+    )
+    if phone is None:
+        return None
+
+    return Customer(
+        company_id=company_id,
+        external_id=str(record["id"]),
+        phone=phone.e164,
+        name=(record.get("name") or phone.e164)[:255],
+        email=_get_email(record),
+        metadata={"ispcube": {field: record.get(field) for field in METADATA_FIELDS}},
+    )
+
+
+def _get_phone_numbers(record: dict[str, Any]) -> list[str]:
+    """Raw phone numbers of an ISPCube customer."""
+    return [
+        str(phone["number"])
+        for phone in record.get("phones") or []
+        if phone.get("number")
+    ]
+
+
+def _get_email(record: dict[str, Any]) -> str | None:
+    """First valid contact email of an ISPCube customer."""
+    for contact in record.get("contact_emails") or []:
+        email = (contact.get("email") or "").strip()
+        try:
+            validate_email(email)
+        except ValidationError:
+            continue
+        if len(email) <= 254:
+            return email
+    return None
@@ -8,10 +8,12 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import httpx
 
+from services.integrations.circuit_breaker import CircuitBreaker
 from services.integrations.ispcube.client import ISPCubeClient
 from services.integrations.ispcube.exceptions import (
     ISPCubeAPIError,
     ISPCubeAuthError,
+    ISPCubeUnavailableError,
 )
 
 
@@ -324,6 +326,297 @@ class TestISPCubeGetCustomers:
                 mock_auth.assert_called_once()
 
 
+def make_response(status_code, json_data=None):
+    """Build a mock httpx response."""
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = json_data if json_data is not None else []
+    response.text = ""
+    return response
+
+
+def login_as(client, token):
+    """Side effect for a mocked authenticate() that stores `token`."""
+
+    async def authenticate():
+        client._token = token
+        client._token_expires_at = datetime.now() + timedelta(hours=24)
+
+    return authenticate
+
+
+@pytest.fixture
+def authenticated_client(ispcube_client):
+    """Fixture providing an authenticated client with its own circuit breaker."""
+    ispcube_client._token = "valid-token"
+    ispcube_client._token_expires_at = datetime.now() + timedelta(hours=12)
+    ispcube_client.circuit_breaker = CircuitBreaker(
+        failure_threshold=3, reset_timeout=30
+    )
+    return ispcube_client
+
+
+class TestISPCubeRequestRetries:
+    """Tests for re-authentication, retries and the circuit breaker."""
+
+    @pytest.mark.asyncio
+    async def test_reauthenticates_and_replays_on_401(self, authenticated_client):
+        """A 401 gets a new token and the request is replayed once."""
+        with (
+            patch.object(
+                authenticated_client, "authenticate", new_callable=AsyncMock
+            ) as mock_auth,
+            patch.object(
+                authenticated_client._http_client, "get", new_callable=AsyncMock
+            ) as mock_get,
+        ):
+            mock_auth.side_effect = login_as(authenticated_client, "new-token")
+            mock_get.side_effect = [make_response(401), make_response(200, [{"id": 1}])]
+
+            customers = await authenticated_client.get_customers()
+
+            assert customers == [{"id": 1}]
+            mock_auth.assert_called_once()
+            assert mock_get.call_count == 2
+            replay_headers = mock_get.call_args[1]["headers"]
+            assert replay_headers["Authorization"] == "Bearer new-token"
+
+    @pytest.mark.asyncio
+    async def test_second_401_raises_auth_error(self, authenticated_client):
+        """The request is replayed only once after a 401."""
+        with (
+            patch.object(
+                authenticated_client, "authenticate", new_callable=AsyncMock
+            ) as mock_auth,
+            patch.object(
+                authenticated_client._http_client, "get", new_callable=AsyncMock
+            ) as mock_get,
+        ):
+            mock_auth.side_effect = login_as(authenticated_client, "new-token")
+            mock_get.return_value = make_response(401)
+
+            with pytest.raises(ISPCubeAuthError):
+                await authenticated_client.get_customers()
+
+            assert mock_get.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_retries_get_on_server_error(self, authenticated_client):
+        """GETs are retried after 5xx responses."""
+        with (
+            patch.object(
+                authenticated_client._http_client, "get", new_callable=AsyncMock
+            ) as mock_get,
+            patch(
+                "services.integrations.ispcube.client.asyncio.sleep",
+                new_callable=AsyncMock,
+            ) as mock_sleep,
+        ):
+            mock_get.side_effect = [make_response(503), make_response(200, [{"id": 1}])]
+
+            customers = await authenticated_client.get_customers()
+
+            assert customers == [{"id": 1}]
+            mock_sleep.assert_called_once()
+            assert authenticated_client.circuit_breaker.is_open is False
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self, authenticated_client):
+        """Connect timeouts are retried MAX_RETRIES times, then surface as API errors."""
+        with (
+            patch.object(
+                authenticated_client._http_client, "get", new_callable=AsyncMock
+            ) as mock_get,
+            patch(
+                "services.integrations.ispcube.client.asyncio.sleep",
+                new_callable=AsyncMock,
+            ),
+        ):
+            mock_get.side_effect = httpx.ConnectTimeout("Timed out")
+
+            with pytest.raises(ISPCubeAPIError):
+                await authenticated_client.get_customers()
+
+            assert mock_get.call_count == ISPCubeClient.MAX_RETRIES + 1
+
+    @pytest.mark.asyncio
+    async def test_read_timeouts_are_not_retried(self, authenticated_client):
+        """A read timeout fails the request right away."""
+        with (
+            patch.object(
+                authenticated_client._http_client, "get", new_callable=AsyncMock
+            ) as mock_get,
+            patch(
+                "services.integrations.ispcube.client.asyncio.sleep",
+                new_callable=AsyncMock,
+            ) as mock_sleep,
+        ):
+            mock_get.side_effect = httpx.ReadTimeout("Timed out")
+
+            with pytest.raises(ISPCubeAPIError):
+                await authenticated_client.get_customers()
+
+            assert mock_get.call_count == 1
+            mock_sleep.assert_not_called()
+            assert authenticated_client.circuit_breaker._failures == 1
+
+    @pytest.mark.asyncio
+    async def test_every_failed_attempt_counts(self, authenticated_client):
+        """Each failed attempt, retries included, is a breaker failure."""
+        with (
+            patch.object(
+                authenticated_client._http_client, "get", new_callable=AsyncMock
+            ) as mock_get,
+            patch(
+                "services.integrations.ispcube.client.asyncio.sleep",
+                new_callable=AsyncMock,
+            ),
+        ):
+            mock_get.side_effect = httpx.ConnectError("Connection refused")
+
+            with pytest.raises(ISPCubeAPIError):
+                await authenticated_client.get_customers()
+
+            assert mock_get.call_count == ISPCubeClient.MAX_RETRIES + 1
+            assert (
+                authenticated_client.circuit_breaker._failures
+                == ISPCubeClient.MAX_RETRIES + 1
+            )
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_fails_fast(self, authenticated_client):
+        """Once the circuit opens, requests fail without calling ISPCube."""
+        with (
+            patch.object(
+                authenticated_client._http_client, "get", new_callable=AsyncMock
+            ) as mock_get,
+            patch(
+                "services.integrations.ispcube.client.asyncio.sleep",
+                new_callable=AsyncMock,
+            ),
+        ):
+            mock_get.return_value = make_response(500)
+
+            # Three failed attempts (one request and its retries) open the circuit
+            with pytest.raises(ISPCubeAPIError):
+                await authenticated_client.get_customers()
+            assert mock_get.call_count == 3
+            assert authenticated_client.circuit_breaker.is_open is True
+
+            mock_get.reset_mock()
+            with pytest.raises(ISPCubeUnavailableError):
+                await authenticated_client.get_customers()
+            mock_get.assert_not_called()
+
+    def test_circuit_allows_trial_after_reset_timeout(self):
+        """An open circuit lets one trial call through after the reset timeout."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        with patch("services.integrations.circuit_breaker.time.monotonic") as mock_time:
+            mock_time.return_value = 100.0
+            breaker.record_failure()
+            assert breaker.allow_request() is False
+
+            mock_time.return_value = 131.0
+            assert breaker.allow_request() is True
+            assert breaker.allow_request() is False
+
+            breaker.record_success()
+            assert breaker.allow_request() is True
+
+
+def customers_pages(total, summary_total=None):
+    """Side effect for a mocked _http_client.get serving `total` customers."""
+
+    async def get(url, headers=None, params=None):
+        if url.endswith("/api/customer/summary"):
+            if summary_total is None:
+                return make_response(403)
+            return make_response(200, {"customers": summary_total})
+        offset, limit = params["offset"], params["limit"]
+        return make_response(
+            200, [{"id": i} for i in range(offset, min(offset + limit, total))]
+        )
+
+    return get
+
+
+def page_offsets(mock_get):
+    """Offsets of the customers_list pages requested."""
+    return [
+        call.kwargs["params"]["offset"]
+        for call in mock_get.call_args_list
+        if call.args[0].endswith("/customers_list")
+    ]
+
+
+class TestISPCubeIterCustomers:
+    """Tests for paginated customer iteration."""
+
+    @pytest.mark.asyncio
+    async def test_fetches_pages_concurrently_up_to_total(self, authenticated_client):
+        """With the total known, every page is fetched and every customer yielded once."""
+        with patch.object(
+            authenticated_client._http_client, "get", new_callable=AsyncMock
+        ) as mock_get:
+            mock_get.side_effect = customers_pages(450, summary_total=450)
+
+            ids = [
+                customer["id"]
+                async for customer in authenticated_client.iter_customers()
+            ]
+
+            assert sorted(ids) == list(range(450))
+            assert sorted(page_offsets(mock_get)) == [0, 100, 200, 300, 400]
+
+    @pytest.mark.asyncio
+    async def test_walks_past_outdated_total(self, authenticated_client):
+        """Customers added after the total was read are still yielded."""
+        with patch.object(
+            authenticated_client._http_client, "get", new_callable=AsyncMock
+        ) as mock_get:
+            mock_get.side_effect = customers_pages(350, summary_total=200)
+
+            ids = [
+                customer["id"]
+                async for customer in authenticated_client.iter_customers()
+            ]
+
+            assert sorted(ids) == list(range(350))
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_sequential_without_total(self, authenticated_client):
+        """Pages are walked in order when the summary is not available."""
+        with patch.object(
+            authenticated_client._http_client, "get", new_callable=AsyncMock
+        ) as mock_get:
+            mock_get.side_effect = customers_pages(250)
+
+            ids = [
+                customer["id"]
+                async for customer in authenticated_client.iter_customers()
+            ]
+
+            assert ids == list(range(250))
+            assert page_offsets(mock_get) == [0, 100, 200]
+
+    @pytest.mark.asyncio
+    async def test_sequential_walk(self, authenticated_client):
+        """concurrency=1 does not ask for the total."""
+        with patch.object(
+            authenticated_client._http_client, "get", new_callable=AsyncMock
+        ) as mock_get:
+            mock_get.side_effect = customers_pages(200, summary_total=200)
+
+            ids = [
+                customer["id"]
+                async for customer in authenticated_client.iter_customers(concurrency=1)
+            ]
+
+            assert ids == list(range(200))
+            assert page_offsets(mock_get) == [0, 100, 200]
+            assert mock_get.call_count == 3
+
+
 class TestISPCubeContextManager:
     """Tests for async context manager."""
 
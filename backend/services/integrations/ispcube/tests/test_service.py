@@ -2,16 +2,23 @@
 Unit tests for ISPCube service layer.
 """
 
-import pytest
+import asyncio
+import threading
+from datetime import datetime
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import pytest
 from django.core.exceptions import ObjectDoesNotExist
 
 from services.integrations.ispcube.exceptions import ISPCubeError
 from services.integrations.ispcube.service import (
+    aclose_ispcube_clients,
+    aget_company_ispcube_client,
+    evict_ispcube_client,
     get_company_ispcube_client,
     get_ispcube_client,
     get_ispcube_config,
+    get_pooled_ispcube_client,
     validate_ispcube_integration,
 )
 
@@ -30,12 +37,15 @@ def mock_integration(mock_company):
     """Fixture providing mock ISPCubeIntegration instance."""
     integration = MagicMock()
     integration.company = mock_company
+    integration.company_id = mock_company.id
     integration.subdomain = "testcompany"
     integration.username = "api"
     integration.password = "testpass123"
     integration.api_key = "test-api-key"
     integration.base_url = "https://testcompany.ispcube.com"
     integration.is_active = True
+    integration.pk = 1
+    integration.updated_at = datetime(2025, 1, 1)
     return integration
 
 
@@ -124,6 +134,65 @@ class TestGetCompanyISPCubeClient:
 
             assert "multiple ISPCube integrations" in str(exc_info.value)
 
+    def test_sync_lookup_is_unpooled(self, mock_company, mock_integration):
+        """Sync callers get a client of their own to close."""
+        with patch("services.integrations.ispcube.service.ISPCubeIntegration") as mock_model:
+            mock_model.objects.filter.return_value = [mock_integration]
+
+            client = get_company_ispcube_client(mock_company)
+
+        assert client.pooled is False
+
+
+class TestAGetCompanyISPCubeClient:
+    """Tests for aget_company_ispcube_client function."""
+
+    @pytest.fixture(autouse=True)
+    def empty_registry(self):
+        """Run every test against an empty registry."""
+        with (
+            patch("services.integrations.ispcube.service._clients", {}),
+            patch("services.integrations.ispcube.service._retired", []),
+        ):
+            yield
+
+    @pytest.mark.asyncio
+    async def test_client_is_pooled(self, mock_company, mock_integration):
+        """Lookups under a running loop share one pooled client."""
+        with patch("services.integrations.ispcube.service.ISPCubeIntegration") as mock_model:
+            mock_model.objects.filter.return_value = [mock_integration]
+
+            client = await aget_company_ispcube_client(mock_company)
+
+            assert client.pooled is True
+            assert await aget_company_ispcube_client(mock_company) is client
+
+    @pytest.mark.asyncio
+    async def test_query_runs_off_the_event_loop(self, mock_company, mock_integration):
+        """The integration is loaded on the database executor."""
+        loop_thread = threading.get_ident()
+        query_threads = []
+
+        def query(**kwargs):
+            query_threads.append(threading.get_ident())
+            return [mock_integration]
+
+        with patch("services.integrations.ispcube.service.ISPCubeIntegration") as mock_model:
+            mock_model.objects.filter.side_effect = query
+
+            await aget_company_ispcube_client(mock_company)
+
+        assert query_threads and loop_thread not in query_threads
+
+    @pytest.mark.asyncio
+    async def test_no_integration(self, mock_company):
+        """A company without an active integration raises ObjectDoesNotExist."""
+        with patch("services.integrations.ispcube.service.ISPCubeIntegration") as mock_model:
+            mock_model.objects.filter.return_value = []
+
+            with pytest.raises(ObjectDoesNotExist):
+                await aget_company_ispcube_client(mock_company)
+
 
 class TestValidateISPCubeIntegration:
     """Tests for validate_ispcube_integration function."""
@@ -177,3 +246,68 @@ class TestValidateISPCubeIntegration:
             assert success is False
             assert "Network error" in error
 
+
+class TestPooledISPCubeClient:
+    """Tests for the process-wide client registry."""
+
+    @pytest.fixture(autouse=True)
+    def empty_registry(self):
+        """Run every test against an empty registry."""
+        with (
+            patch("services.integrations.ispcube.service._clients", {}),
+            patch("services.integrations.ispcube.service._retired", []),
+        ):
+            yield
+
+    @pytest.mark.asyncio
+    async def test_lookups_reuse_client(self, mock_integration):
+        """Repeated lookups return the same open client."""
+        client = get_pooled_ispcube_client(mock_integration)
+
+        async with client:
+            pass
+
+        assert get_pooled_ispcube_client(mock_integration) is client
+        assert client.pooled is True
+        assert client._http_client.is_closed is False
+
+    @pytest.mark.asyncio
+    async def test_edited_integration_gets_new_client(self, mock_integration):
+        """A changed integration replaces its client; the old one is closed on shutdown."""
+        client = get_pooled_ispcube_client(mock_integration)
+
+        mock_integration.updated_at = datetime(2025, 2, 1)
+        new_client = get_pooled_ispcube_client(mock_integration)
+
+        assert new_client is not client
+        await aclose_ispcube_clients()
+        assert client._http_client.is_closed is True
+        assert new_client._http_client.is_closed is True
+
+    def test_clients_are_not_shared_between_event_loops(self, mock_integration):
+        """Each event loop gets its own client."""
+
+        async def lookup():
+            return get_pooled_ispcube_client(mock_integration)
+
+        first = asyncio.run(lookup())
+        second = asyncio.run(lookup())
+
+        assert second is not first
+        assert second.pooled is True
+
+    def test_lookup_without_event_loop_is_unpooled(self, mock_integration):
+        """Without a running loop the caller gets a client of its own."""
+        client = get_pooled_ispcube_client(mock_integration)
+
+        assert client.pooled is False
+        assert get_pooled_ispcube_client(mock_integration) is not client
+
+    @pytest.mark.asyncio
+    async def test_evicted_client_is_replaced(self, mock_integration):
+        """Eviction (on save or delete) drops the client."""
+        client = get_pooled_ispcube_client(mock_integration)
+
+        evict_ispcube_client(mock_integration.pk)
+
+        assert get_pooled_ispcube_client(mock_integration) is not client
@@ -0,0 +1,163 @@
+"""
+Unit tests for ISPCube customer synchronization.
+"""
+
+from datetime import UTC, datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from api.utils.phone import normalize_phones
+from services.integrations.ispcube import sync
+from services.integrations.ispcube.sync import (
+    PHONE_REGION,
+    _build_customer,
+    sync_ispcube_customers,
+)
+
+
+def make_record(
+    customer_id, phones=("0291155048080",), updated_at="2026-01-01T00:00:00.000000Z"
+):
+    """Build an ISPCube customers_list record."""
+    return {
+        "id": customer_id,
+        "name": f"Customer {customer_id}",
+        "code": f"{customer_id:06d}",
+        "status": "enabled",
+        "updated_at": updated_at,
+        "phones": [{"customer_id": customer_id, "number": number} for number in phones],
+        "contact_emails": [],
+    }
+
+
+class FakeClient:
+    """Stand-in for ISPCubeClient streaming fixed records."""
+
+    def __init__(self, records):
+        self.records = records
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    async def iter_customers(self):
+        for record in self.records:
+            yield record
+
+
+@pytest.fixture
+def mock_integration():
+    """Fixture providing a never-synced ISPCubeIntegration."""
+    integration = MagicMock()
+    integration.pk = 1
+    integration.company_id = 1
+    integration.subdomain = "testcompany"
+    integration.customers_synced_through = None
+    return integration
+
+
+@pytest.fixture
+def mock_upsert():
+    """Patch the database side of the sync, recording each chunk."""
+    with (
+        patch.object(
+            sync,
+            "_upsert_customers",
+            side_effect=lambda company_id, records: len(records),
+        ) as upsert,
+        patch.object(sync, "ISPCubeIntegration") as mock_model,
+    ):
+        upsert.model = mock_model
+        yield upsert
+
+
+def serve(records):
+    """Patch get_ispcube_client to stream `records`."""
+    return patch.object(sync, "get_ispcube_client", return_value=FakeClient(records))
+
+
+class TestBuildCustomer:
+    """Tests for mapping ISPCube customers to Customer."""
+
+    def test_first_valid_phone_is_used(self):
+        """Invalid numbers are passed over; national numbers become E.164."""
+        record = make_record(7, phones=("123", "0291155048080"))
+        record["contact_emails"] = [
+            {"email": "not-an-email"},
+            {"email": "juan@example.com"},
+        ]
+        phones = normalize_phones(["123", "0291155048080"], PHONE_REGION)
+
+        customer = _build_customer(1, record, phones)
+
+        assert customer.external_id == "7"
+        assert customer.phone == "+5492915048080"
+        assert customer.name == "Customer 7"
+        assert customer.email == "juan@example.com"
+        assert customer.metadata["ispcube"]["code"] == "000007"
+
+    def test_customer_without_valid_phone_is_skipped(self):
+        """Customers cannot be stored without a phone."""
+        record = make_record(7, phones=("123",))
+        phones = normalize_phones(["123"], PHONE_REGION)
+
+        assert _build_customer(1, record, phones) is None
+
+
+class TestSyncISPCubeCustomers:
+    """Tests for sync_ispcube_customers."""
+
+    @pytest.mark.asyncio
+    async def test_upserts_in_chunks_and_stores_mark(
+        self, mock_integration, mock_upsert
+    ):
+        """Customers are written in chunks and the newest update time becomes the mark."""
+        records = [make_record(i) for i in range(5)]
+        records[3]["updated_at"] = "2026-03-01T12:00:00.000000Z"
+
+        with serve(records), patch.object(sync, "CHUNK_SIZE", 2):
+            result = await sync_ispcube_customers(mock_integration)
+
+        assert [len(call.args[1]) for call in mock_upsert.call_args_list] == [2, 2, 1]
+        assert (result.fetched, result.written, result.unchanged) == (5, 5, 0)
+        mark = datetime(2026, 3, 1, 12, tzinfo=UTC)
+        mock_upsert.model.objects.filter.return_value.update.assert_called_once_with(
+            customers_synced_through=mark
+        )
+        assert mock_integration.customers_synced_through == mark
+
+    @pytest.mark.asyncio
+    async def test_incremental_sync_skips_unchanged(
+        self, mock_integration, mock_upsert
+    ):
+        """Only customers updated since the mark (minus the overlap) are written."""
+        mock_integration.customers_synced_through = datetime(2026, 2, 1, tzinfo=UTC)
+        records = [
+            make_record(1, updated_at="2026-01-01T00:00:00.000000Z"),
+            make_record(2, updated_at="2026-01-31T23:30:00.000000Z"),
+            make_record(3, updated_at="2026-02-15T00:00:00.000000Z"),
+        ]
+
+        with serve(records):
+            result = await sync_ispcube_customers(mock_integration)
+
+        written = [record["id"] for record in mock_upsert.call_args.args[1]]
+        assert written == [2, 3]
+        assert (result.written, result.unchanged) == (2, 1)
+
+    @pytest.mark.asyncio
+    async def test_full_sync_ignores_mark(self, mock_integration, mock_upsert):
+        """A full sync rewrites every customer."""
+        mock_integration.customers_synced_through = datetime(2026, 2, 1, tzinfo=UTC)
+        records = [make_record(1, updated_at="2026-01-01T00:00:00.000000Z")]
+
+        with serve(records):
+            result = await sync_ispcube_customers(mock_integration, full=True)
+
+        assert (result.written, result.unchanged) == (1, 0)
+        mock_upsert.model.objects.filter.return_value.update.assert_called_once_with(
+            customers_synced_through=datetime(2026, 2, 1, tzinfo=UTC)
+        )
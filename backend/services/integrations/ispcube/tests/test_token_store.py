@@ -0,0 +1,134 @@
+"""
+Unit tests for the shared ISPCube token store.
+"""
+
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from django.utils import timezone
+
+from services.integrations.ispcube.client import ISPCubeClient
+from services.integrations.ispcube.token_store import ISPCubeTokenStore
+
+
+@pytest.fixture
+def token_store():
+    """Fixture providing a token store for integration 7."""
+    return ISPCubeTokenStore(
+        7, validity=timedelta(hours=24), refresh_margin=timedelta(minutes=10)
+    )
+
+
+@pytest.fixture
+def mock_db():
+    """Patch the model and transaction used by the token store."""
+    with (
+        patch(
+            "services.integrations.ispcube.token_store.ISPCubeIntegration"
+        ) as mock_model,
+        patch("services.integrations.ispcube.token_store.transaction"),
+        patch("services.integrations.ispcube.token_store.connection"),
+    ):
+        yield mock_model
+
+
+def stored_rows(mock_model, *rows):
+    """Make successive token lookups return `rows`."""
+    lookup = mock_model.objects.filter.return_value.values_list.return_value
+    lookup.first.side_effect = list(rows)
+
+
+class TestISPCubeTokenStore:
+    """Tests for ISPCubeTokenStore.get_token."""
+
+    @pytest.mark.asyncio
+    async def test_stored_token_is_reused(self, token_store, mock_db):
+        """A valid stored token is returned without logging in."""
+        expires_at = timezone.now() + timedelta(hours=5)
+        stored_rows(mock_db, ("stored-token", expires_at))
+        login = AsyncMock(return_value="new-token")
+
+        token, token_expires_at = await token_store.get_token(login)
+
+        assert token == "stored-token"
+        assert token_expires_at == expires_at
+        login.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_token_refreshed_before_expiry(self, token_store, mock_db):
+        """A token about to expire is replaced and written back."""
+        expiring = ("old-token", timezone.now() + timedelta(minutes=5))
+        stored_rows(mock_db, expiring, expiring)
+        login = AsyncMock(return_value="new-token")
+
+        token, expires_at = await token_store.get_token(login)
+
+        assert token == "new-token"
+        assert expires_at > timezone.now() + timedelta(hours=23)
+        login.assert_awaited_once()
+        mock_db.objects.filter.return_value.update.assert_called_once_with(
+            api_token="new-token", token_expires_at=expires_at
+        )
+
+    @pytest.mark.asyncio
+    async def test_rejected_token_is_replaced(self, token_store, mock_db):
+        """A token ISPCube refused is replaced even if not expired."""
+        valid = ("refused-token", timezone.now() + timedelta(hours=5))
+        stored_rows(mock_db, valid, valid)
+        login = AsyncMock(return_value="new-token")
+
+        token, _ = await token_store.get_token(login, rejected="refused-token")
+
+        assert token == "new-token"
+        login.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_token_refreshed_by_another_process(self, token_store, mock_db):
+        """No login when another process stored a new token while waiting for the lock."""
+        stored_rows(
+            mock_db,
+            None,
+            ("other-token", timezone.now() + timedelta(hours=24)),
+        )
+        login = AsyncMock(return_value="new-token")
+
+        token, _ = await token_store.get_token(login)
+
+        assert token == "other-token"
+        login.assert_not_called()
+        mock_db.objects.filter.return_value.update.assert_not_called()
+
+
+class TestISPCubeClientTokenStore:
+    """Tests for ISPCubeClient with a token store."""
+
+    @pytest.mark.asyncio
+    async def test_client_uses_shared_token(self):
+        """The client takes its token from the store instead of logging in."""
+        token_store = MagicMock()
+        token_store.get_token = AsyncMock(
+            return_value=("shared-token", timezone.now() + timedelta(hours=20))
+        )
+        client = ISPCubeClient(
+            {
+                "subdomain": "testcompany",
+                "username": "api",
+                "password": "testpass123",
+                "api_key": "test-api-key-123",
+                "client_id": "852",
+                "base_url": "https://testcompany.ispcube.com",
+            },
+            token_store=token_store,
+        )
+
+        with patch.object(client, "authenticate", new_callable=AsyncMock) as mock_auth:
+            await client.ensure_authenticated()
+            await client.ensure_authenticated()
+
+            mock_auth.assert_not_called()
+
+        assert client._token == "shared-token"
+        assert client._token_expires_at.tzinfo is None
+        assert client.is_authenticated is True
+        token_store.get_token.assert_awaited_once()
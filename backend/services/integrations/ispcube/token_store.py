@@ -0,0 +1,120 @@
+"""
+Shared storage of ISPCube bearer tokens.
+
+ISPCube tokens are valid for 24 hours, so one login per day per integration
+is enough. Tokens are kept (encrypted) in ISPCubeIntegration.api_token and
+every process and client reuses them. Refreshes run under a PostgreSQL
+advisory lock: when a token is about to expire, only one worker logs in
+and the others wait for and reuse its token.
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.models.ispcube_integration import ISPCubeIntegration
+from api.utils.async_db import database_sync_to_async
+
+logger = logging.getLogger(__name__)
+
+# First key of the advisory locks (the second one is the integration ID)
+ADVISORY_LOCK_NAMESPACE = 0x15C0BE
+
+
+class ISPCubeTokenStore:
+    """
+    Token storage for one ISPCube integration, backed by the database.
+
+    Args:
+        integration_id: ISPCubeIntegration primary key
+        validity: How long a new token is valid
+        refresh_margin: Refresh tokens this long before they expire
+    """
+
+    def __init__(
+        self, integration_id: int, validity: timedelta, refresh_margin: timedelta
+    ):
+        self.integration_id = integration_id
+        self.validity = validity
+        self.refresh_margin = refresh_margin
+
+    async def get_token(
+        self,
+        login: Callable[[], Awaitable[str]],
+        rejected: str | None = None,
+    ) -> tuple[str, datetime]:
+        """
+        Get a valid token, logging in only if no other process has one.
+
+        Args:
+            login: Coroutine function requesting a new token from ISPCube
+            rejected: Token ISPCube refused, to be replaced even if not expired
+
+        Returns:
+            Tuple of (token, expiration time)
+
+        Raises:
+            ISPCubeAuthError: If authentication fails
+            ISPCubeAPIError: If the login request fails
+        """
+        stored = await database_sync_to_async(self._load)()
+        if self._is_usable(stored, rejected):
+            return stored
+
+        # The login runs on the event loop while the lock is held in a thread
+        loop = asyncio.get_running_loop()
+
+        def login_blocking() -> str:
+            return asyncio.run_coroutine_threadsafe(login(), loop).result()
+
+        return await database_sync_to_async(self._refresh)(login_blocking, rejected)
+
+    def _load(self) -> tuple[str, datetime] | None:
+        """Read the stored token and its expiration time."""
+        row = (
+            ISPCubeIntegration.objects.filter(pk=self.integration_id)
+            .values_list("api_token", "token_expires_at")
+            .first()
+        )
+        if row is None or not row[0] or row[1] is None:
+            return None
+        return row
+
+    def _refresh(
+        self, login: Callable[[], str], rejected: str | None
+    ) -> tuple[str, datetime]:
+        """Log in and store the new token, unless another process just did."""
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_advisory_xact_lock(%s::integer, %s::integer)",
+                    [ADVISORY_LOCK_NAMESPACE, self.integration_id],
+                )
+
+            stored = self._load()
+            if self._is_usable(stored, rejected):
+                return stored
+
+            token = login()
+            expires_at = timezone.now() + self.validity
+            # A queryset update: saving the model would evict pooled clients
+            ISPCubeIntegration.objects.filter(pk=self.integration_id).update(
+                api_token=token, token_expires_at=expires_at
+            )
+
+        logger.info(f"Stored new ISPCube token for integration {self.integration_id}")
+        return token, expires_at
+
+    def _is_usable(
+        self, stored: tuple[str, datetime] | None, rejected: str | None
+    ) -> bool:
+        """Whether a stored token can be used without refreshing it."""
+        return (
+            stored is not None
+            and stored[0] != rejected
+            and stored[1] - self.refresh_margin > timezone.now()
+        )
@@ -4,21 +4,62 @@ LLM Service for Gemini integration.
 
 import logging
 import os
-
+import threading
+import time
+from collections.abc import AsyncIterator
+from typing import NamedTuple
+
+import httpx
+from django.conf import settings
+from django.core.cache import cache
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 
 from api.constants import MessageRole
 from api.models.company import Company
-from api.models.company_config import CompanyConfig
 from api.models.message import Message
+from api.utils.async_db import database_sync_to_async
+from api.utils.metrics import LLM_REQUEST_SECONDS, LLM_TOKENS
+from api.utils.text_segmenter import split_complete_segments
+from services.tenant_cache import TenantContext, get_company_tenant
 
 logger = logging.getLogger(__name__)
 
 
-def get_gemini_model():
+GEMINI_MODEL = "gemini-2.0-flash-lite"
+# Cheapest model, for background work such as conversation summaries
+GEMINI_SUMMARY_MODEL = "gemini-2.0-flash-lite"
+
+# Rough estimate used where counting tokens exactly would need an API call
+CHARS_PER_TOKEN = 4
+
+SUMMARY_MAX_TOKENS = 300
+SUMMARY_PROMPT = (
+    "Resumí la conversación entre un cliente y el asistente de soporte. "
+    "Conservá los datos del cliente, los problemas reportados, lo que ya se "
+    "probó o se le indicó y cualquier compromiso pendiente. Si hay un resumen "
+    "anterior, integralo. Respondé solo con el resumen, en menos de 150 palabras."
+)
+
+# Keep-alive pool shared by every request made through the cached client
+GEMINI_HTTP_LIMITS = httpx.Limits(
+    max_connections=20,
+    max_keepalive_connections=10,
+    keepalive_expiry=300.0,
+)
+
+_client: genai.Client | None = None
+_client_pid: int | None = None
+_client_lock = threading.Lock()
+
+
+def get_gemini_model() -> genai.Client:
     """
-    Get configured Gemini model.
+    Get the process-wide Gemini client.
+
+    The client (and its HTTP connection pool) is created lazily on first use
+    and reused afterwards. It is rebuilt after a fork, so pre-forking servers
+    never share sockets between worker processes.
 
     Returns:
         genai.Client: Configured Gemini client
@@ -26,19 +67,67 @@ def get_gemini_model():
     Raises:
         ValueError: If GEMINI_API_KEY is not set
     """
-    api_key = os.getenv('GEMINI_API_KEY')
+    global _client, _client_pid
+
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+
+    with _client_lock:
+        if _client is not None and _client_pid == pid:
+            return _client
 
-    if not api_key:
-        raise ValueError(
-            "GEMINI_API_KEY is not set. Please add it to your .env file."
+        api_key = os.getenv("GEMINI_API_KEY")
+
+        if not api_key:
+            raise ValueError(
+                "GEMINI_API_KEY is not set. Please add it to your .env file."
+            )
+
+        start = time.perf_counter()
+
+        # The client gets the API key from the environment variable `GEMINI_API_KEY`.
+        client = genai.Client(
+            http_options=types.HttpOptions(
+                base_url=settings.GEMINI_BASE_URL or None,
+                client_args={"limits": GEMINI_HTTP_LIMITS},
+                async_client_args={"limits": GEMINI_HTTP_LIMITS},
+            )
         )
 
-    # The client gets the API key from the environment variable `GEMINI_API_KEY`.
-    client = genai.Client()
+        logger.info(
+            f"Gemini client created in {(time.perf_counter() - start) * 1000:.1f}ms "
+            f"(pid: {pid})"
+        )
+
+        _client = client
+        _client_pid = pid
 
     return client
 
 
+async def awarm_up_gemini_client() -> float:
+    """
+    Create the Gemini client and open a connection to the async API.
+
+    Fetches the model metadata, which costs no tokens but completes the TLS
+    handshake, so the next customer message finds a warm connection. Call it
+    on worker start-up and after the machine resumes from suspension.
+
+    Returns:
+        float: Warm-up duration in milliseconds
+    """
+    start = time.perf_counter()
+
+    client = get_gemini_model()
+    await client.aio.models.get(model=GEMINI_MODEL)
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    logger.info(f"Gemini client warmed up in {elapsed_ms:.1f}ms")
+
+    return elapsed_ms
+
+
 def format_messages_for_gemini(messages: list[Message]) -> list[types.Content]:
     """
     Convert Message objects to Gemini API format.
@@ -49,38 +138,299 @@ def format_messages_for_gemini(messages: list[Message]) -> list[types.Content]:
     Returns:
         list[types.Content]: Messages formatted for Gemini API
     """
-    formatted = []
+    formatted = (format_message_for_gemini(message) for message in messages)
+    return [content for content in formatted if content is not None]
+
+
+def format_message_for_gemini(message: Message) -> types.Content | None:
+    """
+    Convert a Message to Gemini API format.
 
-    for message in messages:
+    Args:
+        message: Message object
+
+    Returns:
+        types.Content | None: Formatted message, None for system messages
+    """
+    # Map roles to Gemini format
+    if message.role == MessageRole.USER:
+        gemini_role = "user"
+    elif message.role in (MessageRole.ASSISTANT, MessageRole.AGENT):
+        gemini_role = "model"
+    else:
         # Skip system messages
-        if message.role == MessageRole.SYSTEM:
-            continue
-
-        # Map roles to Gemini format
-        if message.role == MessageRole.USER:
-            gemini_role = "user"
-        elif message.role in (MessageRole.ASSISTANT, MessageRole.AGENT):
-            gemini_role = "model"
-        else:
-            continue
-
-        formatted.append(
-            types.Content(
-                role=gemini_role,
-                parts=[types.Part(text=message.content)]
+        return None
+
+    return types.Content(role=gemini_role, parts=[types.Part(text=message.content)])
+
+
+def format_history_summary(summary: str) -> types.Content:
+    """
+    Convert a conversation summary to Gemini API format.
+
+    Args:
+        summary: Summary of the older messages, from asummarize_history()
+
+    Returns:
+        types.Content: Summary to place before the recent history
+    """
+    return types.Content(
+        role="user",
+        parts=[types.Part(text=f"Resumen de la conversación anterior:\n{summary}")],
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens of a text without calling the API.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        int: Approximate token count
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class GeminiContextCache:
+    """
+    Gemini explicit context caches holding each company's system prompt.
+
+    Caches are created per company prompt version (CompanyConfig.prompt_version)
+    and their names are shared through the Django cache, so every worker
+    process reuses the same Gemini cache. Their TTL is extended shortly before
+    they expire; caches of previous prompt versions are left to expire.
+    Prompts below GEMINI_CONTEXT_CACHE_MIN_TOKENS, which Gemini refuses to
+    cache, and failures fall back to the inline prompt.
+
+    Lookups are memoized per process, so the steady state makes no calls.
+    """
+
+    KEY_PREFIX = "gemini:context-cache:"
+    # Extend or recreate caches this long before they expire (seconds)
+    REFRESH_MARGIN = 5 * 60
+    # Wait this long before retrying a failed creation (seconds)
+    FAILURE_RETRY = 30 * 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # cache key -> (cache name, expires_at); an empty name means inline
+        self._entries: dict[str, tuple[str, float]] = {}
+
+    def _key(self, tenant: TenantContext) -> str:
+        return f"{self.KEY_PREFIX}{tenant.company.pk}:{tenant.prompt_version}:{GEMINI_MODEL}"
+
+    async def aget(self, tenant: TenantContext) -> str | None:
+        """
+        Get the cached content name for a company's current system prompt.
+
+        Creates or extends the cache when needed.
+
+        Args:
+            tenant: Tenant context of the company
+
+        Returns:
+            str | None: Cached content name, or None to send the prompt inline
+        """
+        if not settings.GEMINI_CONTEXT_CACHE_ENABLED:
+            return None
+        if (
+            estimate_tokens(tenant.system_prompt)
+            < settings.GEMINI_CONTEXT_CACHE_MIN_TOKENS
+        ):
+            return None
+
+        key = self._key(tenant)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[1] - self.REFRESH_MARGIN <= now:
+            entry = await cache.aget(key)
+        if entry is None or entry[1] - self.REFRESH_MARGIN <= now:
+            entry = await self._arefresh(tenant, entry)
+            await cache.aset(key, entry, timeout=max(int(entry[1] - now), 1))
+
+        with self._lock:
+            self._entries[key] = entry
+        return entry[0] or None
+
+    async def ainvalidate(self, tenant: TenantContext) -> None:
+        """
+        Stop using a company's cache, e.g. after Gemini reported it missing.
+
+        The next request recreates it.
+
+        Args:
+            tenant: Tenant context of the company
+        """
+        key = self._key(tenant)
+        with self._lock:
+            self._entries.pop(key, None)
+        await cache.adelete(key)
+
+    async def _arefresh(
+        self, tenant: TenantContext, entry: tuple[str, float] | None
+    ) -> tuple[str, float]:
+        """Extend a live cache or create a new one, returning (name, expires_at)."""
+        client = get_gemini_model()
+        ttl = f"{settings.GEMINI_CONTEXT_CACHE_TTL}s"
+        now = time.time()
+
+        if entry is not None and entry[0] and entry[1] > now:
+            try:
+                result = await client.aio.caches.update(
+                    name=entry[0], config=types.UpdateCachedContentConfig(ttl=ttl)
+                )
+                return result.name, self._expires_at(result, now)
+            except Exception as e:
+                logger.warning(f"Could not extend Gemini cache {entry[0]}: {e}")
+
+        try:
+            result = await client.aio.caches.create(
+                model=GEMINI_MODEL,
+                config=types.CreateCachedContentConfig(
+                    display_name=f"{tenant.company.slug}-{tenant.prompt_version}",
+                    system_instruction=tenant.system_prompt,
+                    ttl=ttl,
+                ),
             )
+        except Exception as e:
+            logger.warning(
+                f"Could not create Gemini cache for company {tenant.company.pk}, "
+                f"using inline prompt: {e}"
+            )
+            return "", now + self.FAILURE_RETRY
+
+        logger.info(
+            f"Created Gemini cache {result.name} for company {tenant.company.pk}"
         )
+        return result.name, self._expires_at(result, now)
+
+    @staticmethod
+    def _expires_at(result: types.CachedContent, now: float) -> float:
+        if result.expire_time is not None:
+            return result.expire_time.timestamp()
+        return now + settings.GEMINI_CONTEXT_CACHE_TTL
+
+
+gemini_context_cache = GeminiContextCache()
+
 
-    return formatted
+def _is_cache_error(e: Exception) -> bool:
+    """Whether a Gemini error means the cached content is missing or unusable."""
+    return isinstance(e, errors.APIError) and "cachedcontent" in (
+        str(e).lower().replace(" ", "").replace("_", "")
+    )
 
 
-def generate_response(
+def _build_generation_request(
     company: Company,
     conversation_history: list[types.Content],
-    user_message: str
+    user_message: str,
+) -> tuple[list[types.Content], TenantContext]:
+    """
+    Build the contents of a Gemini generation request.
+
+    Args:
+        company: Company instance
+        conversation_history: Formatted message history from format_messages_for_gemini()
+        user_message: New user message to respond to
+
+    Returns:
+        tuple: Contents (history + new user message) and the company's tenant
+               context, for _build_generation_config()
+    """
+    # Company config and system prompt (cached per process)
+    tenant = get_company_tenant(company)
+
+    # Build messages with history + new user message
+    messages = conversation_history + [
+        types.Content(role="user", parts=[types.Part(text=user_message)])
+    ]
+
+    return messages, tenant
+
+
+def _build_generation_config(
+    tenant: TenantContext, cached_content: str | None
+) -> types.GenerateContentConfig:
+    """Build the generation config, referencing the cached prompt if given."""
+    if cached_content:
+        # A cached system instruction cannot be combined with an inline one
+        return types.GenerateContentConfig(
+            cached_content=cached_content,
+            max_output_tokens=tenant.config.max_tokens,
+            temperature=tenant.config.temperature,
+        )
+
+    return types.GenerateContentConfig(
+        system_instruction=tenant.system_prompt,
+        max_output_tokens=tenant.config.max_tokens,
+        temperature=tenant.config.temperature,
+    )
+
+
+def _parse_response(response: types.GenerateContentResponse) -> tuple[str, int]:
+    """
+    Extract the text and token usage from a Gemini response.
+
+    Raises:
+        RuntimeError: If the response is empty
+    """
+    if not response or not response.text:
+        logger.error("Empty response from Gemini API")
+        raise RuntimeError("Failed to generate response: empty response")
+
+    # Extract token usage
+    tokens_used = 0
+    if hasattr(response, "usage_metadata"):
+        # Total tokens = prompt + response tokens
+        tokens_used = getattr(response.usage_metadata, "total_token_count", 0)
+        _record_token_usage(response.usage_metadata)
+        logger.info(
+            f"Token usage - Total: {tokens_used}, "
+            f"Prompt: {getattr(response.usage_metadata, 'prompt_token_count', 0)}, "
+            f"Response: {getattr(response.usage_metadata, 'candidates_token_count', 0)}"
+        )
+
+    return response.text, tokens_used
+
+
+def _record_token_usage(
+    usage: types.GenerateContentResponseUsageMetadata | None, model: str = GEMINI_MODEL
+) -> None:
+    """Add the prompt and response token counts of a generation to the metrics."""
+    if usage is None:
+        return
+    LLM_TOKENS.labels(model, "prompt").inc(usage.prompt_token_count or 0)
+    LLM_TOKENS.labels(model, "response").inc(usage.candidates_token_count or 0)
+
+
+def _translate_error(e: Exception) -> RuntimeError:
+    """Map a Gemini client error to a RuntimeError with a user-facing reason."""
+    # Network, quota, or API errors
+    error_msg = str(e)
+    logger.error(f"Gemini API error: {error_msg}")
+
+    # Handle specific error types
+    if "quota" in error_msg.lower() or "rate" in error_msg.lower():
+        return RuntimeError("API quota exceeded. Please try again later.")
+    elif "network" in error_msg.lower() or "timeout" in error_msg.lower():
+        return RuntimeError("Network error connecting to AI service.")
+    else:
+        return RuntimeError(f"AI service error: {error_msg}")
+
+
+async def agenerate_response(
+    company: Company, conversation_history: list[types.Content], user_message: str
 ) -> tuple[str, int]:
     """
-    Generate AI response using Gemini.
+    Generate AI response using the Gemini async API.
+
+    The request does not hold a thread while waiting for Gemini, so a single
+    process can keep hundreds of generations in flight.
 
     Args:
         company: Company instance
@@ -94,63 +444,202 @@ def generate_response(
         ValueError: If API key is missing or config is invalid
         RuntimeError: If API call fails
     """
-    # Get or create company config
-    config, _ = CompanyConfig.objects.get_or_create(company=company)
+    messages, tenant = await database_sync_to_async(_build_generation_request)(
+        company, conversation_history, user_message
+    )
 
+    started = time.perf_counter()
     try:
-        # Get Gemini client
         client = get_gemini_model()
+        cached_content = await gemini_context_cache.aget(tenant)
 
-        # Build messages with history + new user message
-        messages = conversation_history + [
-            types.Content(
-                role="user",
-                parts=[types.Part(text=user_message)]
+        try:
+            response = await client.aio.models.generate_content(
+                model=GEMINI_MODEL,
+                contents=messages,
+                config=_build_generation_config(tenant, cached_content),
+            )
+        except Exception as e:
+            if not cached_content or not _is_cache_error(e):
+                raise
+            # Cache expired or deleted: retry with the inline prompt
+            logger.warning(f"Gemini cache unavailable, using inline prompt: {e}")
+            await gemini_context_cache.ainvalidate(tenant)
+            response = await client.aio.models.generate_content(
+                model=GEMINI_MODEL,
+                contents=messages,
+                config=_build_generation_config(tenant, None),
             )
-        ]
 
-        # Generate response
-        response = client.models.generate_content(
-            model="gemini-2.0-flash-lite",
-            contents=messages,
+        LLM_REQUEST_SECONDS.labels(GEMINI_MODEL, "async").observe(
+            time.perf_counter() - started
+        )
+        return _parse_response(response)
+
+    except ValueError as e:
+        logger.error(f"Configuration error: {e}")
+        raise
+
+    except Exception as e:
+        raise _translate_error(e) from e
+
+
+async def asummarize_history(summary: str, messages: list[Message]) -> tuple[str, int]:
+    """
+    Fold older conversation messages into a rolling summary.
+
+    Uses the cheap GEMINI_SUMMARY_MODEL; the result is bounded by
+    SUMMARY_MAX_TOKENS however long the conversation gets.
+
+    Args:
+        summary: Current summary, empty if there is none yet
+        messages: Messages to add to the summary, oldest first
+
+    Returns:
+        tuple[str, int]: New summary and tokens used
+
+    Raises:
+        RuntimeError: If API call fails
+    """
+    contents = format_messages_for_gemini(messages)
+    if summary:
+        contents.insert(0, format_history_summary(summary))
+    contents.append(
+        types.Content(
+            role="user", parts=[types.Part(text="Resumí la conversación hasta acá.")]
+        )
+    )
+
+    started = time.perf_counter()
+    try:
+        response = await get_gemini_model().aio.models.generate_content(
+            model=GEMINI_SUMMARY_MODEL,
+            contents=contents,
             config=types.GenerateContentConfig(
-                system_instruction=config.get_system_prompt(),
-                max_output_tokens=config.max_tokens,
-                temperature=config.temperature,
-            )
+                system_instruction=SUMMARY_PROMPT,
+                max_output_tokens=SUMMARY_MAX_TOKENS,
+                temperature=0.2,
+            ),
         )
+    except Exception as e:
+        raise _translate_error(e) from e
+    LLM_REQUEST_SECONDS.labels(GEMINI_SUMMARY_MODEL, "summary").observe(
+        time.perf_counter() - started
+    )
+
+    if not response or not response.text:
+        raise RuntimeError("Failed to summarize history: empty response")
+    usage = response.usage_metadata
+    _record_token_usage(usage, GEMINI_SUMMARY_MODEL)
+    return response.text.strip(), (usage.total_token_count or 0) if usage else 0
+
+
+class ResponseSegment(NamedTuple):
+    """A complete chunk of a streamed response."""
+
+    text: str
+    final: bool
+    tokens_used: int
 
-        if not response or not response.text:
+
+class _StreamSegmenter:
+    """Accumulate streamed chunks and cut them into ResponseSegments."""
+
+    def __init__(self):
+        self.buffer = ""
+        self.started = False
+        self.tokens_used = 0
+        self.usage = None
+
+    def feed(self, chunk: types.GenerateContentResponse) -> list[ResponseSegment]:
+        usage = getattr(chunk, "usage_metadata", None)
+        if usage is not None and usage.total_token_count:
+            self.tokens_used = usage.total_token_count
+            self.usage = usage
+
+        if not chunk.text:
+            return []
+        self.started = True
+        segments, self.buffer = split_complete_segments(self.buffer + chunk.text)
+        return [ResponseSegment(text, False, self.tokens_used) for text in segments]
+
+    def finish(self) -> list[ResponseSegment]:
+        if not self.started:
             logger.error("Empty response from Gemini API")
             raise RuntimeError("Failed to generate response: empty response")
 
-        # Extract token usage
-        tokens_used = 0
-        if hasattr(response, 'usage_metadata'):
-            # Total tokens = prompt + response tokens
-            tokens_used = getattr(response.usage_metadata, 'total_token_count', 0)
-            logger.info(
-                f"Token usage - Total: {tokens_used}, "
-                f"Prompt: {getattr(response.usage_metadata, 'prompt_token_count', 0)}, "
-                f"Response: {getattr(response.usage_metadata, 'candidates_token_count', 0)}"
+        logger.info(f"Token usage - Total: {self.tokens_used} (streamed)")
+        _record_token_usage(self.usage)
+        rest = self.buffer.strip()
+        return [ResponseSegment(rest, True, self.tokens_used)] if rest else []
+
+
+async def agenerate_response_stream(
+    company: Company, conversation_history: list[types.Content], user_message: str
+) -> AsyncIterator[ResponseSegment]:
+    """
+    Streaming variant of agenerate_response().
+
+    Yields the response in sentence or paragraph chunks as soon as each one
+    is complete, so the first one can be delivered while the rest is still
+    being generated. The last segment has `final` set and carries the total
+    token usage.
+
+    Args:
+        company: Company instance
+        conversation_history: Formatted message history from format_messages_for_gemini()
+        user_message: New user message to respond to
+
+    Yields:
+        ResponseSegment: Complete chunks of the response, in order
+
+    Raises:
+        ValueError: If API key is missing or config is invalid
+        RuntimeError: If API call fails
+    """
+    messages, tenant = await database_sync_to_async(_build_generation_request)(
+        company, conversation_history, user_message
+    )
+
+    segmenter = _StreamSegmenter()
+    started = time.perf_counter()
+
+    try:
+        client = get_gemini_model()
+        cached_content = await gemini_context_cache.aget(tenant)
+
+        try:
+            stream = await client.aio.models.generate_content_stream(
+                model=GEMINI_MODEL,
+                contents=messages,
+                config=_build_generation_config(tenant, cached_content),
             )
+            async for chunk in stream:
+                for segment in segmenter.feed(chunk):
+                    yield segment
+        except Exception as e:
+            if segmenter.started or not cached_content or not _is_cache_error(e):
+                raise
+            logger.warning(f"Gemini cache unavailable, using inline prompt: {e}")
+            await gemini_context_cache.ainvalidate(tenant)
+            stream = await client.aio.models.generate_content_stream(
+                model=GEMINI_MODEL,
+                contents=messages,
+                config=_build_generation_config(tenant, None),
+            )
+            async for chunk in stream:
+                for segment in segmenter.feed(chunk):
+                    yield segment
 
-        return response.text, tokens_used
+        LLM_REQUEST_SECONDS.labels(GEMINI_MODEL, "stream").observe(
+            time.perf_counter() - started
+        )
+        for segment in segmenter.finish():
+            yield segment
 
     except ValueError as e:
-        # API key missing or invalid config
         logger.error(f"Configuration error: {e}")
         raise
 
     except Exception as e:
-        # Network, quota, or API errors
-        error_msg = str(e)
-        logger.error(f"Gemini API error: {error_msg}")
-
-        # Handle specific error types
-        if "quota" in error_msg.lower() or "rate" in error_msg.lower():
-            raise RuntimeError("API quota exceeded. Please try again later.") from e
-        elif "network" in error_msg.lower() or "timeout" in error_msg.lower():
-            raise RuntimeError("Network error connecting to AI service.") from e
-        else:
-            raise RuntimeError(f"AI service error: {error_msg}") from e
+        raise _translate_error(e) from e
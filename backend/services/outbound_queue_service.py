@@ -0,0 +1,419 @@
+"""
+Durable queue for outgoing WhatsApp messages.
+
+Messages are stored in the OutboundMessage table and claimed by the
+`run_outbound_dispatcher` command with `SELECT ... FOR UPDATE SKIP LOCKED`,
+highest priority first. Conversation replies are queued ahead of bulk and
+template sends; messages that keep failing end up as dead letters. Messages
+to the same recipient are sent one at a time, oldest first, so multi-part
+replies arrive in order even when a part has to be retried.
+
+Replies are saved as assistant messages when they are queued (see
+enqueue_reply()), so the customer messages they answer stop being pending
+right away; delivery is tracked by the OutboundMessage status.
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Exists, Min, OuterRef, Q
+from django.utils import timezone
+
+from api.constants import OutboundMessagePriority, OutboundMessageStatus
+from api.models.company import Company
+from api.models.conversation import Conversation
+from api.models.message import Message
+from api.models.outbound_message import OutboundMessage
+from api.utils.batch_delete import delete_in_batches
+from api.utils.timing import StageTimer
+from services.conversation_service import save_assistant_message
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+MAX_BACKOFF = timedelta(minutes=10)
+LOCK_TIMEOUT = timedelta(minutes=5)
+
+
+def enqueue_outbound_message(
+    company: Company,
+    to_number: str,
+    text: str,
+    priority: int = OutboundMessagePriority.BULK,
+    conversation: Conversation | None = None,
+    message: Message | None = None,
+    tokens_used: int = 0,
+    typing_message_id: str = "",
+    received_at: datetime | None = None,
+    stage_timings: dict[str, int] | None = None,
+) -> OutboundMessage:
+    """
+    Queue a WhatsApp text message for delivery.
+
+    Args:
+        company: Company sending the message (its WhatsApp number is used)
+        to_number: Recipient's phone number
+        text: Message text content
+        priority: OutboundMessagePriority value (default BULK)
+        conversation: Conversation the message replies to; the reply latency
+                      is recorded once sent (optional)
+        message: Assistant message the send delivers (optional)
+        tokens_used: Tokens used to generate the message (default 0)
+        typing_message_id: Incoming WhatsApp message ID to show the typing
+                           indicator for once sent, when more messages follow (optional)
+        received_at: When the customer message being answered was received (optional)
+        stage_timings: Stage durations measured so far, from StageTimer (optional)
+
+    Returns:
+        OutboundMessage: The queued message
+    """
+    return OutboundMessage.objects.create(
+        company=company,
+        conversation=conversation,
+        message=message,
+        phone_number_id=company.whatsapp_phone_id,
+        to_number=to_number,
+        text=text,
+        priority=priority,
+        tokens_used=tokens_used,
+        typing_message_id=typing_message_id,
+        received_at=received_at,
+        stage_timings=stage_timings or {},
+    )
+
+
+def enqueue_reply(
+    conversation: Conversation,
+    text: str,
+    tokens_used: int = 0,
+    received_at: datetime | None = None,
+    stage_timings: dict[str, int] | None = None,
+) -> OutboundMessage:
+    """
+    Save a reply as an assistant message and queue it for delivery.
+
+    Both happen in one transaction, so the customer messages it answers are
+    no longer pending while the reply waits in the queue.
+
+    Args:
+        conversation: Conversation answered (customer and company loaded)
+        text: Reply text
+        tokens_used: Tokens used to generate the reply (default 0)
+        received_at: When the customer message being answered was received (optional)
+        stage_timings: Stage durations measured so far, from StageTimer (optional)
+
+    Returns:
+        OutboundMessage: The queued message
+    """
+    with transaction.atomic():
+        message = save_assistant_message(
+            conversation=conversation,
+            content=text,
+            tokens_used=tokens_used,
+            stage_timings=stage_timings,
+        )
+        return enqueue_outbound_message(
+            company=conversation.company,
+            to_number=conversation.customer.phone,
+            text=text,
+            priority=OutboundMessagePriority.REPLY,
+            conversation=conversation,
+            message=message,
+            tokens_used=tokens_used,
+            received_at=received_at,
+            stage_timings=stage_timings,
+        )
+
+
+def start_streamed_reply(
+    conversation: Conversation,
+    text: str,
+    typing_message_id: str = "",
+    received_at: datetime | None = None,
+    stage_timings: dict[str, int] | None = None,
+) -> OutboundMessage:
+    """
+    Save the first segment of a streamed reply as an assistant message and queue it.
+
+    Like enqueue_reply(), both happen in one transaction, so the customer
+    messages being answered stop being pending before anything is sent.
+    The message is completed by finish_streamed_reply(); further segments
+    are queued with enqueue_outbound_message(message=...).
+
+    Args:
+        conversation: Conversation answered (customer and company loaded)
+        text: First segment of the reply
+        typing_message_id: Incoming WhatsApp message ID to show the typing
+                           indicator for once sent, when more segments follow (optional)
+        received_at: When the customer message being answered was received (optional)
+        stage_timings: Stage durations measured so far, from StageTimer (optional)
+
+    Returns:
+        OutboundMessage: The queued segment, linked to the assistant message
+    """
+    with transaction.atomic():
+        message = save_assistant_message(
+            conversation=conversation,
+            content=text,
+            stage_timings=stage_timings,
+        )
+        return enqueue_outbound_message(
+            company=conversation.company,
+            to_number=conversation.customer.phone,
+            text=text,
+            priority=OutboundMessagePriority.REPLY,
+            message=message,
+            typing_message_id=typing_message_id,
+            received_at=received_at,
+            stage_timings=stage_timings,
+        )
+
+
+def finish_streamed_reply(
+    message: Message,
+    content: str,
+    tokens_used: int = 0,
+    latency_ms: int | None = None,
+    stage_timings: dict[str, int] | None = None,
+) -> Message:
+    """
+    Store the assembled text and stats of a streamed reply on its assistant message.
+
+    Args:
+        message: Assistant message created by start_streamed_reply()
+        content: Assembled reply text
+        tokens_used: Tokens used to generate the reply (default 0)
+        latency_ms: Time from receiving the customer message to queueing the first segment (optional)
+        stage_timings: Duration of each pipeline stage, from StageTimer (optional)
+
+    Returns:
+        Message: The updated assistant message
+    """
+    message.content = content
+    message.tokens_used = tokens_used
+    message.latency_ms = latency_ms
+    message.stage_timings = stage_timings or {}
+    message.save(
+        update_fields=[
+            "content",
+            "tokens_used",
+            "latency_ms",
+            "stage_timings",
+            "updated_at",
+        ]
+    )
+    return message
+
+
+def claim_outbound_messages(limit: int) -> list[OutboundMessage]:
+    """
+    Claim up to `limit` messages that are ready to be sent.
+
+    Pending messages whose `available_at` has passed are claimed by priority,
+    then age, as well as sending messages whose lock is older than
+    LOCK_TIMEOUT (their dispatcher most likely died mid-send). A message is
+    held back while an older one to the same recipient is still pending or
+    being sent (e.g. waiting for a retry), so it cannot overtake it.
+
+    Args:
+        limit: Maximum number of messages to claim
+
+    Returns:
+        list[OutboundMessage]: Claimed messages, already marked as sending
+    """
+    if limit <= 0:
+        return []
+
+    now = timezone.now()
+    earlier_undelivered = OutboundMessage.objects.filter(
+        phone_number_id=OuterRef("phone_number_id"),
+        to_number=OuterRef("to_number"),
+        status__in=[OutboundMessageStatus.PENDING, OutboundMessageStatus.SENDING],
+        pk__lt=OuterRef("pk"),
+    )
+
+    with transaction.atomic():
+        messages = list(
+            OutboundMessage.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("company", "conversation")
+            .filter(
+                Q(status=OutboundMessageStatus.PENDING, available_at__lte=now)
+                | Q(
+                    status=OutboundMessageStatus.SENDING,
+                    locked_at__lt=now - LOCK_TIMEOUT,
+                )
+            )
+            .exclude(Exists(earlier_undelivered))
+            .order_by("-priority", "available_at", "id")[:limit]
+        )
+
+        if messages:
+            OutboundMessage.objects.filter(
+                pk__in=[message.pk for message in messages]
+            ).update(
+                status=OutboundMessageStatus.SENDING,
+                locked_at=now,
+                updated_at=now,
+            )
+            for message in messages:
+                message.status = OutboundMessageStatus.SENDING
+                message.locked_at = now
+
+    return messages
+
+
+def defer_outbound_messages(messages: list[OutboundMessage], delay: timedelta) -> None:
+    """
+    Put claimed messages back in the queue without counting an attempt.
+
+    Used when the sending phone number is over its rate limit.
+
+    Args:
+        messages: Claimed messages to release
+        delay: How long to wait before they can be claimed again
+    """
+    now = timezone.now()
+    OutboundMessage.objects.filter(pk__in=[message.pk for message in messages]).update(
+        status=OutboundMessageStatus.PENDING,
+        available_at=now + delay,
+        locked_at=None,
+        updated_at=now,
+    )
+
+
+def complete_outbound_message(
+    message: OutboundMessage, timer: StageTimer | None = None
+) -> None:
+    """
+    Mark a message as sent.
+
+    The assistant message of a reply gets its end-to-end latency (customer
+    message received to reply sent) and stage timings.
+
+    Args:
+        message: The message that was delivered
+        timer: Stage timer of the message, continued from its stage_timings (optional)
+    """
+    timer = timer or StageTimer(message.stage_timings)
+    now = timezone.now()
+
+    latency_ms = None
+    if message.received_at is not None and message.conversation_id is not None:
+        latency_ms = round((now - message.received_at).total_seconds() * 1000)
+        timer.record("total", latency_ms)
+
+    with timer.stage("persist"), transaction.atomic():
+        OutboundMessage.objects.filter(pk=message.pk).update(
+            status=OutboundMessageStatus.SENT,
+            sent_at=now,
+            locked_at=None,
+            last_error="",
+            updated_at=now,
+        )
+        if message.message_id is not None and latency_ms is not None:
+            Message.objects.filter(pk=message.message_id).update(
+                latency_ms=latency_ms, stage_timings=timer.timings
+            )
+
+
+def fail_outbound_message(
+    message: OutboundMessage,
+    error: str,
+    retry_after: float | None = None,
+    permanent: bool = False,
+) -> None:
+    """
+    Record a failed send and schedule a retry with exponential backoff.
+
+    Permanent errors, and messages failing MAX_ATTEMPTS times, are marked as
+    dead and left for inspection (see `outbound_queue_status --requeue-dead`).
+
+    Args:
+        message: The message that failed
+        error: Error description to store
+        retry_after: Seconds the API asked to wait before retrying (optional)
+        permanent: Whether retrying cannot succeed (e.g. invalid recipient)
+    """
+    now = timezone.now()
+    attempts = message.attempts + 1
+
+    if permanent or attempts >= MAX_ATTEMPTS:
+        logger.error(
+            f"Outbound message {message.pk} is dead after {attempts} attempts: {error}"
+        )
+        status = OutboundMessageStatus.DEAD
+        available_at = message.available_at
+    else:
+        status = OutboundMessageStatus.PENDING
+        delay = min(timedelta(seconds=max(retry_after or 0, 2**attempts)), MAX_BACKOFF)
+        available_at = now + delay
+
+    OutboundMessage.objects.filter(pk=message.pk).update(
+        status=status,
+        attempts=attempts,
+        available_at=available_at,
+        locked_at=None,
+        last_error=error,
+        updated_at=now,
+    )
+
+
+def requeue_dead_messages(phone_number_id: str | None = None) -> int:
+    """
+    Move dead messages back to the queue with a fresh attempt count.
+
+    Args:
+        phone_number_id: Only requeue messages from this number (optional)
+
+    Returns:
+        int: Number of requeued messages
+    """
+    messages = OutboundMessage.objects.filter(status=OutboundMessageStatus.DEAD)
+    if phone_number_id:
+        messages = messages.filter(phone_number_id=phone_number_id)
+
+    now = timezone.now()
+    return messages.update(
+        status=OutboundMessageStatus.PENDING,
+        attempts=0,
+        available_at=now,
+        updated_at=now,
+    )
+
+
+def get_backlog_stats() -> list[dict]:
+    """
+    Summarize unsent messages per phone number, status and priority.
+
+    Returns:
+        list[dict]: Rows with phone_number_id, status, priority, count and
+                    oldest (creation time of the oldest message)
+    """
+    return list(
+        OutboundMessage.objects.exclude(status=OutboundMessageStatus.SENT)
+        .values("phone_number_id", "status", "priority")
+        .annotate(count=Count("id"), oldest=Min("created_at"))
+        .order_by("phone_number_id", "status", "-priority")
+    )
+
+
+def purge_outbound_messages(older_than: timedelta) -> int:
+    """
+    Delete sent messages last updated more than `older_than` ago.
+
+    Dead messages are kept for inspection. Replies stay in the
+    conversation as assistant messages.
+
+    Args:
+        older_than: Retention period of sent messages
+
+    Returns:
+        int: Number of messages deleted
+    """
+    return delete_in_batches(
+        OutboundMessage.objects.filter(
+            status=OutboundMessageStatus.SENT,
+            updated_at__lt=timezone.now() - older_than,
+        )
+    )
@@ -0,0 +1,79 @@
+"""
+Rolling conversation summaries.
+
+When a conversation's history no longer fits the company's token budget,
+the reply schedules a summary (conversation_service.schedule_summary) and
+the worker folds the older messages into `Conversation.summary` with a
+cheap model. Replies then send the summary followed by the recent messages
+(see services.history_cache), so the prompt stays bounded however long
+the conversation runs.
+"""
+
+import logging
+
+from api.constants import MessageRole
+from api.models.conversation import Conversation
+from api.models.message import Message
+from api.utils.async_db import database_sync_to_async
+from services.history_cache import WINDOW_SIZE
+from services.llm_service import asummarize_history, estimate_tokens
+from services.tenant_cache import get_company_tenant
+
+logger = logging.getLogger(__name__)
+
+# Messages folded into the summary at once; older unsummarized ones are dropped
+MAX_MESSAGES_PER_SUMMARY = 200
+
+
+async def asummarize_conversation(conversation: Conversation) -> None:
+    """
+    Fold the messages that do not fit the history budget into the summary.
+
+    The newest messages filling half of the budget (at most half of
+    WINDOW_SIZE) stay out of the summary, so replies keep them verbatim.
+
+    Args:
+        conversation: Conversation claimed by claim_due_summaries()
+    """
+    tenant = await database_sync_to_async(get_company_tenant)(conversation.company)
+    messages = await database_sync_to_async(_get_unsummarized_messages)(conversation)
+
+    budget = tenant.config.history_token_budget // 2
+    kept = 0
+    for message in reversed(messages):
+        tokens = estimate_tokens(message.content)
+        if tokens > budget or kept == WINDOW_SIZE // 2:
+            break
+        budget -= tokens
+        kept += 1
+
+    older = messages[: len(messages) - kept]
+    if not older:
+        return
+
+    summary, tokens_used = await asummarize_history(conversation.summary, older)
+    updated = await database_sync_to_async(
+        Conversation.objects.filter(
+            pk=conversation.pk, summary_through=conversation.summary_through
+        ).update
+    )(summary=summary, summary_through=older[-1].pk)
+    if updated:
+        logger.info(
+            f"Summarized {len(older)} messages of conversation {conversation.pk} "
+            f"(tokens: {tokens_used})"
+        )
+
+
+def _get_unsummarized_messages(conversation: Conversation) -> list[Message]:
+    """Get the newest answered messages not covered by the summary, oldest first."""
+    messages = Message.objects.filter(conversation=conversation).exclude(
+        role=MessageRole.SYSTEM
+    )
+    if conversation.summary_through is not None:
+        messages = messages.filter(pk__gt=conversation.summary_through)
+    messages = list(reversed(messages.order_by("-pk")[:MAX_MESSAGES_PER_SUMMARY]))
+
+    # Unanswered customer messages are the next reply's input, not history
+    while messages and messages[-1].role == MessageRole.USER:
+        messages.pop()
+    return messages
@@ -0,0 +1,180 @@
+"""
+In-process cache of tenant (company) context, keyed by WhatsApp phone_number_id.
+
+Every incoming message needs its company, the company's config and the
+system prompt (which depends on the company's sector). These rarely change,
+so they are loaded together with one query and kept for TENANT_CACHE_TTL
+seconds. Saving or deleting a Company, CompanyConfig or Sector invalidates
+the affected entries in the current process (see api.signals); other
+processes pick up the change when their entries expire.
+"""
+
+import logging
+import threading
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+
+from api.models.company import Company
+from api.models.company_config import CompanyConfig
+
+logger = logging.getLogger(__name__)
+
+
+class TenantContext(NamedTuple):
+    """Everything needed to route and answer a message for one company."""
+
+    company: Company
+    config: CompanyConfig
+    system_prompt: str
+    prompt_version: str
+
+
+_lock = threading.Lock()
+# phone_number_id -> (expires_at, context); None caches unknown numbers
+_by_phone: dict[str, tuple[float, TenantContext | None]] = {}
+# company pk -> (expires_at, context)
+_by_company: dict[int, tuple[float, TenantContext]] = {}
+
+
+def get_tenants(phone_number_ids: set[str]) -> dict[str, TenantContext]:
+    """
+    Get the tenant context for several WhatsApp phone numbers.
+
+    Cache misses are loaded with a single query.
+
+    Args:
+        phone_number_ids: WhatsApp Business Phone Number IDs
+
+    Returns:
+        dict[str, TenantContext]: Context per known phone_number_id; unknown
+                                  numbers are left out
+    """
+    now = time.monotonic()
+    tenants: dict[str, TenantContext] = {}
+    missing = set()
+
+    with _lock:
+        for phone_number_id in phone_number_ids:
+            entry = _by_phone.get(phone_number_id)
+            if entry is None or entry[0] <= now:
+                missing.add(phone_number_id)
+            elif entry[1] is not None:
+                tenants[phone_number_id] = entry[1]
+
+    if missing:
+        loaded = {
+            context.company.whatsapp_phone_id: context
+            for context in _load(Company.objects.filter(whatsapp_phone_id__in=missing))
+        }
+        for phone_number_id in missing:
+            _store_phone(phone_number_id, loaded.get(phone_number_id))
+        tenants.update(loaded)
+
+    return tenants
+
+
+def get_tenant(phone_number_id: str) -> TenantContext | None:
+    """
+    Get the tenant context for a WhatsApp phone number.
+
+    Args:
+        phone_number_id: WhatsApp Business Phone Number ID
+
+    Returns:
+        TenantContext | None: Context, or None if no company uses the number
+    """
+    return get_tenants({phone_number_id}).get(phone_number_id)
+
+
+def get_company_tenant(company: Company) -> TenantContext:
+    """
+    Get the tenant context for a company.
+
+    Args:
+        company: Company instance
+
+    Returns:
+        TenantContext: Context for the company
+    """
+    with _lock:
+        entry = _by_company.get(company.pk)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+    (context,) = _load(Company.objects.filter(pk=company.pk))
+    if context.company.whatsapp_phone_id:
+        _store_phone(context.company.whatsapp_phone_id, context)
+    else:
+        _store_company(context)
+    return context
+
+
+def invalidate_company(company_id: int) -> None:
+    """Drop the cached context of a company (under any phone number)."""
+    with _lock:
+        _by_company.pop(company_id, None)
+        for phone_number_id, (_, context) in list(_by_phone.items()):
+            if context is not None and context.company.pk == company_id:
+                del _by_phone[phone_number_id]
+
+
+def invalidate_phone_number(phone_number_id: str) -> None:
+    """Drop the cached context (or cached miss) of a phone number."""
+    with _lock:
+        _by_phone.pop(phone_number_id, None)
+
+
+def invalidate_sector(sector_id: int) -> None:
+    """Drop the cached context of every company in a sector."""
+    with _lock:
+        company_ids = {
+            company_id
+            for company_id, (_, context) in _by_company.items()
+            if context.company.sector_id == sector_id
+        }
+    for company_id in company_ids:
+        invalidate_company(company_id)
+
+
+def clear_tenant_cache() -> None:
+    """Drop every cached context."""
+    with _lock:
+        _by_phone.clear()
+        _by_company.clear()
+
+
+def _load(companies) -> list[TenantContext]:
+    """Load companies with their sector and config, creating missing configs."""
+    contexts = []
+    for company in companies.select_related("sector", "config"):
+        try:
+            config = company.config
+        except CompanyConfig.DoesNotExist:
+            config, _ = CompanyConfig.objects.get_or_create(company=company)
+            config.company = company
+        if not config.prompt_version:
+            config.save(update_fields=["compiled_system_prompt", "prompt_version"])
+        contexts.append(
+            TenantContext(
+                company, config, config.get_system_prompt(), config.prompt_version
+            )
+        )
+    return contexts
+
+
+def _store_phone(phone_number_id: str, context: TenantContext | None) -> None:
+    expires_at = time.monotonic() + settings.TENANT_CACHE_TTL
+    with _lock:
+        _by_phone[phone_number_id] = (expires_at, context)
+        if context is not None:
+            _by_company[context.company.pk] = (expires_at, context)
+
+
+def _store_company(context: TenantContext) -> None:
+    with _lock:
+        _by_company[context.company.pk] = (
+            time.monotonic() + settings.TENANT_CACHE_TTL,
+            context,
+        )
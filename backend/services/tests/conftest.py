@@ -0,0 +1,11 @@
+"""
+Pytest configuration for the service tests.
+"""
+
+import os
+
+import django
+
+# Configure Django settings for tests
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
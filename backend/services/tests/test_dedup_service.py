@@ -0,0 +1,83 @@
+"""
+Unit tests for the seen-set of WhatsApp message IDs.
+"""
+
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+
+from services import dedup_service
+from services.dedup_service import (
+    aget_seen_message_ids,
+    amark_messages_seen,
+    get_seen_message_ids,
+    mark_messages_seen,
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    """Start every test with an empty seen-set."""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+class TestSeenSet:
+    """Tests for get_seen_message_ids and mark_messages_seen."""
+
+    def test_unseen_messages_are_not_reported(self):
+        """Nothing is seen before it is marked."""
+        assert get_seen_message_ids(["wamid.1", "wamid.2"]) == set()
+
+    def test_marked_messages_are_reported(self):
+        """Only the marked subset of the requested IDs is returned."""
+        mark_messages_seen(["wamid.1", "wamid.3"])
+
+        assert get_seen_message_ids(["wamid.1", "wamid.2", "wamid.3"]) == {
+            "wamid.1",
+            "wamid.3",
+        }
+
+    def test_empty_input_skips_the_cache(self):
+        """Empty batches do not reach the cache."""
+        with patch.object(dedup_service, "cache") as mock_cache:
+            assert get_seen_message_ids([]) == set()
+            mark_messages_seen([])
+
+        mock_cache.get_many.assert_not_called()
+        mock_cache.set_many.assert_not_called()
+
+    @override_settings(WHATSAPP_DEDUP_TTL=60)
+    def test_entries_expire_after_the_ttl(self):
+        """Entries are stored with WHATSAPP_DEDUP_TTL."""
+        with patch.object(dedup_service, "cache") as mock_cache:
+            mark_messages_seen(["wamid.1"])
+
+        mock_cache.set_many.assert_called_once_with(
+            {f"{dedup_service.KEY_PREFIX}wamid.1": True}, timeout=60
+        )
+
+
+class TestAsyncSeenSet:
+    """Tests for aget_seen_message_ids and amark_messages_seen."""
+
+    @pytest.mark.asyncio
+    async def test_marked_messages_are_reported(self):
+        """The async variants share the seen-set with the sync ones."""
+        await amark_messages_seen(["wamid.1"])
+        mark_messages_seen(["wamid.2"])
+
+        assert await aget_seen_message_ids(["wamid.1", "wamid.2", "wamid.3"]) == {
+            "wamid.1",
+            "wamid.2",
+        }
+
+    @pytest.mark.asyncio
+    async def test_empty_input(self):
+        """Empty batches return nothing."""
+        await amark_messages_seen([])
+
+        assert await aget_seen_message_ids([]) == set()
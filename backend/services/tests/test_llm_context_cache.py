@@ -0,0 +1,213 @@
+"""
+Unit tests for the Gemini context cache of company system prompts.
+"""
+
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+from google.genai import errors
+
+from services import llm_service
+from services.llm_service import GeminiContextCache, _is_cache_error
+
+LONG_PROMPT = "x" * 400
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    """Start every test with no shared cache entries."""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def cache_settings():
+    """Cache prompts of 50 tokens or more."""
+    with override_settings(
+        GEMINI_CONTEXT_CACHE_ENABLED=True,
+        GEMINI_CONTEXT_CACHE_MIN_TOKENS=50,
+        GEMINI_CONTEXT_CACHE_TTL=3600,
+    ):
+        yield
+
+
+@pytest.fixture
+def gemini_client():
+    """Patch the Gemini client used to create and extend caches."""
+    client = MagicMock()
+    client.aio.caches.create = AsyncMock(
+        return_value=SimpleNamespace(
+            name="cachedContents/abc",
+            expire_time=datetime.now(UTC) + timedelta(hours=1),
+        )
+    )
+    client.aio.caches.update = AsyncMock()
+    with patch.object(llm_service, "get_gemini_model", return_value=client):
+        yield client
+
+
+def make_tenant(system_prompt=LONG_PROMPT, prompt_version="v1"):
+    """Build a tenant context of company 1."""
+    return SimpleNamespace(
+        company=SimpleNamespace(pk=1, slug="acme"),
+        system_prompt=system_prompt,
+        prompt_version=prompt_version,
+    )
+
+
+class TestGeminiContextCache:
+    """Tests for GeminiContextCache."""
+
+    @pytest.mark.asyncio
+    async def test_small_prompts_are_sent_inline(self, gemini_client):
+        """Prompts below the cacheable minimum never create a cache."""
+        name = await GeminiContextCache().aget(make_tenant(system_prompt="short"))
+
+        assert name is None
+        gemini_client.aio.caches.create.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_disabled(self, gemini_client):
+        """The prompt is inline when caching is disabled."""
+        with override_settings(GEMINI_CONTEXT_CACHE_ENABLED=False):
+            assert await GeminiContextCache().aget(make_tenant()) is None
+        gemini_client.aio.caches.create.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_cache_is_created_once(self, gemini_client):
+        """The cache is created on first use and reused afterwards."""
+        context_cache = GeminiContextCache()
+
+        assert await context_cache.aget(make_tenant()) == "cachedContents/abc"
+        assert await context_cache.aget(make_tenant()) == "cachedContents/abc"
+        gemini_client.aio.caches.create.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_cache_is_shared_between_processes(self, gemini_client):
+        """Another process finds the cache through the Django cache."""
+        await GeminiContextCache().aget(make_tenant())
+
+        assert await GeminiContextCache().aget(make_tenant()) == "cachedContents/abc"
+        gemini_client.aio.caches.create.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_new_prompt_version_creates_a_new_cache(self, gemini_client):
+        """Changing the prompt creates a cache for the new version."""
+        context_cache = GeminiContextCache()
+
+        await context_cache.aget(make_tenant())
+        await context_cache.aget(make_tenant(prompt_version="v2"))
+
+        assert gemini_client.aio.caches.create.await_count == 2
+        gemini_client.aio.caches.delete.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_expiring_cache_is_extended(self, gemini_client):
+        """Caches about to expire get their TTL extended."""
+        gemini_client.aio.caches.create.return_value.expire_time = datetime.now(
+            UTC
+        ) + timedelta(minutes=1)
+        gemini_client.aio.caches.update.return_value = SimpleNamespace(
+            name="cachedContents/abc",
+            expire_time=datetime.now(UTC) + timedelta(hours=1),
+        )
+        context_cache = GeminiContextCache()
+
+        await context_cache.aget(make_tenant())
+        assert await context_cache.aget(make_tenant()) == "cachedContents/abc"
+
+        gemini_client.aio.caches.update.assert_awaited_once()
+        gemini_client.aio.caches.create.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_failed_creation_is_not_retried_right_away(self, gemini_client):
+        """After a failure the prompt is inline until FAILURE_RETRY passes."""
+        gemini_client.aio.caches.create.side_effect = RuntimeError("boom")
+        context_cache = GeminiContextCache()
+
+        assert await context_cache.aget(make_tenant()) is None
+        assert await GeminiContextCache().aget(make_tenant()) is None
+        gemini_client.aio.caches.create.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_invalidate_recreates_the_cache(self, gemini_client):
+        """An invalidated cache is created again on the next request."""
+        context_cache = GeminiContextCache()
+
+        await context_cache.aget(make_tenant())
+        await context_cache.ainvalidate(make_tenant())
+        await context_cache.aget(make_tenant())
+
+        assert gemini_client.aio.caches.create.await_count == 2
+
+
+class TestIsCacheError:
+    """Tests for _is_cache_error."""
+
+    def test_cached_content_errors(self):
+        """Errors about the cached content are cache errors."""
+        error = errors.ClientError(
+            404,
+            {"error": {"message": "CachedContent not found", "status": "NOT_FOUND"}},
+        )
+
+        assert _is_cache_error(error)
+
+    def test_other_errors(self):
+        """Unrelated API errors and exceptions are not."""
+        error = errors.ClientError(
+            403,
+            {"error": {"message": "API key not valid", "status": "PERMISSION_DENIED"}},
+        )
+
+        assert not _is_cache_error(error)
+        assert not _is_cache_error(RuntimeError("cachedContent"))
+
+
+class TestGenerateWithContextCache:
+    """Tests for the inline fallback of agenerate_response."""
+
+    @pytest.mark.asyncio
+    async def test_missing_cache_is_retried_inline(self):
+        """A cache Gemini no longer has is dropped and the prompt sent inline."""
+        tenant = make_tenant()
+        tenant.config = SimpleNamespace(max_tokens=100, temperature=0.5)
+        client = MagicMock()
+        client.aio.models.generate_content = AsyncMock(
+            side_effect=[
+                errors.ClientError(
+                    404, {"error": {"message": "CachedContent not found"}}
+                ),
+                SimpleNamespace(text="Hola", usage_metadata=None),
+            ]
+        )
+        context_cache = MagicMock()
+        context_cache.aget = AsyncMock(return_value="cachedContents/abc")
+        context_cache.ainvalidate = AsyncMock()
+
+        with (
+            patch.object(llm_service, "get_gemini_model", return_value=client),
+            patch.object(llm_service, "gemini_context_cache", context_cache),
+            patch.object(
+                llm_service, "_build_generation_request", return_value=([], tenant)
+            ),
+            patch.object(llm_service, "_parse_response", return_value=("Hola", 1)),
+        ):
+            assert await llm_service.agenerate_response(None, [], "Hola") == (
+                "Hola",
+                1,
+            )
+
+        context_cache.ainvalidate.assert_awaited_once_with(tenant)
+        configs = [
+            call.kwargs["config"]
+            for call in client.aio.models.generate_content.await_args_list
+        ]
+        assert configs[0].cached_content == "cachedContents/abc"
+        assert configs[1].cached_content is None
+        assert configs[1].system_instruction == LONG_PROMPT
@@ -0,0 +1,75 @@
+"""
+Unit tests for the outcome handling of the outbound dispatcher.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from django.utils import timezone
+
+from api.management.commands import run_outbound_dispatcher
+from api.management.commands.run_outbound_dispatcher import send_outbound_message
+from api.utils.whatsapp_sender import SendResult
+
+MODULE = "api.management.commands.run_outbound_dispatcher"
+
+
+def make_message():
+    """Build a queued outbound message."""
+    return SimpleNamespace(
+        pk=1,
+        phone_number_id="111",
+        to_number="5493816378744",
+        text="Hola",
+        stage_timings={},
+        created_at=timezone.now(),
+        typing_message_id="",
+        company=SimpleNamespace(slug="acme"),
+    )
+
+
+async def send(result):
+    """Send a message whose request ends with `result`; return the fail call."""
+    sender = MagicMock()
+    sender.asend_message = AsyncMock(return_value=result)
+    with (
+        patch.object(run_outbound_dispatcher, "get_sender", return_value=sender),
+        patch(f"{MODULE}.fail_outbound_message") as mock_fail,
+    ):
+        await send_outbound_message(make_message(), MagicMock())
+    mock_fail.assert_called_once()
+    return mock_fail.call_args
+
+
+class TestSendOutboundMessage:
+    """Tests for send_outbound_message."""
+
+    @pytest.mark.asyncio
+    async def test_connect_failures_are_retried(self):
+        """Requests that never connected go back to the queue."""
+        call = await send(SendResult(False, None, "refused", connect_failed=True))
+
+        assert call.kwargs["permanent"] is False
+
+    @pytest.mark.asyncio
+    async def test_read_timeouts_are_not_retried(self):
+        """Requests Meta may have received are left for review, not resent."""
+        call = await send(SendResult(False, None, "read timeout"))
+
+        assert call.kwargs["permanent"] is True
+
+    @pytest.mark.asyncio
+    async def test_rate_limits_and_server_errors_are_retried(self):
+        """429 and 5xx responses go back to the queue."""
+        for status_code in (429, 500, 503):
+            call = await send(SendResult(False, status_code, "error"))
+
+            assert call.kwargs["permanent"] is False
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_permanent(self):
+        """Other 4xx responses won't succeed on retry."""
+        call = await send(SendResult(False, 400, "invalid recipient"))
+
+        assert call.kwargs["permanent"] is True
@@ -0,0 +1,51 @@
+"""
+Unit tests for the sampling of repetitive log records.
+"""
+
+import logging
+from unittest.mock import patch
+
+from api.utils.structured_logging import SamplingFilter
+
+
+def make_record(sample_key=None):
+    """Build an error record, sampled under `sample_key` if given."""
+    record = logging.LogRecord("test", logging.ERROR, "", 0, "failed", (), None)
+    if sample_key is not None:
+        record.sample_key = sample_key
+    return record
+
+
+class TestSamplingFilter:
+    """Tests for SamplingFilter."""
+
+    def test_records_without_key_always_pass(self):
+        """Unsampled records are never dropped."""
+        sampling = SamplingFilter(interval=60)
+
+        assert all(sampling.filter(make_record()) for _ in range(3))
+
+    def test_repeats_are_dropped_and_counted(self):
+        """One record per key and interval passes, carrying the dropped count."""
+        sampling = SamplingFilter(interval=60)
+        with patch("api.utils.structured_logging.time.monotonic") as mock_time:
+            mock_time.return_value = 100.0
+            assert sampling.filter(make_record("a")) is True
+            assert sampling.filter(make_record("a")) is False
+            assert sampling.filter(make_record("a")) is False
+            assert sampling.filter(make_record("b")) is True
+
+            mock_time.return_value = 161.0
+            record = make_record("a")
+            assert sampling.filter(record) is True
+
+        assert record.suppressed == 2
+
+    def test_tracked_keys_are_bounded(self):
+        """The least recently seen key is forgotten beyond max_keys."""
+        sampling = SamplingFilter(interval=60, max_keys=2)
+
+        for key in ("a", "b", "a", "c"):
+            sampling.filter(make_record(key))
+
+        assert list(sampling._last) == ["a", "c"]
@@ -0,0 +1,193 @@
+"""
+Unit tests for the WhatsApp Cloud API webhook parser.
+"""
+
+from api.utils.whatsapp_parser import (
+    is_status_only_payload,
+    iter_webhook_messages,
+    iter_webhook_values,
+    parse_webhook_payload,
+)
+
+
+def text_message(message_id, from_number="5493816378744", body="Hola"):
+    """Build a text message object."""
+    return {
+        "from": from_number,
+        "id": message_id,
+        "timestamp": "1700000000",
+        "type": "text",
+        "text": {"body": body},
+    }
+
+
+def make_change(phone_number_id, *messages):
+    """Build a change of the messages field."""
+    return {
+        "field": "messages",
+        "value": {
+            "messaging_product": "whatsapp",
+            "metadata": {"phone_number_id": phone_number_id},
+            "messages": list(messages),
+        },
+    }
+
+
+def make_payload(*entries):
+    """Build a webhook payload; each entry is a list of changes."""
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{"id": "waba", "changes": changes} for changes in entries],
+    }
+
+
+class TestIterWebhookMessages:
+    """Tests for iter_webhook_messages."""
+
+    def test_batched_messages_are_parsed_in_order(self):
+        """Every message of every change and entry is returned."""
+        payload = make_payload(
+            [
+                make_change("111", text_message("wamid.1"), text_message("wamid.2")),
+                make_change("222", text_message("wamid.3")),
+            ],
+            [make_change("333", text_message("wamid.4", body="Chau"))],
+        )
+
+        messages = list(iter_webhook_messages(payload))
+
+        assert [m["message_id"] for m in messages] == [
+            "wamid.1",
+            "wamid.2",
+            "wamid.3",
+            "wamid.4",
+        ]
+        assert [m["phone_number_id"] for m in messages] == ["111", "111", "222", "333"]
+        assert messages[3] == {
+            "phone_number_id": "333",
+            "from_number": "5493816378744",
+            "message_body": "Chau",
+            "message_id": "wamid.4",
+        }
+
+    def test_non_text_messages_are_skipped(self):
+        """Images, reactions and other types are ignored."""
+        image = {"from": "5493816378744", "id": "wamid.1", "type": "image", "image": {}}
+        payload = make_payload([make_change("111", image, text_message("wamid.2"))])
+
+        assert [m["message_id"] for m in iter_webhook_messages(payload)] == ["wamid.2"]
+
+    def test_incomplete_messages_are_skipped(self):
+        """Messages without sender, ID or body are ignored."""
+        payload = make_payload(
+            [
+                make_change(
+                    "111",
+                    text_message("wamid.1", from_number=""),
+                    text_message("", body="Hola"),
+                    text_message("wamid.3", body=""),
+                    {
+                        "from": "5493816378744",
+                        "id": "wamid.4",
+                        "type": "text",
+                        "text": None,
+                    },
+                    text_message("wamid.5"),
+                )
+            ]
+        )
+
+        assert [m["message_id"] for m in iter_webhook_messages(payload)] == ["wamid.5"]
+
+    def test_changes_without_phone_number_id_are_skipped(self):
+        """Messages cannot be routed without the business phone number."""
+        change = make_change("111", text_message("wamid.1"))
+        del change["value"]["metadata"]
+        payload = make_payload([change, make_change("222", text_message("wamid.2"))])
+
+        assert [m["message_id"] for m in iter_webhook_messages(payload)] == ["wamid.2"]
+
+    def test_status_updates_yield_nothing(self):
+        """Changes without messages (delivery statuses) are ignored."""
+        change = make_change("111")
+        del change["value"]["messages"]
+        change["value"]["statuses"] = [{"id": "wamid.1", "status": "delivered"}]
+
+        assert list(iter_webhook_messages(make_payload([change]))) == []
+
+    def test_malformed_payloads_yield_nothing(self):
+        """Missing or mistyped entries and changes are skipped."""
+        payloads = [
+            {},
+            {"entry": "invalid"},
+            {"entry": ["invalid", {"changes": "invalid"}]},
+            {"entry": [{"changes": ["invalid", {}]}]},
+        ]
+
+        for payload in payloads:
+            assert list(iter_webhook_messages(payload)) == []
+
+
+class TestIterWebhookValues:
+    """Tests for iter_webhook_values."""
+
+    def test_values_of_every_change(self):
+        """The value object of each change is returned, in order."""
+        payload = make_payload(
+            [make_change("111"), make_change("222")], [make_change("333")]
+        )
+
+        values = list(iter_webhook_values(payload))
+
+        assert [v["metadata"]["phone_number_id"] for v in values] == [
+            "111",
+            "222",
+            "333",
+        ]
+
+
+def status_change(phone_number_id):
+    """Build a change carrying only a delivery status."""
+    change = make_change(phone_number_id)
+    del change["value"]["messages"]
+    change["value"]["statuses"] = [{"id": "wamid.1", "status": "delivered"}]
+    return change
+
+
+class TestIsStatusOnlyPayload:
+    """Tests for is_status_only_payload."""
+
+    def test_statuses_only(self):
+        """Payloads whose every change is a status update."""
+        payload = make_payload([status_change("111"), status_change("222")])
+
+        assert is_status_only_payload(payload) is True
+
+    def test_payloads_with_messages(self):
+        """A single change with messages means the worker must process it."""
+        payload = make_payload(
+            [status_change("111"), make_change("222", text_message("wamid.2"))]
+        )
+
+        assert is_status_only_payload(payload) is False
+
+    def test_empty_or_unknown_payloads(self):
+        """Payloads without changes, or with other fields, are not status-only."""
+        assert is_status_only_payload({}) is False
+        assert is_status_only_payload(make_payload([make_change("111")])) is False
+
+
+class TestParseWebhookPayload:
+    """Tests for parse_webhook_payload."""
+
+    def test_first_message_is_returned(self):
+        """Only the first text message of a batch is returned."""
+        payload = make_payload(
+            [make_change("111", text_message("wamid.1"), text_message("wamid.2"))]
+        )
+
+        assert parse_webhook_payload(payload)["message_id"] == "wamid.1"
+
+    def test_payload_without_messages(self):
+        """Payloads without text messages return None."""
+        assert parse_webhook_payload(make_payload([make_change("111")])) is None
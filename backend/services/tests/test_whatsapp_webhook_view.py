@@ -0,0 +1,81 @@
+"""
+Unit tests for the WhatsApp webhook view.
+"""
+
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from django.test import RequestFactory
+
+from api.views.whatsapp import whatsapp_webhook
+
+MODULE = "api.views.whatsapp"
+
+PAYLOAD = {
+    "entry": [
+        {
+            "changes": [
+                {
+                    "field": "messages",
+                    "value": {
+                        "metadata": {"phone_number_id": "111"},
+                        "messages": [
+                            {
+                                "from": "5493816378744",
+                                "id": "wamid.1",
+                                "type": "text",
+                                "text": {"body": "Hola"},
+                            }
+                        ],
+                    },
+                }
+            ]
+        }
+    ]
+}
+
+
+def post(payload):
+    """Build a webhook POST request."""
+    return RequestFactory().post(
+        "/api/whatsapp/webhook",
+        data=json.dumps(payload),
+        content_type="application/json",
+    )
+
+
+class TestDedupFailsOpen:
+    """Cache errors must not make Meta redeliver a stored payload."""
+
+    @pytest.mark.asyncio
+    async def test_seen_lookup_error(self):
+        """The payload is queued as if it was never seen."""
+        with (
+            patch(
+                f"{MODULE}.aget_seen_message_ids",
+                AsyncMock(side_effect=ConnectionError("cache down")),
+            ),
+            patch(f"{MODULE}.amark_messages_seen", AsyncMock()),
+            patch(f"{MODULE}.aenqueue_webhook", AsyncMock()) as mock_enqueue,
+        ):
+            response = await whatsapp_webhook(post(PAYLOAD))
+
+        assert response.status_code == 200
+        mock_enqueue.assert_awaited_once_with(PAYLOAD)
+
+    @pytest.mark.asyncio
+    async def test_mark_seen_error(self):
+        """A stored payload is acknowledged even if it cannot be marked seen."""
+        with (
+            patch(f"{MODULE}.aget_seen_message_ids", AsyncMock(return_value=set())),
+            patch(
+                f"{MODULE}.amark_messages_seen",
+                AsyncMock(side_effect=ConnectionError("cache down")),
+            ),
+            patch(f"{MODULE}.aenqueue_webhook", AsyncMock()) as mock_enqueue,
+        ):
+            response = await whatsapp_webhook(post(PAYLOAD))
+
+        assert response.status_code == 200
+        mock_enqueue.assert_awaited_once()
@@ -0,0 +1,146 @@
+"""
+Durable queue for incoming WhatsApp webhook payloads.
+
+Jobs are stored in the WebhookJob table and claimed by worker processes
+with `SELECT ... FOR UPDATE SKIP LOCKED`, so several workers can drain the
+queue concurrently without processing the same payload twice.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from api.constants import WebhookJobStatus
+from api.models.webhook_job import WebhookJob
+from api.utils.batch_delete import delete_in_batches
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+LOCK_TIMEOUT = timedelta(minutes=5)
+
+
+async def aenqueue_webhook(payload: dict) -> WebhookJob:
+    """
+    Persist a webhook payload for background processing.
+
+    Args:
+        payload: Decoded webhook payload from WhatsApp Cloud API
+
+    Returns:
+        WebhookJob: The created job
+    """
+    return await WebhookJob.objects.acreate(payload=payload)
+
+
+def claim_webhook_jobs(limit: int) -> list[WebhookJob]:
+    """
+    Claim up to `limit` jobs that are ready to be processed.
+
+    Pending jobs whose `available_at` has passed are claimed, as well as
+    processing jobs whose lock is older than LOCK_TIMEOUT (their worker
+    most likely died mid-job).
+
+    Args:
+        limit: Maximum number of jobs to claim
+
+    Returns:
+        list[WebhookJob]: Claimed jobs, already marked as processing
+    """
+    if limit <= 0:
+        return []
+
+    now = timezone.now()
+
+    with transaction.atomic():
+        jobs = list(
+            WebhookJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=WebhookJobStatus.PENDING, available_at__lte=now)
+                | Q(
+                    status=WebhookJobStatus.PROCESSING, locked_at__lt=now - LOCK_TIMEOUT
+                )
+            )
+            .order_by("available_at", "id")[:limit]
+        )
+
+        if jobs:
+            WebhookJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status=WebhookJobStatus.PROCESSING,
+                locked_at=now,
+                attempts=F("attempts") + 1,
+                updated_at=now,
+            )
+            for job in jobs:
+                job.status = WebhookJobStatus.PROCESSING
+                job.locked_at = now
+                job.attempts += 1
+
+    return jobs
+
+
+def complete_webhook_job(job: WebhookJob) -> None:
+    """
+    Mark a job as successfully processed.
+
+    Args:
+        job: The job to complete
+    """
+    WebhookJob.objects.filter(pk=job.pk).update(
+        status=WebhookJobStatus.DONE,
+        locked_at=None,
+        last_error="",
+        updated_at=timezone.now(),
+    )
+
+
+def fail_webhook_job(job: WebhookJob, error: str) -> None:
+    """
+    Record a failed attempt and schedule a retry with exponential backoff.
+
+    After MAX_ATTEMPTS the job is marked as failed and left for inspection.
+
+    Args:
+        job: The job that failed
+        error: Error description to store
+    """
+    now = timezone.now()
+
+    if job.attempts >= MAX_ATTEMPTS:
+        logger.error(f"Webhook job {job.pk} failed permanently: {error}")
+        status = WebhookJobStatus.FAILED
+        available_at = job.available_at
+    else:
+        status = WebhookJobStatus.PENDING
+        available_at = now + timedelta(seconds=2**job.attempts)
+
+    WebhookJob.objects.filter(pk=job.pk).update(
+        status=status,
+        available_at=available_at,
+        locked_at=None,
+        last_error=error,
+        updated_at=now,
+    )
+
+
+def purge_webhook_jobs(older_than: timedelta) -> int:
+    """
+    Delete processed jobs last updated more than `older_than` ago.
+
+    Failed jobs are kept for inspection.
+
+    Args:
+        older_than: Retention period of processed jobs
+
+    Returns:
+        int: Number of jobs deleted
+    """
+    return delete_in_batches(
+        WebhookJob.objects.filter(
+            status=WebhookJobStatus.DONE,
+            updated_at__lt=timezone.now() - older_than,
+        )
+    )
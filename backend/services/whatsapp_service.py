@@ -0,0 +1,390 @@
+"""
+WhatsApp message pipeline.
+
+Runs on the background worker: logs the webhook payload, stores the
+incoming messages, generates the AI reply and queues it for the outbound
+dispatcher to send back to the customer.
+The pipeline is async; ORM calls run on the executor through
+database_sync_to_async so many conversations can be in flight at once.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import aclosing
+
+from django.utils import timezone
+from google.genai import types
+
+from api.constants import OutboundMessagePriority
+from api.models.conversation import Conversation
+from api.models.message import Message
+from api.utils.async_db import database_sync_to_async
+from api.utils.structured_logging import LazyJSON
+from api.utils.timing import StageTimer
+from api.utils.whatsapp_parser import iter_webhook_messages, iter_webhook_values
+from api.utils.whatsapp_sender import asend_typing_indicator
+from services.conversation_service import (
+    get_pending_user_messages,
+    get_received_at,
+    handle_incoming_messages,
+    has_newer_user_messages,
+    schedule_summary,
+)
+from services.history_cache import get_history_contents
+from services.llm_service import agenerate_response, agenerate_response_stream
+from services.outbound_queue_service import (
+    enqueue_outbound_message,
+    enqueue_reply,
+    finish_streamed_reply,
+    start_streamed_reply,
+)
+from services.tenant_cache import get_company_tenant, get_tenants
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_RESPONSE = (
+    "Disculpá, estoy teniendo problemas técnicos. "
+    "Por favor, intentá de nuevo en unos minutos."
+)
+
+
+def log_webhook_payload(data: dict) -> None:
+    """
+    Log a concise summary of a webhook payload.
+
+    Text messages are logged as a single line, failed statuses as errors and
+    anything else with the full payload. Every entry and change is covered.
+
+    Args:
+        data: Webhook payload from WhatsApp Cloud API
+    """
+    values = list(iter_webhook_values(data))
+    if not values:
+        # No entries or changes, show full payload
+        logger.info("WhatsApp webhook received: %s", LazyJSON(data))
+        return
+
+    # Resolve company names from the tenant cache
+    phone_number_ids = {
+        (value.get("metadata") or {}).get("phone_number_id") for value in values
+    }
+    phone_number_ids.discard(None)
+    tenants = get_tenants(phone_number_ids)
+
+    show_payload = False
+    for value in values:
+        messages = value.get("messages") or []
+        statuses = value.get("statuses") or []
+        metadata = value.get("metadata") or {}
+
+        if not messages and not statuses:
+            show_payload = True
+
+        for message in messages:
+            if message.get("type") != "text":
+                # Non-text message, show full payload
+                show_payload = True
+                continue
+
+            tenant = tenants.get(metadata.get("phone_number_id"))
+            to_number = metadata.get("display_phone_number")
+            if tenant:
+                company_identifier = tenant.company.name
+            else:
+                company_identifier = f"To: {to_number}" if to_number else "Unknown"
+
+            from_number = message.get("from")
+            text_body = (message.get("text") or {}).get("body")
+            logger.info(
+                f"WhatsApp message - Company: {company_identifier}, From: {from_number}, Body: {text_body}"
+            )
+
+        _log_failed_statuses(statuses)
+
+    if show_payload:
+        logger.info("WhatsApp webhook received: %s", LazyJSON(data))
+
+
+def log_webhook_statuses(data: dict) -> None:
+    """
+    Log the failed delivery statuses of a webhook payload.
+
+    Used by the webhook view for status-only payloads, which need no
+    further processing and are never queued.
+
+    Args:
+        data: Webhook payload from WhatsApp Cloud API
+    """
+    for value in iter_webhook_values(data):
+        _log_failed_statuses(value.get("statuses") or [])
+
+
+def _log_failed_statuses(statuses: list[dict]) -> None:
+    """
+    Log failed statuses as errors; sent, delivered and read are suppressed.
+
+    Failures are sampled per error code, so a burst of one error (e.g. an
+    expired customer service window on a campaign) logs one record per
+    LOG_SAMPLE_INTERVAL with the count of the others, while every distinct
+    error still shows.
+    """
+    for status in statuses:
+        if status.get("status") == "failed":
+            error_codes = ",".join(
+                str(error.get("code")) for error in status.get("errors") or []
+            )
+            logger.error(
+                "WhatsApp message failed - To: %s, Status: %s",
+                status.get("recipient_id"),
+                LazyJSON(status),
+                extra={"sample_key": f"status_failed:{error_codes}"},
+            )
+
+
+async def process_webhook_payload(data: dict, timer: StageTimer | None = None) -> None:
+    """
+    Store every message of a webhook payload and mark them as read.
+
+    Replies are not generated here: ingestion schedules a debounced reply
+    per conversation, which the worker picks up with reply_to_conversation().
+
+    Args:
+        data: Webhook payload from WhatsApp Cloud API
+        timer: Stage timer of the webhook job (optional)
+    """
+    timer = timer or StageTimer()
+
+    with timer.stage("log"):
+        await database_sync_to_async(log_webhook_payload)(data)
+
+    with timer.stage("parse"):
+        parsed_messages = list(iter_webhook_messages(data))
+
+    incoming = await database_sync_to_async(handle_incoming_messages)(
+        parsed_messages, timer
+    )
+
+    # Send typing indicators (mark as read)
+    with timer.stage("typing_indicator"):
+        await asyncio.gather(
+            *(
+                asend_typing_indicator(
+                    phone_number_id=parsed["phone_number_id"],
+                    to_number=parsed["from_number"],
+                    message_id=parsed["message_id"],
+                )
+                for _, parsed, _ in incoming
+            )
+        )
+
+
+async def reply_to_conversation(conversation: Conversation) -> None:
+    """
+    Generate a single AI reply covering all unanswered customer messages.
+
+    Bursts of fragments ("hola" / "no tengo internet" / "desde ayer") are
+    answered together. If the customer writes again while the reply is being
+    generated, the reply is dropped: the new fragment already scheduled
+    another one that covers everything.
+
+    Companies with `stream_replies` enabled get the reply in several
+    messages, see stream_reply_to_conversation().
+
+    Args:
+        conversation: Conversation claimed by claim_due_conversations()
+    """
+    company = conversation.company
+    pending = await database_sync_to_async(get_pending_user_messages)(conversation)
+    if not pending:
+        return
+
+    # Continue the timings of the newest fragment, the one the customer waits on
+    timer = StageTimer(pending[-1].stage_timings)
+    timer.record(
+        "debounce", (timezone.now() - pending[-1].created_at).total_seconds() * 1000
+    )
+
+    tenant = await database_sync_to_async(get_company_tenant)(company)
+    if tenant.config.stream_replies:
+        await stream_reply_to_conversation(conversation, pending, timer)
+        return
+
+    # Generate AI response
+    try:
+        with timer.stage("history_fetch"):
+            formatted_history, user_message = await _build_llm_input(
+                conversation, pending, tenant.config.history_token_budget
+            )
+
+        # Generate response
+        with timer.stage("llm"):
+            response_text, tokens_used = await agenerate_response(
+                company=company,
+                conversation_history=formatted_history,
+                user_message=user_message,
+            )
+        logger.info(
+            f"AI response generated: {response_text[:100]} (tokens: {tokens_used})"
+        )
+
+    except Exception as e:
+        # Fallback message on LLM error
+        logger.error(f"LLM generation error: {e}", exc_info=True)
+        response_text = FALLBACK_RESPONSE
+        tokens_used = 0
+
+    if await _has_newer_user_messages(conversation, pending):
+        return
+
+    # Store the response and queue it ahead of bulk sends for the outbound dispatcher
+    outbound = await database_sync_to_async(enqueue_reply)(
+        conversation=conversation,
+        text=response_text,
+        tokens_used=tokens_used,
+        received_at=get_received_at(pending[-1]),
+        stage_timings=timer.timings,
+    )
+    logger.info(f"Reply queued for delivery: {outbound.pk}")
+
+
+async def stream_reply_to_conversation(
+    conversation: Conversation, pending: list[Message], timer: StageTimer | None = None
+) -> None:
+    """
+    Reply with a streamed AI response, one WhatsApp message per segment.
+
+    Each sentence or paragraph chunk is queued as soon as Gemini completes
+    it, and the typing indicator is shown again after every chunk but the
+    last, so the customer waits for the first sentence rather than the
+    whole answer. The assistant message is saved with the first segment,
+    so another fragment's debounce cannot trigger a second reply, and then
+    completed with the assembled reply, with the time until the first
+    segment was queued as its latency.
+
+    Args:
+        conversation: Conversation claimed by claim_due_conversations()
+        pending: Unanswered user messages, from get_pending_user_messages()
+        timer: Stage timer of the reply (optional)
+    """
+    timer = timer or StageTimer()
+    company = conversation.company
+    received_at = get_received_at(pending[-1])
+    latency_ms = None
+    typing_message_id = pending[-1].whatsapp_message_id or ""
+    segments: list[str] = []
+    assistant_message = None
+    tokens_used = 0
+
+    try:
+        with timer.stage("history_fetch"):
+            tenant = await database_sync_to_async(get_company_tenant)(company)
+            formatted_history, user_message = await _build_llm_input(
+                conversation, pending, tenant.config.history_token_budget
+            )
+
+        llm_started = time.perf_counter()
+        async with aclosing(
+            agenerate_response_stream(
+                company=company,
+                conversation_history=formatted_history,
+                user_message=user_message,
+            )
+        ) as stream:
+            async for segment in stream:
+                segment_typing_id = "" if segment.final else typing_message_id
+                if assistant_message is None:
+                    timer.record(
+                        "llm_first_segment",
+                        (time.perf_counter() - llm_started) * 1000,
+                    )
+                    # Nothing is sent yet: the reply can still be dropped
+                    if await _has_newer_user_messages(conversation, pending):
+                        return
+                    # The assistant message is saved with the first segment, so
+                    # the fragments stop being pending before anything is sent
+                    outbound = await database_sync_to_async(start_streamed_reply)(
+                        conversation=conversation,
+                        text=segment.text,
+                        typing_message_id=segment_typing_id,
+                        received_at=received_at,
+                        stage_timings=timer.timings,
+                    )
+                    assistant_message = outbound.message
+                    latency_ms = round(
+                        (timezone.now() - received_at).total_seconds() * 1000
+                    )
+                    timer.record("total", latency_ms)
+                else:
+                    await database_sync_to_async(enqueue_outbound_message)(
+                        company=company,
+                        to_number=conversation.customer.phone,
+                        text=segment.text,
+                        priority=OutboundMessagePriority.REPLY,
+                        message=assistant_message,
+                        typing_message_id=segment_typing_id,
+                        received_at=received_at,
+                        stage_timings=timer.timings,
+                    )
+                segments.append(segment.text)
+                tokens_used = segment.tokens_used
+        timer.record("llm", (time.perf_counter() - llm_started) * 1000)
+
+    except Exception as e:
+        logger.error(f"LLM generation error: {e}", exc_info=True)
+        if assistant_message is None:
+            if await _has_newer_user_messages(conversation, pending):
+                return
+            # Fallback message on LLM error
+            await database_sync_to_async(enqueue_reply)(
+                conversation=conversation,
+                text=FALLBACK_RESPONSE,
+                received_at=received_at,
+                stage_timings=timer.timings,
+            )
+            return
+        # Keep the part that was already queued
+
+    await database_sync_to_async(finish_streamed_reply)(
+        assistant_message,
+        content="\n\n".join(segments),
+        tokens_used=tokens_used,
+        latency_ms=latency_ms,
+        stage_timings=timer.timings,
+    )
+    logger.info(
+        f"Streamed reply queued in {len(segments)} messages: {assistant_message.pk} "
+        f"(tokens: {tokens_used})"
+    )
+
+
+async def _build_llm_input(
+    conversation: Conversation, pending: list[Message], token_budget: int
+) -> tuple[list[types.Content], str]:
+    """
+    Get the formatted history preceding the pending fragments and the joined fragments.
+
+    Schedules a summary update when older messages had to be left out.
+    """
+    history = await database_sync_to_async(get_history_contents)(
+        conversation, token_budget, before=pending[0]
+    )
+    if history.truncated:
+        await database_sync_to_async(schedule_summary)(conversation)
+    user_message = "\n".join(message.content for message in pending)
+    return history.contents, user_message
+
+
+async def _has_newer_user_messages(
+    conversation: Conversation, pending: list[Message]
+) -> bool:
+    """Check (and log) whether the customer wrote again after the pending fragments."""
+    if await database_sync_to_async(has_newer_user_messages)(
+        conversation, after=pending[-1]
+    ):
+        logger.info(
+            f"Discarding reply for conversation {conversation.pk}: "
+            "newer customer messages arrived"
+        )
+        return True
+    return False